@@ -0,0 +1,28 @@
+"""
+Django app configuration for edx_filters_pipelines.
+"""
+from django.apps import AppConfig
+from django.core.checks import ERROR
+from django.core.exceptions import ImproperlyConfigured
+
+
+class EdxFiltersPipelinesConfig(AppConfig):
+    """
+    Optional app that validates the settings of the package at startup.
+    """
+
+    name = 'edx_filters_pipelines'
+    verbose_name = 'edX filters pipelines'
+
+    def ready(self):
+        """
+        Register the system checks and refuse to start on invalid settings.
+
+        Raises:
+            ImproperlyConfigured: If one of the checks reports an error
+        """
+        from edx_filters_pipelines.checks import check_recaptcha_settings  # pylint: disable=import-outside-toplevel
+
+        errors = [message for message in check_recaptcha_settings(None) if message.level >= ERROR]
+        if errors:
+            raise ImproperlyConfigured('\n'.join(f'{error.id}: {error.msg}' for error in errors))
@@ -0,0 +1,336 @@
+"""
+Structured audit events of the pipeline steps in this package.
+
+Steps report what they decided (a blocked registration, a reCAPTCHA verdict...)
+with `emit()`, which only appends a compact AuditEvent to a bounded ring
+buffer. A background thread drains the buffer in batches and hands every batch
+to the sinks, so formatting and I/O happen off the request thread.
+
+Configured by the FILTERS_PIPELINES_AUDIT setting, merged over DEFAULT_AUDIT:
+
+    FILTERS_PIPELINES_AUDIT = {
+        'sinks': [
+            'edx_filters_pipelines.audit.log_audit_events',
+            {'sink': 'edx_filters_pipelines.audit.JsonLinesFileSink',
+             'path': '/var/log/audit.jsonl'},
+        ],
+        'sample_rates': {'recaptcha.cached_verdict': 0.1},
+        'levels': {'recaptcha.assessment': logging.DEBUG},
+    }
+
+A sink is the dotted path of a callable that takes a list of AuditEvents, or a
+dict whose "sink" is the dotted path of a class instantiated with the other
+keys. When events come in faster than they are flushed, the oldest ones are
+overwritten; lower ``sample_rates`` for the noisiest events to keep the rest.
+Set the setting to None to disable audit events.
+
+Every event has a log level, from ``levels`` or else DEFAULT_EVENT_LEVELS:
+rejections are warnings, so log-based alerting keeps seeing them, and anything
+else is INFO.
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Defaults of the FILTERS_PIPELINES_AUDIT setting.
+DEFAULT_AUDIT = {
+    'sinks': ['edx_filters_pipelines.audit.log_audit_events'],
+    # Events buffered before the oldest ones are overwritten.
+    'capacity': 10_000,
+    # Events handed to the sinks at once. A full batch wakes the thread early.
+    'batch_size': 100,
+    # Maximum seconds an event waits in the buffer.
+    'flush_interval': 1.0,
+    # Fraction of the events of a given name kept, 1.0 for names not listed.
+    'sample_rates': {},
+    # Log level of the events of a given name, over DEFAULT_EVENT_LEVELS.
+    'levels': {},
+}
+
+# Log level of the events of a given name, INFO for names not listed.
+DEFAULT_EVENT_LEVELS = {
+    'registration.blocked': logging.WARNING,
+    'recaptcha.rejected': logging.WARNING,
+    'recaptcha.circuit_open': logging.WARNING,
+}
+
+_emitter = None
+_emitter_lock = threading.Lock()
+
+
+class AuditEvent:
+    """
+    One audit event: what happened, when, how severe, and some scalar fields.
+    """
+
+    __slots__ = ('name', 'timestamp', 'fields', 'level')
+
+    def __init__(self, name: str, timestamp: float, fields: dict, level: int = logging.INFO):
+        self.name = name
+        self.timestamp = timestamp
+        self.fields = fields
+        self.level = level
+
+    def __repr__(self):
+        fields = ' '.join(f'{key}={value}' for key, value in self.fields.items())
+        return f'<AuditEvent {self.name} {fields}>'
+
+    def as_dict(self) -> dict:
+        """
+        Return the event as a flat, JSON-serializable dict.
+        """
+        level = logging.getLevelName(self.level)
+        return {'event': self.name, 'timestamp': self.timestamp, 'level': level, **self.fields}
+
+
+def log_audit_events(events: list):
+    """
+    Sink that logs each event at its level.
+    """
+    for event in events:
+        logger.log(event.level, 'Audit event: %r', event)
+
+
+class JsonLinesFileSink:
+    """
+    Sink that appends each event to a file as a line of JSON.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, events: list):
+        lines = ''.join(json.dumps(event.as_dict(), default=str) + '\n' for event in events)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class AuditEmitter:
+    """
+    Ring buffer of audit events, flushed to sinks in batches by a thread.
+    """
+
+    def __init__(self, sinks: list, *, capacity: int = 10_000, batch_size: int = 100,
+                 flush_interval: float = 1.0, sample_rates: Optional[dict] = None, levels: Optional[dict] = None):
+        """
+        Initialize the emitter. The flush thread is started by the first event.
+
+        Args:
+            sinks: Callables that take a list of AuditEvents
+            capacity: Events buffered before the oldest ones are overwritten
+            batch_size: Events handed to the sinks at once
+            flush_interval: Maximum seconds an event waits in the buffer
+            sample_rates: Fraction of the events of a given name that are kept
+            levels: Log level of the events of a given name, over
+                DEFAULT_EVENT_LEVELS
+        """
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rates = sample_rates or {}
+        self.levels = {**DEFAULT_EVENT_LEVELS, **(levels or {})}
+        self.dropped = 0
+        # deque.append and popleft are atomic, so emitters never wait for the
+        # flush thread.
+        self._buffer = deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def emit(self, name: str, **fields) -> bool:
+        """
+        Buffer an event, unless it is sampled out.
+
+        Returns:
+            bool: True if the event was buffered
+        """
+        rate = self.sample_rates.get(name, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return False
+        buffer = self._buffer
+        if len(buffer) == buffer.maxlen:
+            self.dropped += 1
+        buffer.append(AuditEvent(name, time.time(), fields, self.levels.get(name, logging.INFO)))
+        if self._thread is None:
+            self._start()
+        elif len(buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """
+        Hand every buffered event to the sinks.
+
+        Returns:
+            int: Number of events flushed
+        """
+        flushed = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return flushed
+                flushed += len(batch)
+                for sink in self.sinks:
+                    try:
+                        sink(batch)
+                    except Exception:  # pylint: disable=broad-except
+                        logger.exception('Audit event sink %r failed', sink)
+
+    def close(self):
+        """
+        Stop the flush thread and flush what is left.
+        """
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+    def reset_after_fork(self):
+        """
+        Forget the parent's flush thread, which a forked child doesn't have.
+
+        The events buffered before the fork are left to the parent, which
+        flushes them itself, so the child doesn't record them twice.
+        """
+        self._buffer = deque(maxlen=self._buffer.maxlen)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _take_batch(self) -> list:
+        """
+        Remove up to batch_size events from the buffer, oldest first.
+        """
+        batch = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name='audit-events', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def create_audit_emitter() -> Optional[AuditEmitter]:
+    """
+    Create an audit emitter from settings.
+
+    Returns:
+        AuditEmitter: Configured emitter, or None if the setting is None
+    """
+    config = getattr(settings, 'FILTERS_PIPELINES_AUDIT', {})
+    if config is None:
+        return None
+    config = {**DEFAULT_AUDIT, **config}
+    sinks = []
+    for sink in config.pop('sinks'):
+        try:
+            if isinstance(sink, dict):
+                options = dict(sink)
+                sinks.append(import_string(options.pop('sink'))(**options))
+            else:
+                sinks.append(import_string(sink))
+        except (ImportError, KeyError, TypeError):
+            logger.exception('Could not create audit event sink %r', sink)
+    return AuditEmitter(sinks, **config)
+
+
+def get_audit_emitter() -> Optional[AuditEmitter]:
+    """
+    Get the process-wide emitter configured by FILTERS_PIPELINES_AUDIT.
+    """
+    global _emitter  # pylint: disable=global-statement
+    emitter = _emitter
+    if emitter is None:
+        with _emitter_lock:
+            if _emitter is None:
+                # False stands for "disabled", so the setting isn't read on
+                # every event.
+                _emitter = create_audit_emitter() or False
+            emitter = _emitter
+    return emitter or None
+
+
+def emit(name: str, **fields) -> bool:
+    """
+    Record an audit event.
+
+    For example ``emit('registration.blocked', reason='forbidden-username')``.
+
+    Fields should be scalars; they are only formatted when the event is
+    flushed.
+
+    Returns:
+        bool: True if the event was buffered
+    """
+    emitter = get_audit_emitter()
+    return emitter is not None and emitter.emit(name, **fields)
+
+
+def flush_audit_events() -> int:
+    """
+    Flush the events buffered by the shared emitter, e.g. before exiting.
+    """
+    emitter = get_audit_emitter()
+    return emitter.flush() if emitter is not None else 0
+
+
+def reset_audit_emitter():
+    """
+    Close the shared emitter, so the next event creates one from settings.
+    """
+    global _emitter  # pylint: disable=global-statement
+    with _emitter_lock:
+        emitter, _emitter = _emitter, None
+    if emitter:
+        emitter.close()
+
+
+def _flush_at_exit():
+    if _emitter:
+        _emitter.flush()
+
+
+def _reset_audit_emitter_after_fork():
+    if _emitter:
+        _emitter.reset_after_fork()
+
+
+@receiver(setting_changed)
+def _reset_audit_emitter_on_setting_changed(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Recreate the emitter when FILTERS_PIPELINES_AUDIT changes.
+    """
+    if setting == 'FILTERS_PIPELINES_AUDIT':
+        reset_audit_emitter()
+
+
+atexit.register(_flush_at_exit)
+os.register_at_fork(after_in_child=_reset_audit_emitter_after_fork)
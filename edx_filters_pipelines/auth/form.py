@@ -32,8 +32,22 @@ your registration page UI and mobile apps are updated to:
 
 Failure to update the UI will cause registration to fail with validation errors if the
 field is marked as 'required'.
+
+## Speculative assessment
+
+Set RECAPTCHA_SPECULATIVE_ASSESSMENT = True to start the reCAPTCHA assessment
+in the background as soon as the form is cleaned, so that the network call
+overlaps with the rest of the registration validation. VerifyReCaptchaToken
+then only waits for its result. The background work runs on a bounded pool
+sized by RECAPTCHA_SPECULATIVE_MAX_WORKERS and
+RECAPTCHA_SPECULATIVE_MAX_PENDING; when it is full the assessment happens in
+the pipeline as usual.
 """
-from django.forms import Form, CharField
+from django.conf import settings
+from django.forms import CharField, Form
+
+from edx_filters_pipelines.auth.utils import get_registration_owner, start_speculative_verification
+from edx_filters_pipelines.waffle import ENABLE_RECAPTCHA_VALIDATION
 
 
 class CaptchaForm(Form):
@@ -50,6 +64,19 @@ class CaptchaForm(Form):
             'captcha_token': {'field_type': 'hidden'},
         }
 
+    def clean_captcha_token(self):
+        """
+        Start a speculative assessment of the token, if enabled.
+        """
+        token = self.cleaned_data.get('captcha_token')
+        if (
+            token
+            and getattr(settings, 'RECAPTCHA_SPECULATIVE_ASSESSMENT', False)
+            and ENABLE_RECAPTCHA_VALIDATION.is_enabled()
+        ):
+            start_speculative_verification(token, get_registration_owner(self.data))
+        return token
+
     def save(self, commit=True):  # pylint: disable=unused-argument
         """
         This method is a placeholder to comply with the expected interface for registration forms.
@@ -0,0 +1,173 @@
+"""
+Multi-pattern matching of usernames against forbidden terms.
+
+The forbidden term list is compiled once per distinct configuration into an
+Aho-Corasick automaton, so a username is checked in a single linear pass no
+matter how many terms are configured. Terms and usernames can be folded to a
+canonical skeleton first, so look-alike spellings such as "ADM1N", "аdmin"
+(Cyrillic а) or full-width characters match the term they imitate.
+"""
+import threading
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Optional, Sequence
+
+# Number of distinct term lists kept compiled at the same time.
+MATCHER_CACHE_SIZE = 16
+
+# Characters that still look like a Latin letter after compatibility
+# decomposition and casefolding, mapped to that letter. "l" and "1" both fold
+# to "i" so that the three can't be swapped for each other.
+CONFUSABLES = {
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'һ': 'h', 'і': 'i', 'ї': 'i', 'ј': 'j', 'к': 'k',
+    'м': 'm', 'н': 'h', 'о': 'o', 'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'ѕ': 's',
+    'ԁ': 'd', 'ԛ': 'q', 'ԝ': 'w',
+    # Greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p',
+    'τ': 't', 'υ': 'u', 'χ': 'x',
+    # Latin look-alikes
+    'ı': 'i', 'ɑ': 'a', 'ɡ': 'g', 'ɩ': 'i', 'ʟ': 'i', 'l': 'i',
+    # Leetspeak
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's', '!': 'i', '|': 'i',
+}
+_FOLD_TABLE = str.maketrans(CONFUSABLES)
+
+
+def fold_text(text: str) -> str:
+    """
+    Map text to its confusable skeleton.
+
+    The text is decomposed with NFKD (which covers everything NFKC folds, e.g.
+    full-width forms), combining marks are dropped, and it is casefolded. The
+    remaining look-alike characters are replaced using CONFUSABLES.
+    """
+    if not text.isascii():
+        # Decompose before folding the case: compatibility characters such as
+        # '𝐀' or 'ℍ' only become capitals here. Folding may add marks again.
+        text = _strip_marks(_strip_marks(text).casefold())
+    return text.casefold().translate(_FOLD_TABLE)
+
+
+def _strip_marks(text: str) -> str:
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+class ForbiddenTermMatcher:
+    """
+    Aho-Corasick automaton that finds the first configured term in a string.
+
+    Matching is case-insensitive, and with ``fold`` set it also ignores
+    accents, confusable characters and leetspeak. Terms are folded once, when
+    the automaton is built. When several terms occur in the same string, the
+    one that comes first in the configured list is reported, like a linear scan
+    of the list would.
+    """
+
+    __slots__ = ('terms', 'fold', '_goto', '_fail', '_output')
+
+    def __init__(self, terms: Sequence[str], fold: bool = True):
+        """
+        Compile the automaton.
+
+        Args:
+            terms: Forbidden terms, in priority order
+            fold: Compare confusable skeletons instead of lowercased text
+        """
+        self.terms = tuple(terms)
+        self.fold = fold
+        no_match = len(self.terms)
+        goto = [{}]
+        output = [no_match]
+
+        for index, term in enumerate(self.terms):
+            node = 0
+            for char in self.normalize(term):
+                next_node = goto[node].get(char)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][char] = next_node
+                    goto.append({})
+                    output.append(no_match)
+                node = next_node
+            output[node] = min(output[node], index)
+
+        # Breadth-first pass to set failure links. Each node also inherits the
+        # best output of its failure node, so the scan only has to look at one
+        # value per char.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                if node:
+                    state = fail[node]
+                    while state and char not in goto[state]:
+                        state = fail[state]
+                    fail[child] = goto[state].get(char, 0)
+                output[child] = min(output[child], output[fail[child]])
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def normalize(self, text: str) -> str:
+        """
+        Map text to the form that terms and usernames are compared in.
+        """
+        return fold_text(text) if self.fold else text.lower()
+
+    def find(self, text: str) -> Optional[str]:
+        """
+        Return the highest-priority term contained in ``text``, or None.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        best = output[0]
+        node = 0
+        for char in self.normalize(text):
+            if best == 0:
+                break
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node] < best:
+                best = output[node]
+        return self.terms[best] if best < len(self.terms) else None
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _compile_matcher(terms: tuple, fold: bool) -> ForbiddenTermMatcher:
+    return ForbiddenTermMatcher(terms, fold)
+
+
+_matchers_by_identity: dict = {}
+_matchers_lock = threading.Lock()
+
+
+def get_forbidden_term_matcher(terms: Sequence[str], fold: bool = True) -> ForbiddenTermMatcher:
+    """
+    Get the compiled matcher for a forbidden term list.
+
+    Pipeline steps are instantiated on every filter run, but their
+    configuration comes from the same settings object each time, so the matcher
+    is looked up by the identity of the term list first. Equal lists share a
+    single compiled automaton.
+
+    Args:
+        terms: Forbidden terms, in priority order
+        fold: Compare confusable skeletons instead of lowercased text
+    """
+    key = (id(terms), fold)
+    entry = _matchers_by_identity.get(key)
+    if entry is not None and entry[0] is terms and entry[1] == len(terms):
+        return entry[2]
+
+    matcher = _compile_matcher(tuple(terms), fold)
+    with _matchers_lock:
+        if len(_matchers_by_identity) >= MATCHER_CACHE_SIZE:
+            _matchers_by_identity.clear()
+        # Holding a reference to the list keeps its id from being reused.
+        _matchers_by_identity[key] = (terms, len(terms), matcher)
+    return matcher
@@ -1,15 +1,111 @@
 """
 Registration pipeline step(s) for enforcing rules during user sign-up.
 """
-import logging
-
+from asgiref.sync import sync_to_async
 from openedx_filters import PipelineStep
 from openedx_filters.learning.filters import StudentRegistrationRequested
 
-from edx_filters_pipelines.auth.utils import verify_recaptcha_token
+from edx_filters_pipelines.audit import emit
+from edx_filters_pipelines.auth.matcher import get_forbidden_term_matcher
+from edx_filters_pipelines.auth.ratelimit import get_rate_limiter
+from edx_filters_pipelines.auth.shadow import start_shadow_verification
+from edx_filters_pipelines.auth.term_sources import (
+    DEFAULT_RELOAD_INTERVAL,
+    get_cache_term_matcher,
+    get_file_term_matcher,
+)
+from edx_filters_pipelines.auth.termfile import get_term_file_matcher
+from edx_filters_pipelines.auth.utils import (
+    averify_recaptcha_token,
+    get_client_ip,
+    get_known_platform,
+    get_registration_owner,
+    verify_recaptcha_token,
+)
+from edx_filters_pipelines.instrumentation import OUTCOME_SHADOW, OUTCOME_SKIPPED, mark_outcome, phase, timed_step
 from edx_filters_pipelines.waffle import ENABLE_RECAPTCHA_VALIDATION
 
-logger = logging.getLogger(__name__)
+
+class RateLimitRegistration(PipelineStep):
+    """
+    A filter pipeline step that rejects sources with too many registrations.
+
+    Attempts are counted per client IP address (as forwarded by trusted
+    proxies, see edx_django_utils.ip) and per platform over a sliding window of
+    "rate_limit_window" seconds (default 60). Each limit is only enforced when
+    configured:
+
+        OPEN_EDX_FILTERS_CONFIG = {
+            "org.openedx.learning.student.registration.requested.v1": {
+                "pipeline": [
+                    "edx_filters_pipelines.auth.pipelines.registration.RateLimitRegistration",
+                    "edx_filters_pipelines.auth.pipelines.registration.VerifyReCaptchaToken"
+                ],
+                "rate_limit_per_ip": 20,
+                "rate_limit_per_platform": 1000,
+                "fail_silently": False
+            }
+        }
+
+    Put it before VerifyReCaptchaToken, or let
+    edx_filters_pipelines.composite.CostOrderedSteps order it, so rejected
+    attempts never pay for an assessment. Rejected attempts still count.
+
+    Platforms are the Mobile-Platform-Identifier header values with a site key
+    in RECAPTCHA_SITE_KEYS; any other value counts as "web". Attempts over the
+    per-IP limit are not counted against the platform, so a single flooding
+    source can't use up the budget of every legitimate registrant of its
+    platform.
+
+    Counts are kept per process. Set "rate_limit_cache_alias" to also aggregate
+    them in a Django cache shared by all app nodes (see
+    edx_filters_pipelines.auth.ratelimit).
+    """
+
+    # Expected seconds per run: in-process counters only.
+    cost = 0.00002
+
+    @timed_step
+    def run_filter(self, **kwargs):
+        """
+        Executes the filter logic to block registration over a rate limit.
+
+        Raises:
+            StudentRegistrationRequested.PreventRegistration: If a rate limit
+                is exceeded.
+        """
+        form_data = kwargs.get("form_data", {})
+        with phase("rate_check"):
+            exceeded = self.get_exceeded_limit()
+        if exceeded:
+            emit('registration.blocked', reason='registration-rate-limited', key=exceeded)
+            raise StudentRegistrationRequested.PreventRegistration(
+                message="Too many registration attempts. Please try again later.",
+                status_code=429,
+                error_code='registration-rate-limited'
+            )
+        return form_data
+
+    def get_exceeded_limit(self):
+        """
+        Count the attempt against the limits, up to the first exceeded one.
+
+        Returns:
+            str: The key of the exceeded limit, or None
+        """
+        config = self.extra_config
+        window = config.get("rate_limit_window", 60)
+        cache_alias = config.get("rate_limit_cache_alias")
+        client_ip = get_client_ip()
+        limits = (
+            ("rate_limit_per_ip", f"ip:{client_ip}" if client_ip else None),
+            ("rate_limit_per_platform", f"platform:{get_known_platform()}"),
+        )
+        for setting, key in limits:
+            limit = config.get(setting)
+            if limit and key and not get_rate_limiter(limit, window, cache_alias).hit(key):
+                return key
+        return None
 
 
 class PreventForbiddenUsernameRegistration(PipelineStep):
@@ -17,6 +113,10 @@ class PreventForbiddenUsernameRegistration(PipelineStep):
     A filter pipeline step that prevents user registration if the chosen username contains
     any forbidden substrings.
 
+    Matching ignores case, accents, confusable characters (e.g. Cyrillic "а")
+    and common leetspeak (e.g. "ADM1N"). Set "fold_confusables" to False to
+    only ignore case.
+
     This filter should be configured via the `OPEN_EDX_FILTERS_CONFIG` setting in edx-platform
     as follows:
 
@@ -30,8 +130,30 @@ class PreventForbiddenUsernameRegistration(PipelineStep):
             }
         }
 
+    Very large lists can be compiled into a term file (see
+    edx_filters_pipelines.auth.termfile) that all worker processes map instead
+    of holding their own copy. Reference it with "forbidden_usernames_file";
+    terms in both the file and "forbidden_usernames" are checked, with the
+    inline list taking priority. Folding of the file is set when it is built.
+
+    Terms can also change without a restart (see
+    edx_filters_pipelines.auth.term_sources):
+
+    * set "forbidden_usernames_reload_interval" to reload
+      "forbidden_usernames_file" (a term file or a text file with one term per
+      line) when it changes;
+    * set "forbidden_usernames_cache_key" (and optionally
+      "forbidden_usernames_cache_alias") to read terms published with
+      publish_forbidden_terms() to a Django cache.
+
+    Sources are checked at most every "forbidden_usernames_reload_interval"
+    seconds (default 30) and rebuilt in the background.
     """
 
+    # Expected seconds per run, used by composite.CostOrderedSteps.
+    cost = 0.0001
+
+    @timed_step
     def run_filter(self, **kwargs):
         """
         Executes the filter logic to block registration if the username contains
@@ -42,13 +164,13 @@ class PreventForbiddenUsernameRegistration(PipelineStep):
         """
         form_data = kwargs.get("form_data", {})
         username = str(form_data.get("username", "")).strip()
-        forbidden_usernames = self.extra_config.get("forbidden_usernames", [])
 
-        forbidden_match = next((f for f in forbidden_usernames if f.lower() in username.lower()), None)
+        with phase("matcher_lookup"):
+            matchers = self.get_matchers()
+        with phase("match"):
+            forbidden_match = next(filter(None, (matcher.find(username) for matcher in matchers)), None)
         if forbidden_match:
-            logger.info(
-                f"Registration blocked: username '{username}' contains forbidden term '{forbidden_match}'."
-            )
+            emit('registration.blocked', reason='forbidden-username', username=username, term=forbidden_match)
             raise StudentRegistrationRequested.PreventRegistration(
                 message=(
                     "Usernames can't include words that could be mistaken for course roles. "
@@ -59,6 +181,31 @@ class PreventForbiddenUsernameRegistration(PipelineStep):
             )
         return form_data
 
+    def get_matchers(self) -> list:
+        """
+        Get the matchers of every configured term source, in priority order.
+        """
+        config = self.extra_config
+        fold_confusables = config.get("fold_confusables", True)
+        reload_interval = config.get("forbidden_usernames_reload_interval")
+        matchers = [get_forbidden_term_matcher(config.get("forbidden_usernames", []), fold_confusables)]
+
+        forbidden_usernames_file = config.get("forbidden_usernames_file")
+        if forbidden_usernames_file and reload_interval:
+            matchers.append(get_file_term_matcher(forbidden_usernames_file, fold_confusables, reload_interval))
+        elif forbidden_usernames_file:
+            matchers.append(get_term_file_matcher(forbidden_usernames_file))
+
+        cache_key = config.get("forbidden_usernames_cache_key")
+        if cache_key:
+            matchers.append(get_cache_term_matcher(
+                cache_key,
+                config.get("forbidden_usernames_cache_alias", "default"),
+                fold_confusables,
+                reload_interval or DEFAULT_RELOAD_INTERVAL,
+            ))
+        return matchers
+
 
 class VerifyReCaptchaToken(PipelineStep):
     """
@@ -76,8 +223,20 @@ class VerifyReCaptchaToken(PipelineStep):
             }
         }
 
+    Callers running in an event loop (e.g. under ASGI) can await `arun_filter`
+    instead, which uses the asyncio Enterprise client so concurrent
+    registrations don't block on each other's assessments.
+
+    Set "shadow_mode" to True to measure instead of enforce: registrations go
+    through immediately and their tokens are assessed in the background, only
+    to record their verdicts and latencies (see
+    edx_filters_pipelines.auth.shadow for where they are kept).
     """
 
+    # Expected seconds per run: one remote assessment.
+    cost = 0.3
+
+    @timed_step
     def run_filter(self, **kwargs):
         """
         Executes the filter logic to verify the reCAPTCHA token.
@@ -86,12 +245,80 @@ class VerifyReCaptchaToken(PipelineStep):
             StudentRegistrationRequested.PreventRegistration: If the reCAPTCHA verification fails.
         """
         form_data = kwargs.get("form_data", {})
-        if not ENABLE_RECAPTCHA_VALIDATION.is_enabled():
+        with phase("flag_check"):
+            enabled = ENABLE_RECAPTCHA_VALIDATION.is_enabled()
+        if not enabled:
+            mark_outcome(OUTCOME_SKIPPED)
+            return form_data
+        if self.extra_config.get("shadow_mode"):
+            return self.run_shadow(form_data)
+        return self.check_verification(
+            form_data, verify_recaptcha_token(form_data.get("captcha_token", ""), owner=self.get_owner(form_data))
+        )
+
+    @timed_step
+    async def arun_filter(self, **kwargs):
+        """
+        Like run_filter, without blocking the event loop.
+
+        The run_pipeline of openedx-filters only calls run_filter, so a filter
+        run through StudentRegistrationRequested.run_filter never gets here.
+        Async callers reach this method by awaiting it on the step directly,
+        or through CostOrderedSteps.arun_filter, which awaits the arun_filter
+        of each of its steps.
+
+        Raises:
+            StudentRegistrationRequested.PreventRegistration: If the reCAPTCHA
+                verification fails.
+        """
+        form_data = kwargs.get("form_data", {})
+        with phase("flag_check"):
+            # Only hop to a thread when the snapshot can't answer.
+            enabled = ENABLE_RECAPTCHA_VALIDATION.snapshot_value(load=False)
+            if enabled is None:
+                enabled = await sync_to_async(ENABLE_RECAPTCHA_VALIDATION.is_enabled)()
+        if not enabled:
+            mark_outcome(OUTCOME_SKIPPED)
             return form_data
-        if verify_recaptcha_token(form_data.get("captcha_token", "")):
-            logger.info("reCAPTCHA token verification passed.")
+        if self.extra_config.get("shadow_mode"):
+            # Resolving the verifier may read settings and build a client: keep
+            # it off the loop.
+            return await sync_to_async(self.run_shadow)(form_data)
+        return self.check_verification(
+            form_data,
+            await averify_recaptcha_token(form_data.get("captcha_token", ""), owner=self.get_owner(form_data)),
+        )
+
+    @staticmethod
+    def run_shadow(form_data):
+        """
+        Queue the token for a background assessment and let the user through.
+        """
+        with phase("shadow_submit"):
+            start_shadow_verification(form_data.get("captcha_token", ""))
+        mark_outcome(OUTCOME_SHADOW)
+        return form_data
+
+    @staticmethod
+    def get_owner(form_data) -> str:
+        """
+        Fingerprint the registration of a token, to tell retries from replays.
+        """
+        return get_registration_owner(form_data)
+
+    @staticmethod
+    def check_verification(form_data, verified):
+        """
+        Return the form data of a verified token, or block the registration.
+
+        Raises:
+            StudentRegistrationRequested.PreventRegistration: If the reCAPTCHA
+                verification failed.
+        """
+        if verified:
+            emit('registration.recaptcha_verified')
         else:
-            logger.error("reCAPTCHA token verification failed.")
+            emit('registration.blocked', reason='recaptcha-verification-failed')
             raise StudentRegistrationRequested.PreventRegistration(
                 message="reCAPTCHA verification failed. Please try again.",
                 status_code=403,
@@ -0,0 +1,193 @@
+"""
+Local screening of reCAPTCHA tokens before they are assessed.
+
+Bot floods either fabricate tokens or replay one valid token for many
+registrations, which the verdict cache would otherwise keep answering as valid.
+TokenPrescreen rejects both without an assessment call:
+
+* tokens that can't have been issued by reCAPTCHA: outside the configured
+  length bounds or with characters outside the URL-safe base64 alphabet;
+* tokens that were already used by another registration within their
+  lifetime. Each token is bound to a fingerprint of the first registration
+  (email or username) that used it, so a legitimate retry of the same
+  registration is still answered from the verdict cache.
+
+Uses are recorded in two time-bucketed tiers, like verdicts: an in-process set
+of token digests in front of the Django cache, where the first use is claimed
+with an atomic cache.add so that all app nodes agree on it.
+
+Enable with the RECAPTCHA_TOKEN_PRESCREEN setting, e.g. ``{}`` for the defaults
+in DEFAULT_TOKEN_PRESCREEN.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from edx_filters_pipelines.auth.verdicts import TOKEN_LIFETIME
+
+CACHE_KEY_PREFIX = 'edx_filters_pipelines.recaptcha.replay'
+TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
+# Defaults of the RECAPTCHA_TOKEN_PRESCREEN setting. Leave the setting unset or
+# None to disable screening.
+DEFAULT_TOKEN_PRESCREEN = {
+    'min_length': 100,
+    'max_length': 8192,
+    # Seconds a token stays bound to the registration that first used it.
+    'replay_window': TOKEN_LIFETIME,
+    # Token digests kept in process per time bucket.
+    'local_size': 100_000,
+    # Django cache shared between app nodes, or None for in-process only.
+    'cache_alias': 'default',
+}
+
+
+class TokenPrescreen:
+    """
+    Rejects malformed tokens and tokens replayed by another registration.
+    """
+
+    def __init__(self, min_length: int = 100, max_length: int = 8192, replay_window: float = TOKEN_LIFETIME,
+                 local_size: int = 100_000, cache_alias: Optional[str] = 'default'):
+        """
+        Initialize the prescreen.
+
+        Args:
+            min_length: Length below which tokens are rejected
+            max_length: Length above which tokens are rejected
+            replay_window: Seconds a token stays bound to the first
+                registration that used it
+            local_size: Number of token digests kept in process per time bucket
+            cache_alias: Django cache used as the shared tier, or None for
+                local only
+        """
+        self.min_length = min_length
+        self.max_length = max_length
+        self.replay_window = replay_window
+        self.local_size = local_size
+        self.cache_alias = cache_alias
+        self._lock = threading.Lock()
+        # Uses per bucket (current, previous), {token digest: owner digest}.
+        self._current = {}
+        self._previous = {}
+        self._bucket_start = time.monotonic()
+
+    def is_well_formed(self, token: str) -> bool:
+        """
+        Return whether the token could have been issued by reCAPTCHA.
+        """
+        return self.min_length <= len(token) <= self.max_length and TOKEN_PATTERN.fullmatch(token) is not None
+
+    @staticmethod
+    def digest(value: str) -> str:
+        """
+        Hash a token or registration fingerprint, so neither is stored as is.
+        """
+        return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+    def is_replay(self, token: str, owner: str) -> bool:
+        """
+        Record the token's use and return whether another owner used it first.
+
+        Args:
+            token: The reCAPTCHA token
+            owner: Fingerprint of the registration, e.g. its email address
+        """
+        token_digest, owner_digest = self.digest(token), self.digest(owner)
+        first_owner = self._get_local(token_digest)
+        if first_owner is None:
+            first_owner = self._claim_shared(token_digest, owner_digest)
+            self._store_local(token_digest, first_owner)
+        return first_owner != owner_digest
+
+    async def ais_replay(self, token: str, owner: str) -> bool:
+        """
+        Like is_replay, without blocking the event loop on the shared cache.
+        """
+        token_digest, owner_digest = self.digest(token), self.digest(owner)
+        first_owner = self._get_local(token_digest)
+        if first_owner is None:
+            first_owner = await self._aclaim_shared(token_digest, owner_digest)
+            self._store_local(token_digest, first_owner)
+        return first_owner != owner_digest
+
+    def clear(self):
+        """
+        Forget the uses recorded in process. The shared tier expires by itself.
+        """
+        with self._lock:
+            self._current, self._previous = {}, {}
+
+    def _rotate(self):
+        """
+        Start a new bucket once the current one is older than the window or
+        full. Must be called with the lock held.
+        """
+        now = time.monotonic()
+        if now - self._bucket_start >= self.replay_window or len(self._current) >= self.local_size:
+            # A full bucket is rotated early, so uses may be forgotten locally
+            # before the window ends; the shared tier still remembers them.
+            stale = now - self._bucket_start >= 2 * self.replay_window
+            self._previous = {} if stale else self._current
+            self._current = {}
+            self._bucket_start = now
+
+    def _get_local(self, token_digest: str) -> Optional[str]:
+        with self._lock:
+            self._rotate()
+            owner = self._current.get(token_digest)
+            return owner if owner is not None else self._previous.get(token_digest)
+
+    def _store_local(self, token_digest: str, owner_digest: str):
+        with self._lock:
+            self._rotate()
+            self._current[token_digest] = owner_digest
+
+    def _claim_shared(self, token_digest: str, owner_digest: str) -> str:
+        """
+        Claim the token for the owner in the shared cache, returning its owner.
+        """
+        if not self.cache_alias:
+            return owner_digest
+        key = f'{CACHE_KEY_PREFIX}.{token_digest}'
+        try:
+            cache = caches[self.cache_alias]
+            if cache.add(key, owner_digest, self.replay_window):
+                return owner_digest
+            return cache.get(key) or owner_digest
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(f"reCAPTCHA replay cache unavailable: {e}")
+            return owner_digest
+
+    async def _aclaim_shared(self, token_digest: str, owner_digest: str) -> str:
+        if not self.cache_alias:
+            return owner_digest
+        key = f'{CACHE_KEY_PREFIX}.{token_digest}'
+        try:
+            cache = caches[self.cache_alias]
+            if await cache.aadd(key, owner_digest, self.replay_window):
+                return owner_digest
+            return await cache.aget(key) or owner_digest
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(f"reCAPTCHA replay cache unavailable: {e}")
+            return owner_digest
+
+
+def create_token_prescreen() -> Optional[TokenPrescreen]:
+    """
+    Create a token prescreen from settings.
+
+    Returns:
+        TokenPrescreen: Configured prescreen, or None if
+            RECAPTCHA_TOKEN_PRESCREEN is not set
+    """
+    config = getattr(settings, 'RECAPTCHA_TOKEN_PRESCREEN', None)
+    if config is None:
+        return None
+    return TokenPrescreen(**{**DEFAULT_TOKEN_PRESCREEN, **config})
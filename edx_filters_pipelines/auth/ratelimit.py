@@ -0,0 +1,170 @@
+"""
+In-process sliding-window rate limiting.
+
+SlidingWindowLimiter estimates how many hits a key had over the last ``window``
+seconds from two fixed windows: all hits of the current one plus the hits of
+the previous one, weighted by how much of it still overlaps the sliding window.
+Only two counters are kept per key, whatever the rate.
+
+Keys are spread over independently locked shards, so concurrent requests for
+different sources rarely contend. With a ``cache_alias`` the per-window counts
+are also aggregated in the Django cache, at most once per ``sync_interval`` per
+key, so limits apply across app nodes instead of per process. Keys are hashed
+before they are used in the cache, so any source string (IPv6 addresses, header
+values) is safe.
+"""
+import hashlib
+import logging
+import threading
+import time
+import zlib
+
+from django.core.cache import caches
+
+CACHE_KEY_PREFIX = 'edx_filters_pipelines.ratelimit'
+DEFAULT_SHARDS = 16
+# Keys kept per shard before stale ones are dropped.
+DEFAULT_MAX_KEYS = 10_000
+DEFAULT_SYNC_INTERVAL = 1.0
+
+_limiters: dict = {}
+_limiters_lock = threading.Lock()
+
+
+class _Shard:
+    """
+    Counters of the keys hashed to one shard.
+
+    Maps each key to [window index, current, previous, unsynced, synced at].
+    """
+
+    __slots__ = ('lock', 'counters')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+
+
+class SlidingWindowLimiter:
+    """
+    Allows at most ``limit`` hits per key over any ``window`` seconds, roughly.
+    """
+
+    def __init__(self, limit: int, window: float, cache_alias=None, shards: int = DEFAULT_SHARDS,
+                 max_keys: int = DEFAULT_MAX_KEYS, sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        """
+        Initialize the limiter.
+
+        Args:
+            limit: Hits allowed per key within the window
+            window: Length of the sliding window in seconds
+            cache_alias: Django cache to aggregate counts across processes in,
+                or None for in-process only
+            shards: Number of independently locked counter shards
+            max_keys: Keys kept per shard before stale ones are dropped
+            sync_interval: Minimum seconds between aggregations of one key in
+                the cache
+        """
+        self.limit = limit
+        self.window = window
+        self.cache_alias = cache_alias
+        self.max_keys = max_keys
+        self.sync_interval = sync_interval
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def hit(self, key: str) -> bool:
+        """
+        Record a hit for the key.
+
+        Returns:
+            bool: True if the key is within its limit, including this hit
+        """
+        now = time.time()
+        index, offset = divmod(now, self.window)
+        index = int(index)
+        shard = self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+        with shard.lock:
+            counter = shard.counters.get(key)
+            if counter is None:
+                if len(shard.counters) >= self.max_keys:
+                    self._prune(shard, index)
+                counter = shard.counters[key] = [index, 0, 0, 0, 0.0]
+            elif counter[0] != index:
+                # Roll over: the current window becomes the previous one, or
+                # both are stale.
+                counter[2] = counter[1] if counter[0] == index - 1 else 0
+                counter[0], counter[1], counter[3] = index, 0, 0
+            counter[1] += 1
+            counter[3] += 1
+            unsynced = counter[3]
+            sync = self.cache_alias and now - counter[4] >= self.sync_interval
+            if sync:
+                counter[4] = now
+
+        if sync:
+            self._sync(shard, key, index, unsynced)
+
+        with shard.lock:
+            current, previous = counter[1], counter[2]
+        return current + previous * (1 - offset / self.window) <= self.limit
+
+    def clear(self):
+        """
+        Forget all counters held in process.
+        """
+        for shard in self._shards:
+            with shard.lock:
+                shard.counters.clear()
+
+    def _prune(self, shard: _Shard, index: int):
+        """
+        Drop the keys without hits in the current or previous window. Must be
+        called with the shard lock held.
+        """
+        shard.counters = {key: counter for key, counter in shard.counters.items() if counter[0] >= index - 1}
+        if len(shard.counters) >= self.max_keys:
+            # Everything is recent: start over rather than grow without bound.
+            shard.counters.clear()
+
+    def _sync(self, shard: _Shard, key: str, index: int, unsynced: int):
+        """
+        Add the key's unsynced hits to the cache and adopt the global count.
+        """
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        cache_key = f'{CACHE_KEY_PREFIX}.{self.window}.{digest}.{index}'
+        try:
+            cache = caches[self.cache_alias]
+            cache.add(cache_key, 0, int(2 * self.window) + 1)
+            total = cache.incr(cache_key, unsynced)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(f"Rate limit cache unavailable: {e}")
+            return
+        with shard.lock:
+            counter = shard.counters.get(key)
+            if counter is not None and counter[0] == index:
+                # Hits recorded during the cache call are still to be synced.
+                counter[3] -= unsynced
+                counter[1] = max(counter[1], total + counter[3])
+
+
+def get_rate_limiter(limit: int, window: float, cache_alias=None) -> SlidingWindowLimiter:
+    """
+    Get the limiter shared by every step with the same limit, window and cache.
+    """
+    key = (limit, window, cache_alias)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = SlidingWindowLimiter(limit, window, cache_alias)
+                _limiters[key] = limiter
+    return limiter
+
+
+def clear_rate_limiters():
+    """
+    Drop all shared limiters and their counters.
+    """
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,256 @@
+"""
+Risk-score thresholds and bounded reuse of low-risk client verdicts.
+
+Enterprise assessments return a risk score from 0.0 (likely a bot) to 1.0
+(likely a human) next to the token validity. With the RECAPTCHA_RISK_POLICY
+setting, RiskPolicy:
+
+* rejects valid tokens whose score is below ``min_score``;
+* remembers clients whose assessment scored at least ``low_risk_score``, so
+  their next ``client_skips`` registrations within ``client_ttl`` seconds are
+  accepted without an assessment. The client is then assessed again, and
+  remembered again if it still scores low-risk.
+
+Skipping never stands in for the token checks that don't need Google: the
+verifier only skips the assessment of a token that passed the prescreen and
+is bound to its registration by the replay check (RECAPTCHA_TOKEN_PRESCREEN),
+so a remembered client can't register with garbage or reused tokens.
+
+Clients are fingerprinted by their forwarded IP address and configured
+platform, and only a hash of the fingerprint is stored. Only confidently human
+traffic is remembered; uncertain and failed assessments are never reused.
+Client verdicts use the same two tiers as token verdicts (see
+edx_filters_pipelines.auth.verdicts), and skips are counted in the shared
+cache so that the bound holds across app nodes.
+
+Enable with e.g. ``RECAPTCHA_RISK_POLICY = {}`` for the defaults in
+DEFAULT_RISK_POLICY.
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from edx_filters_pipelines.auth.verdicts import Verdict, VerdictCache
+
+CACHE_KEY_PREFIX = 'edx_filters_pipelines.recaptcha.client'
+
+# Defaults of the RECAPTCHA_RISK_POLICY setting. Leave the setting unset or
+# None to only check token validity.
+DEFAULT_RISK_POLICY = {
+    # Valid tokens scoring below this are rejected.
+    'min_score': 0.5,
+    # Clients scoring at least this are remembered for client_ttl seconds.
+    # None disables reuse.
+    'low_risk_score': 0.9,
+    'client_ttl': 300,
+    # Registrations of a remembered client accepted without an assessment
+    # before it is assessed again. 0 disables skipping.
+    'client_skips': 2,
+    # Client verdicts kept in process.
+    'local_size': 10_000,
+    # Django cache shared between app nodes, or None for in-process only.
+    'cache_alias': 'default',
+}
+
+
+class ClientVerdictCache(VerdictCache):
+    """
+    Two-tier cache of low-risk verdicts by client fingerprint and site key.
+
+    Unlike token verdicts, client verdicts may outlive a token. They are all
+    valid, and bound to the client they were remembered for. Each one comes
+    with a count of the registrations it was used for.
+    """
+
+    def __init__(self, ttl: int, local_size: int, cache_alias: Optional[str]):
+        super().__init__(ttl, local_size, cache_alias, cache_valid=True)
+        self.ttl = ttl
+        # Uses of the verdicts, when there is no shared cache to count them in.
+        self._uses = OrderedDict()
+
+    @staticmethod
+    def make_key(token: str, site_key: str) -> str:
+        """
+        Build the cache key for a client fingerprint, passed as ``token``.
+        """
+        digest = hashlib.sha256(f'{site_key}\0{token}'.encode()).hexdigest()
+        return f'{CACHE_KEY_PREFIX}.{digest}'
+
+    def reset_uses(self, client: str, site_key: str):
+        """
+        Start counting the uses of a newly remembered verdict from zero.
+        """
+        key = f'{self.make_key(client, site_key)}.uses'
+        if self.cache_alias:
+            self._shared_call('set', key, 0, self.ttl)
+            return
+        with self._lock:
+            self._uses[key] = 0
+            self._uses.move_to_end(key)
+            while len(self._uses) > self.local_size:
+                self._uses.popitem(last=False)
+
+    async def areset_uses(self, client: str, site_key: str):
+        """
+        Like reset_uses, without blocking the event loop on the shared cache.
+        """
+        if not self.cache_alias:
+            self.reset_uses(client, site_key)
+            return
+        await self._ashared_call('aset', f'{self.make_key(client, site_key)}.uses', 0, self.ttl)
+
+    def count_use(self, client: str, site_key: str) -> Optional[int]:
+        """
+        Count a use of the verdict of the client.
+
+        Returns:
+            int: The number of uses so far, or None if they can't be counted
+        """
+        key = f'{self.make_key(client, site_key)}.uses'
+        if not self.cache_alias:
+            with self._lock:
+                if key not in self._uses:
+                    return None
+                self._uses[key] += 1
+                return self._uses[key]
+        try:
+            # incr never wraps or clamps, unlike decr on memcached.
+            return caches[self.cache_alias].incr(key)
+        except ValueError:
+            # The count expired or was evicted.
+            return None
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(f"reCAPTCHA client verdict cache unavailable: {e}")
+            return None
+
+    async def acount_use(self, client: str, site_key: str) -> Optional[int]:
+        """
+        Like count_use, without blocking the event loop on the shared cache.
+        """
+        if not self.cache_alias:
+            return self.count_use(client, site_key)
+        key = f'{self.make_key(client, site_key)}.uses'
+        try:
+            return await caches[self.cache_alias].aincr(key)
+        except ValueError:
+            return None
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(f"reCAPTCHA client verdict cache unavailable: {e}")
+            return None
+
+
+class RiskPolicy:
+    """
+    Decides assessments from their risk score and remembers low-risk clients.
+    """
+
+    def __init__(self, min_score: float = 0.5, low_risk_score: Optional[float] = 0.9, client_ttl: int = 300,
+                 local_size: int = 10_000, cache_alias: Optional[str] = 'default', client_skips: int = 2):
+        """
+        Initialize the policy.
+
+        Args:
+            min_score: Score below which valid tokens are rejected
+            low_risk_score: Score from which a client is remembered, or
+                None to never remember one
+            client_ttl: Seconds a low-risk client is remembered
+            local_size: Number of client verdicts kept in process
+            cache_alias: Django cache used as the shared tier, or None for
+                local only
+            client_skips: Registrations of a remembered client accepted
+                without an assessment before it is assessed again
+        """
+        self.min_score = min_score
+        self.low_risk_score = low_risk_score
+        self.client_skips = client_skips
+        self.client_verdicts = ClientVerdictCache(client_ttl, local_size, cache_alias)
+
+    def is_acceptable(self, score: float) -> bool:
+        """
+        Return whether a valid token with this score passes.
+        """
+        return score >= self.min_score
+
+    def is_low_risk(self, score: float) -> bool:
+        """
+        Return whether a client with this score is remembered.
+        """
+        return self.low_risk_score is not None and score >= self.low_risk_score
+
+    @property
+    def skips_clients(self) -> bool:
+        """
+        Whether remembered clients may skip assessments at all.
+        """
+        return self.low_risk_score is not None and self.client_skips > 0
+
+    def claim_client_skip(self, client: str, site_key: str) -> Optional[Verdict]:
+        """
+        Use up one skip of the low-risk verdict remembered for the client.
+
+        Returns:
+            Verdict: The verdict, or None if the client has to be assessed
+        """
+        if not self.skips_clients:
+            return None
+        verdict = self.client_verdicts.get(client, site_key, client)
+        if verdict is None:
+            return None
+        uses = self.client_verdicts.count_use(client, site_key)
+        return verdict if uses is not None and uses <= self.client_skips else None
+
+    async def aclaim_client_skip(self, client: str, site_key: str) -> Optional[Verdict]:
+        """
+        Like claim_client_skip, without blocking the event loop on the cache.
+        """
+        if not self.skips_clients:
+            return None
+        verdict = await self.client_verdicts.aget(client, site_key, client)
+        if verdict is None:
+            return None
+        uses = await self.client_verdicts.acount_use(client, site_key)
+        return verdict if uses is not None and uses <= self.client_skips else None
+
+    def remember_client(self, client: str, site_key: str, score: float) -> bool:
+        """
+        Remember the client if its score is low-risk.
+
+        Returns:
+            bool: True if the client's next registrations may skip their
+                assessment
+        """
+        if not self.is_low_risk(score) or not self.skips_clients:
+            return False
+        # Reset the count first, so the new verdict is never seen with an
+        # exhausted count.
+        self.client_verdicts.reset_uses(client, site_key)
+        self.client_verdicts.set(client, site_key, True, score=score, owner=client)
+        return True
+
+    async def aremember_client(self, client: str, site_key: str, score: float) -> bool:
+        """
+        Like remember_client, without blocking the event loop on the cache.
+        """
+        if not self.is_low_risk(score) or not self.skips_clients:
+            return False
+        await self.client_verdicts.areset_uses(client, site_key)
+        await self.client_verdicts.aset(client, site_key, True, score=score, owner=client)
+        return True
+
+
+def create_risk_policy() -> Optional[RiskPolicy]:
+    """
+    Create a risk policy from settings.
+
+    Returns:
+        RiskPolicy: Configured policy, or None if RECAPTCHA_RISK_POLICY is not
+            set
+    """
+    config = getattr(settings, 'RECAPTCHA_RISK_POLICY', None)
+    if config is None:
+        return None
+    return RiskPolicy(**{**DEFAULT_RISK_POLICY, **config})
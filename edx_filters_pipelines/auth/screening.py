@@ -0,0 +1,127 @@
+"""
+Bulk screening of existing usernames against forbidden terms.
+
+After terms are added to a forbidden list, the accounts registered before the
+change may already match them. screen_usernames() checks any number of
+usernames with the matchers PreventForbiddenUsernameRegistration uses, without
+raising per username:
+
+    for username, term in screen_usernames(usernames, terms=['admin']):
+        ...
+
+Usernames are consumed lazily in chunks and spread over a pool of worker
+processes, each compiling the terms once (or mapping a term file, whose pages
+they all share). At most a few chunks per worker are in flight, so memory use
+doesn't depend on how many usernames there are, and matches are yielded in
+input order as chunks complete.
+
+The screen_forbidden_usernames management command wraps this for the User table
+or a file of usernames.
+"""
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+from edx_filters_pipelines.auth.matcher import get_forbidden_term_matcher
+from edx_filters_pipelines.auth.termfile import MAGIC, MappedTermMatcher, read_terms
+
+DEFAULT_CHUNK_SIZE = 10_000
+# Chunks submitted per worker ahead of the one being collected.
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+_worker_matchers: Optional[list] = None
+
+
+def get_screening_matchers(terms: Sequence[str] = (), fold: bool = True, term_file: Optional[str] = None) -> list:
+    """
+    Get the matchers for inline terms and an optional term file, by priority.
+
+    A text term file is read and checked after the inline terms, like a
+    compiled one.
+    """
+    terms = list(terms)
+    matchers = []
+    if term_file:
+        with open(term_file, 'rb') as f:
+            is_term_file = f.read(len(MAGIC)) == MAGIC
+        if not is_term_file:
+            with open(term_file, encoding='utf-8') as f:
+                terms += read_terms(f)
+            term_file = None
+    if terms:
+        matchers.append(get_forbidden_term_matcher(terms, fold))
+    if term_file:
+        # Mapped directly, so an invalid file fails the screening instead of
+        # matching nothing.
+        matchers.append(MappedTermMatcher(term_file))
+    return matchers
+
+
+def screen_chunk(usernames: Sequence[str], matchers: list) -> list:
+    """
+    Return the (username, term) pairs of the usernames with a forbidden term.
+    """
+    matches = []
+    for username in usernames:
+        candidate = str(username).strip()
+        term = next(filter(None, (matcher.find(candidate) for matcher in matchers)), None)
+        if term:
+            matches.append((username, term))
+    return matches
+
+
+def _init_worker(terms: Sequence[str], fold: bool, term_file: Optional[str]):
+    global _worker_matchers  # pylint: disable=global-statement
+    _worker_matchers = get_screening_matchers(terms, fold, term_file)
+
+
+def _screen_worker_chunk(usernames: list) -> list:
+    return screen_chunk(usernames, _worker_matchers)
+
+
+def _chunks(usernames: Iterable[str], chunk_size: int) -> Iterator[list]:
+    iterator = iter(usernames)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def screen_usernames(usernames: Iterable[str], terms: Sequence[str] = (), fold: bool = True,
+                     term_file: Optional[str] = None, processes: Optional[int] = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[str, str]]:
+    """
+    Find the usernames that contain a forbidden term.
+
+    Args:
+        usernames: Usernames to check, e.g. a file or a queryset iterator.
+            Consumed lazily.
+        terms: Forbidden terms, in priority order
+        fold: Compare confusable skeletons instead of lowercased text
+        term_file: Optional text or compiled term file checked after ``terms``
+        processes: Number of worker processes; defaults to the CPU count, 1
+            screens in process
+        chunk_size: Usernames handed to a worker at once
+
+    Yields:
+        tuple: (username, term) for every matching username, in input order
+    """
+    processes = processes or os.cpu_count() or 1
+    chunks = _chunks(usernames, chunk_size)
+    if processes == 1:
+        matchers = get_screening_matchers(terms, fold, term_file)
+        for chunk in chunks:
+            yield from screen_chunk(chunk, matchers)
+        return
+
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(list(terms), fold, term_file)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_screen_worker_chunk, chunk))
+            if len(pending) >= processes * CHUNKS_IN_FLIGHT_PER_WORKER:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,212 @@
+"""
+Shadow-mode reCAPTCHA verification.
+
+Before enforcing reCAPTCHA, VerifyReCaptchaToken can run in shadow mode (its
+"shadow_mode" configuration): registrations go through right away and their
+tokens are assessed on a background executor, only to record what the verdict
+would have been and how long it took.
+
+The executor is bounded (RECAPTCHA_SHADOW_MAX_WORKERS threads and
+RECAPTCHA_SHADOW_MAX_PENDING queued assessments). Tokens arriving while it is
+full are dropped and counted, so a slow or failing Enterprise API can never
+back up the web workers. Outcomes and latencies are kept in the process-wide
+ShadowStats returned by get_shadow_stats(), and each verdict is also emitted as
+a ``recaptcha.shadow_verdict`` audit event. Assessments that could not be made
+(open circuit, API error, timeout) are counted as fallbacks, not as verdicts.
+
+Shadow mode never affects the registration: errors raised while queueing a
+token are logged and counted, and the registration goes through.
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from edx_filters_pipelines.audit import emit
+from edx_filters_pipelines.auth.utils import get_client_fingerprint, resolve_recaptcha_platform
+from edx_filters_pipelines.executor import BoundedExecutor
+from edx_filters_pipelines.instrumentation import OUTCOME_FALLBACK, recorded_outcome
+
+DEFAULT_SHADOW_MAX_WORKERS = 4
+DEFAULT_SHADOW_MAX_PENDING = 32
+SHADOW_SETTINGS = frozenset({'RECAPTCHA_SHADOW_MAX_WORKERS', 'RECAPTCHA_SHADOW_MAX_PENDING'})
+
+SHADOW_VALID = 'valid'
+SHADOW_INVALID = 'invalid'
+# The verifier fell back to its configured result instead of an assessment.
+SHADOW_FALLBACK = 'fallback'
+SHADOW_DROPPED = 'dropped'
+SHADOW_SKIPPED = 'skipped'
+SHADOW_ERROR = 'error'
+
+# Upper bounds in seconds of the latency histogram; the last one is unbounded.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_shadow_executor = None
+_shadow_executor_lock = threading.Lock()
+
+
+class ShadowStats:
+    """
+    Counts of shadow verification outcomes and a histogram of their latencies.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def record(self, outcome: str, latency: Optional[float] = None):
+        """
+        Count an outcome, and the latency of its assessment if there was one.
+        """
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+            if latency is not None:
+                self._latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+                self._latency_count += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+
+    def snapshot(self) -> dict:
+        """
+        Return the counts recorded so far.
+
+        Returns:
+            dict: Outcome counts, and latency count, mean, max and histogram
+                (bucket upper bound: count)
+        """
+        with self._lock:
+            count = self._latency_count
+            return {
+                'outcomes': dict(self._outcomes),
+                'latency': {
+                    'count': count,
+                    'mean': self._latency_total / count if count else 0.0,
+                    'max': self._latency_max,
+                    'buckets': dict(zip(LATENCY_BUCKETS + (float('inf'),), self._latency_buckets)),
+                },
+            }
+
+    def clear(self):
+        """
+        Forget everything recorded.
+        """
+        with self._lock:
+            self._outcomes = {}
+            self._latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+            self._latency_count = 0
+            self._latency_total = 0.0
+            self._latency_max = 0.0
+
+
+_shadow_stats = ShadowStats()
+
+
+def get_shadow_stats() -> ShadowStats:
+    """
+    Get the shadow verification stats of this process.
+    """
+    return _shadow_stats
+
+
+def get_shadow_executor() -> BoundedExecutor:
+    """
+    Get the executor that runs shadow assessments, creating it on first use.
+    """
+    global _shadow_executor  # pylint: disable=global-statement
+    if _shadow_executor is None:
+        with _shadow_executor_lock:
+            if _shadow_executor is None:
+                _shadow_executor = BoundedExecutor(
+                    max_workers=getattr(settings, 'RECAPTCHA_SHADOW_MAX_WORKERS', DEFAULT_SHADOW_MAX_WORKERS),
+                    max_pending=getattr(settings, 'RECAPTCHA_SHADOW_MAX_PENDING', DEFAULT_SHADOW_MAX_PENDING),
+                    thread_name_prefix='recaptcha-shadow',
+                )
+    return _shadow_executor
+
+
+def reset_shadow_executor():
+    """
+    Shut down the shadow executor so the next use builds it from settings.
+    """
+    global _shadow_executor  # pylint: disable=global-statement
+    with _shadow_executor_lock:
+        executor, _shadow_executor = _shadow_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def _shadow_verify(verifier, token: str, site_key: str, client: Optional[str], submitted_at: float):
+    """
+    Assess a token in the background and record what the verdict would be.
+    """
+    start = time.perf_counter()
+    try:
+        with recorded_outcome('shadow') as timing:
+            valid = verifier.verify_token(token, site_key, client)
+    except Exception:  # pylint: disable=broad-except
+        _shadow_stats.record(SHADOW_ERROR)
+        emit('recaptcha.shadow_verdict', outcome=SHADOW_ERROR)
+        raise
+    end = time.perf_counter()
+    if timing.outcome == OUTCOME_FALLBACK:
+        outcome = SHADOW_FALLBACK
+    else:
+        outcome = SHADOW_VALID if valid else SHADOW_INVALID
+    _shadow_stats.record(outcome, end - start)
+    emit(
+        'recaptcha.shadow_verdict',
+        outcome=outcome,
+        latency_ms=round((end - start) * 1000, 1),
+        queued_ms=round((start - submitted_at) * 1000, 1),
+    )
+
+
+def start_shadow_verification(token: str) -> bool:
+    """
+    Queue the token of the current registration for a shadow assessment.
+
+    The site key and verifier are resolved on the request thread, where the
+    platform and SSO state of the registration are known. Nothing is queued if
+    verification would be skipped, and the token is dropped if the executor is
+    full. Errors (e.g. missing credentials when the verifier is built) are
+    logged and counted, never raised.
+
+    Args:
+        token: The reCAPTCHA token to assess
+
+    Returns:
+        bool: True if an assessment was queued
+    """
+    try:
+        site_key, verifier = resolve_recaptcha_platform() or (None, None)
+        if verifier is None:
+            _shadow_stats.record(SHADOW_SKIPPED)
+            return False
+        future = get_shadow_executor().try_submit(
+            _shadow_verify, verifier, token, site_key, get_client_fingerprint(), time.perf_counter()
+        )
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error(f"Error starting shadow reCAPTCHA verification: {e}", exc_info=True)
+        _shadow_stats.record(SHADOW_ERROR)
+        emit('recaptcha.shadow_verdict', outcome=SHADOW_ERROR)
+        return False
+    if future is None:
+        _shadow_stats.record(SHADOW_DROPPED)
+        emit('recaptcha.shadow_verdict', outcome=SHADOW_DROPPED)
+        return False
+    return True
+
+
+@receiver(setting_changed)
+def _reset_shadow_executor_on_setting_changed(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Rebuild the executor when its settings change.
+    """
+    if setting in SHADOW_SETTINGS:
+        reset_shadow_executor()
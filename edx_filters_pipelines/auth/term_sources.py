@@ -0,0 +1,260 @@
+"""
+Forbidden term lists that are reloaded while the process runs.
+
+PreventForbiddenUsernameRegistration can read its terms from a watched source
+instead of settings, so the list can change without a deploy:
+
+* a file, either a text file with one term per line or a term file built with
+  edx_filters_pipelines.auth.termfile, reloaded when it is replaced or
+  modified;
+* a Django cache key, reloaded when the version stamp stored next to it
+  changes. Publish a new list with publish_forbidden_terms().
+
+Sources are checked at most every ``interval`` seconds, from a background
+thread. When the version changed, the new matcher is built in that thread and
+swapped in with a single assignment, so registrations keep matching against the
+previous list until the new one is ready and never wait for a rebuild. Only the
+first load of a source is made inline. If it fails, the error is logged, the
+source matches nothing, and it is loaded again at the next check.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from django.core.cache import caches
+from django.db import close_old_connections
+
+from edx_filters_pipelines.auth.matcher import ForbiddenTermMatcher
+from edx_filters_pipelines.auth.termfile import MAGIC, MappedTermMatcher, read_terms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELOAD_INTERVAL = 30
+# Version of a source whose first load failed; differs from every real version.
+_NOT_LOADED = object()
+
+_reloading_matchers: dict = {}
+_reloading_matchers_lock = threading.Lock()
+
+
+class TermSource(ABC):
+    """
+    Watched source of forbidden terms.
+    """
+
+    @abstractmethod
+    def version(self):
+        """
+        Return a value that changes whenever the terms change.
+        """
+
+    @abstractmethod
+    def load(self, fold: bool):
+        """
+        Read the terms and return a matcher for them.
+        """
+
+
+class FileTermSource(TermSource):
+    """
+    Terms read from a text file or a compiled term file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return f'<FileTermSource {self.path}>'
+
+    def version(self):
+        """
+        Return the inode, size and modification time of the file.
+        """
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def load(self, fold: bool):
+        """
+        Map a compiled term file, or compile the terms of a text file.
+
+        The folding of compiled term files is chosen when they are built.
+        """
+        with open(self.path, 'rb') as f:
+            is_term_file = f.read(len(MAGIC)) == MAGIC
+        if is_term_file:
+            return MappedTermMatcher(self.path)
+        with open(self.path, encoding='utf-8') as f:
+            return ForbiddenTermMatcher(read_terms(f), fold)
+
+
+class CacheTermSource(TermSource):
+    """
+    Terms stored in a Django cache under ``key``, with a version stamp under
+    ``key.version``.
+    """
+
+    def __init__(self, key: str, cache_alias: str = 'default'):
+        self.key = key
+        self.cache_alias = cache_alias
+
+    def __repr__(self):
+        return f'<CacheTermSource {self.cache_alias}:{self.key}>'
+
+    def version(self):
+        """
+        Return the version stamp stored next to the terms.
+        """
+        return caches[self.cache_alias].get(f'{self.key}.version')
+
+    def load(self, fold: bool):
+        """
+        Compile the terms stored in the cache. A missing list counts as empty.
+        """
+        return ForbiddenTermMatcher(caches[self.cache_alias].get(self.key) or [], fold)
+
+
+def publish_forbidden_terms(terms, key: str, cache_alias: str = 'default') -> str:
+    """
+    Store a forbidden term list for CacheTermSource and bump its version.
+
+    Args:
+        terms: Forbidden terms, in priority order
+        key: Cache key the steps are configured with
+        cache_alias: Django cache the steps are configured with
+
+    Returns:
+        str: The new version stamp
+    """
+    cache = caches[cache_alias]
+    version = uuid.uuid4().hex
+    # Terms are stored before the version, so a reader that sees the new
+    # version sees the new terms.
+    cache.set(key, list(terms), None)
+    cache.set(f'{key}.version', version, None)
+    return version
+
+
+class ReloadingTermMatcher:
+    """
+    Matcher of a TermSource, rebuilt in the background when the source changes.
+    """
+
+    def __init__(self, source: TermSource, fold: bool = True, interval: float = DEFAULT_RELOAD_INTERVAL):
+        """
+        Load the source and build the first matcher.
+
+        Args:
+            source: Where to read the terms from
+            fold: Compare confusable skeletons instead of lowercased text
+            interval: Minimum number of seconds between checks of the source
+        """
+        self.source = source
+        self.fold = fold
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._reloading = False
+        try:
+            version = source.version()
+            # (version, matcher), replaced as a whole so readers always see a
+            # consistent pair.
+            self._current = (version, source.load(fold))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Could not load forbidden terms from %r, retrying in %ss: %s", source, interval, e)
+            self._current = (_NOT_LOADED, ForbiddenTermMatcher([], fold))
+        self._checked_at = time.monotonic()
+
+    @property
+    def version(self):
+        """
+        Version of the source the current matcher was built from.
+
+        None if the source was never loaded.
+        """
+        version = self._current[0]
+        return None if version is _NOT_LOADED else version
+
+    def find(self, text: str) -> Optional[str]:
+        """
+        Return the highest-priority term contained in ``text``, or None.
+        """
+        if time.monotonic() - self._checked_at >= self.interval:
+            self._reload_in_background()
+        return self._current[1].find(text)
+
+    def reload(self) -> bool:
+        """
+        Rebuild the matcher if the source changed.
+
+        Returns:
+            bool: True if a new matcher was swapped in
+        """
+        self._checked_at = time.monotonic()
+        version = self.source.version()
+        if version == self._current[0]:
+            return False
+        self._current = (version, self.source.load(self.fold))
+        logger.info("Reloaded forbidden terms from %r", self.source)
+        return True
+
+    def _reload_in_background(self):
+        """
+        Start a reload, unless one is already running.
+        """
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._background_reload, daemon=True).start()
+
+    def _background_reload(self):
+        """
+        Reload off the request path, keeping the previous matcher on errors.
+        """
+        try:
+            self.reload()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not reload forbidden terms from %r", self.source)
+        finally:
+            self._reloading = False
+            close_old_connections()
+
+
+def _get_reloading_matcher(key: tuple, source_factory, fold: bool, interval: float) -> ReloadingTermMatcher:
+    matcher = _reloading_matchers.get(key)
+    if matcher is None:
+        with _reloading_matchers_lock:
+            matcher = _reloading_matchers.get(key)
+            if matcher is None:
+                matcher = ReloadingTermMatcher(source_factory(), fold, interval)
+                _reloading_matchers[key] = matcher
+    return matcher
+
+
+def get_file_term_matcher(path: str, fold: bool = True,
+                          interval: float = DEFAULT_RELOAD_INTERVAL) -> ReloadingTermMatcher:
+    """
+    Get the shared reloading matcher of a term file or text file.
+    """
+    return _get_reloading_matcher(('file', path, fold, interval), lambda: FileTermSource(path), fold, interval)
+
+
+def get_cache_term_matcher(key: str, cache_alias: str = 'default', fold: bool = True,
+                           interval: float = DEFAULT_RELOAD_INTERVAL) -> ReloadingTermMatcher:
+    """
+    Get the shared reloading matcher of a term list stored in a Django cache.
+    """
+    return _get_reloading_matcher(
+        ('cache', cache_alias, key, fold, interval), lambda: CacheTermSource(key, cache_alias), fold, interval
+    )
+
+
+def clear_reloading_matchers():
+    """
+    Drop the shared reloading matchers, so the next lookup reloads the source.
+    """
+    with _reloading_matchers_lock:
+        _reloading_matchers.clear()
@@ -0,0 +1,288 @@
+"""
+Precompiled forbidden term files, shared between processes with mmap.
+
+Very large reserved-name lists don't belong in OPEN_EDX_FILTERS_CONFIG: every
+worker would parse and hold its own copy of the strings and build its own
+automaton. Instead the list is compiled once into a flat file holding the
+Aho-Corasick automaton of ForbiddenTermMatcher, and every worker maps that file
+read-only. Loading is O(1) whatever the size of the list, and the pages are
+shared through the page cache.
+
+Build a file from a text file with one term per line (blank lines and lines
+starting with "#" are ignored):
+
+    python -m edx_filters_pipelines.auth.termfile reserved.txt reserved.terms
+
+and reference it from the step configuration as "forbidden_usernames_file".
+
+File layout (all integers are little-endian uint32):
+
+    header:       magic, format version, flags, node, edge and term counts
+    edge_starts:  node_count + 1 offsets into the edge arrays
+    fail:         node_count failure links
+    output:       node_count best term index per node (term_count for none)
+    edge_chars:   edge_count code points, sorted within each node
+    edge_targets: edge_count target nodes
+    term_starts:  term_count + 1 offsets into the term text
+    term text:    UTF-8 encoded terms, back to back
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional, Sequence
+
+from edx_filters_pipelines.auth.matcher import ForbiddenTermMatcher, fold_text
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'EFPTERMS'
+FORMAT_VERSION = 1
+FLAG_FOLD = 1
+_HEADER = struct.Struct('<8sIIIII')
+# Seconds before a term file that couldn't be mapped is tried again.
+UNAVAILABLE_RETRY_INTERVAL = 60
+
+_mapped_matchers: dict = {}
+_mapped_matchers_lock = threading.Lock()
+
+
+def _uint32_array(values) -> array:
+    values = array('I', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def write_term_file(terms: Sequence[str], path: str, fold: bool = True):
+    """
+    Compile forbidden terms into a term file.
+
+    The file is written next to ``path`` and renamed over it, so processes that
+    still map the previous version keep reading a consistent automaton.
+
+    Args:
+        terms: Forbidden terms, in priority order
+        path: Path of the file to write
+        fold: Compare confusable skeletons instead of lowercased text
+    """
+    matcher = ForbiddenTermMatcher(terms, fold)
+    goto = matcher._goto  # pylint: disable=protected-access
+
+    edge_starts, edge_chars, edge_targets = [0], [], []
+    for edges in goto:
+        for char in sorted(edges, key=ord):
+            edge_chars.append(ord(char))
+            edge_targets.append(edges[char])
+        edge_starts.append(len(edge_chars))
+
+    encoded_terms = [term.encode() for term in matcher.terms]
+    term_starts = [0]
+    for encoded in encoded_terms:
+        term_starts.append(term_starts[-1] + len(encoded))
+
+    sections = [
+        _HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_FOLD if fold else 0, len(goto), len(edge_chars), len(encoded_terms)),
+        _uint32_array(edge_starts).tobytes(),
+        _uint32_array(matcher._fail).tobytes(),  # pylint: disable=protected-access
+        _uint32_array(matcher._output).tobytes(),  # pylint: disable=protected-access
+        _uint32_array(edge_chars).tobytes(),
+        _uint32_array(edge_targets).tobytes(),
+        _uint32_array(term_starts).tobytes(),
+        b''.join(encoded_terms),
+    ]
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.terms')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.writelines(sections)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class MappedTermMatcher:
+    """
+    ForbiddenTermMatcher backed by a memory-mapped term file.
+
+    Whether terms are folded is decided when the file is built.
+    """
+
+    __slots__ = ('path', 'fold', 'term_count', '_map', '_edge_starts', '_fail', '_output', '_edge_chars',
+                 '_edge_targets', '_term_starts', '_term_text')
+
+    def __init__(self, path: str):
+        """
+        Map a term file.
+
+        Args:
+            path: Path of a file written by write_term_file
+
+        Raises:
+            ValueError: If the file is not a complete term file of a
+                supported version
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{path} is not a forbidden term file")
+        magic, version, flags, node_count, edge_count, term_count = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a forbidden term file of version {FORMAT_VERSION}")
+        self.fold = bool(flags & FLAG_FOLD)
+        self.term_count = term_count
+
+        lengths = (node_count + 1, node_count, node_count, edge_count, edge_count, term_count + 1)
+        # Check before casting: short sections can't be cast, and would
+        # fail every lookup.
+        if len(self._map) < _HEADER.size + 4 * sum(lengths):
+            raise ValueError(f"{path} is truncated")
+        data = memoryview(self._map)
+        offset = _HEADER.size
+        sections = []
+        for length in lengths:
+            section = data[offset:offset + length * 4]
+            if sys.byteorder == 'big':
+                # Pages that need converting can't be shared: copy them.
+                section = array('I', section.tobytes())
+                section.byteswap()
+            else:
+                section = section.cast('I')
+            sections.append(section)
+            offset += length * 4
+        (self._edge_starts, self._fail, self._output, self._edge_chars, self._edge_targets,
+         self._term_starts) = sections
+        self._term_text = data[offset:]
+        if len(self._term_text) != self._term_starts[term_count]:
+            raise ValueError(f"{path} is truncated")
+
+    def normalize(self, text: str) -> str:
+        """
+        Map text to the form that terms and usernames are compared in.
+        """
+        return fold_text(text) if self.fold else text.lower()
+
+    def term(self, index: int) -> str:
+        """
+        Return the term at ``index`` in priority order.
+        """
+        return bytes(self._term_text[self._term_starts[index]:self._term_starts[index + 1]]).decode()
+
+    def find(self, text: str) -> Optional[str]:
+        """
+        Return the highest-priority term contained in ``text``, or None.
+        """
+        edge_starts, fail, output = self._edge_starts, self._fail, self._output
+        edge_chars, edge_targets = self._edge_chars, self._edge_targets
+        best = output[0]
+        node = 0
+        for char in self.normalize(text):
+            if best == 0:
+                break
+            code = ord(char)
+            while True:
+                end = edge_starts[node + 1]
+                edge = bisect_left(edge_chars, code, edge_starts[node], end)
+                if edge < end and edge_chars[edge] == code:
+                    node = edge_targets[edge]
+                    break
+                if not node:
+                    break
+                node = fail[node]
+            if output[node] < best:
+                best = output[node]
+        return self.term(best) if best < self.term_count else None
+
+
+class UnavailableTermFile:
+    """
+    Stand-in for a term file that couldn't be mapped.
+
+    It matches nothing until the file is tried again.
+    """
+
+    __slots__ = ('path', 'retry_at')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.retry_at = time.monotonic() + UNAVAILABLE_RETRY_INTERVAL
+
+    def find(self, text: str) -> Optional[str]:  # pylint: disable=unused-argument
+        """
+        Return None: no term of the file can be matched.
+        """
+        return None
+
+
+def _needs_mapping(matcher) -> bool:
+    return matcher is None or (isinstance(matcher, UnavailableTermFile) and time.monotonic() >= matcher.retry_at)
+
+
+def get_term_file_matcher(path: str):
+    """
+    Get the matcher of a term file, mapping it on first use.
+
+    A file that is missing or invalid is logged and matches nothing, so it
+    can't break every registration. It is tried again every
+    UNAVAILABLE_RETRY_INTERVAL seconds. The system checks in
+    edx_filters_pipelines.checks report it at startup.
+
+    Returns:
+        MappedTermMatcher: The matcher, or an UnavailableTermFile if the file
+            couldn't be mapped
+    """
+    matcher = _mapped_matchers.get(path)
+    if _needs_mapping(matcher):
+        with _mapped_matchers_lock:
+            matcher = _mapped_matchers.get(path)
+            if _needs_mapping(matcher):
+                try:
+                    matcher = MappedTermMatcher(path)
+                except (OSError, ValueError) as e:
+                    logger.error("Could not map forbidden term file %s, its terms are not checked: %s", path, e)
+                    matcher = UnavailableTermFile(path)
+                _mapped_matchers[path] = matcher
+    return matcher
+
+
+def read_terms(lines: Iterable[str]) -> list:
+    """
+    Parse a term list with one term per line, skipping blanks and "#" comments.
+    """
+    terms = []
+    for line in lines:
+        term = line.strip()
+        if term and not term.startswith('#'):
+            terms.append(term)
+    return terms
+
+
+def main(argv=None):
+    """
+    Compile a text file of forbidden terms into a term file.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip())
+    parser.add_argument('source', help="Text file with one term per line, in priority order")
+    parser.add_argument('output', help="Term file to write")
+    parser.add_argument('--no-fold', dest='fold', action='store_false',
+                        help="Only ignore case instead of folding confusable characters")
+    args = parser.parse_args(argv)
+
+    with open(args.source, encoding='utf-8') as f:
+        terms = read_terms(f)
+    write_term_file(terms, args.output, fold=args.fold)
+    print(f"Compiled {len(terms)} terms into {args.output}")
+
+
+if __name__ == '__main__':
+    main()
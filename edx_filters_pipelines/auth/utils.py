@@ -1,164 +1,1335 @@
 """
 reCAPTCHA verification utility using Google Cloud SDK.
+
+The SDK pulls in gRPC and protobuf, so it is only imported when the first
+verifier is built or the first assessment error is handled. Importing this
+module (and the registration pipeline) stays cheap for workers that never
+verify a token.
 """
 
+import asyncio
+import concurrent.futures
+import functools
 import logging
-from typing import Optional
+import random
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TYPE_CHECKING, Iterable, List, Optional
 
+from asgiref.sync import sync_to_async
 from crum import get_current_request
 from django.conf import settings
-from google.cloud import recaptchaenterprise_v1
-from google.api_core import exceptions as google_exceptions
-from google.api_core.client_options import ClientOptions
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from edx_django_utils.ip import get_safest_client_ip
+
+from edx_filters_pipelines.audit import emit
+from edx_filters_pipelines.auth.prescreen import TokenPrescreen, create_token_prescreen
+from edx_filters_pipelines.auth.risk import RiskPolicy, create_risk_policy
+from edx_filters_pipelines.auth.verdicts import VerdictCache, create_verdict_cache
+from edx_filters_pipelines.executor import BoundedExecutor
+from edx_filters_pipelines.instrumentation import (
+    OUTCOME_BLOCKED,
+    OUTCOME_ERROR,
+    OUTCOME_FALLBACK,
+    OUTCOME_PASS,
+    OUTCOME_SKIPPED,
+    mark_outcome,
+    phase,
+)
+from edx_filters_pipelines.platforms import (  # pylint: disable=unused-import
+    CompiledRecaptchaConfig,
+    clear_compiled_recaptcha_config,
+    get_captcha_site_key_by_platform,
+    get_compiled_recaptcha_config,
+    get_known_platform,
+    get_platform_from_request,
+)
+
+if TYPE_CHECKING:
+    from google.api_core.client_options import ClientOptions
 
 IGNORE_VALIDATION_ON_ERROR = True
 
+# Total time one verification may spend on assessment calls, retries included.
+DEFAULT_ASSESSMENT_TIMEOUT = 3.0
+DEFAULT_ASSESSMENT_MAX_ATTEMPTS = 2
+# Bound of the first (full jitter) backoff delay, doubled after each attempt.
+DEFAULT_ASSESSMENT_BACKOFF = 0.1
+# Names of the retried google.api_core exceptions, see get_transient_errors().
+TRANSIENT_ERROR_NAMES = ('ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError')
+
+# Settings that are baked into a RecaptchaVerifier when it is created.
+VERIFIER_SETTINGS = frozenset({
+    'RECAPTCHA_PROJECT_ID',
+    'RECAPTCHA_PRIVATE_KEY',
+    'RECAPTCHA_API_ENDPOINT',
+    'RECAPTCHA_ASSESSMENT_TIMEOUT',
+    'RECAPTCHA_ASSESSMENT_MAX_ATTEMPTS',
+    'RECAPTCHA_ASSESSMENT_BACKOFF',
+    'RECAPTCHA_VERDICT_CACHE_TTL',
+    'RECAPTCHA_VERDICT_CACHE_SIZE',
+    'RECAPTCHA_VERDICT_CACHE_ALIAS',
+    'RECAPTCHA_VERDICT_CACHE_VALID',
+    'RECAPTCHA_CIRCUIT_BREAKER',
+    'RECAPTCHA_TOKEN_PRESCREEN',
+    'RECAPTCHA_RISK_POLICY',
+})
+
+# Defaults of the RECAPTCHA_CIRCUIT_BREAKER setting. Set it to None to disable
+# the breaker.
+DEFAULT_CIRCUIT_BREAKER = {
+    # Open when at least this fraction of the calls in the window failed...
+    'failure_rate_threshold': 0.5,
+    # ...or at least this fraction took longer than slow_call_duration seconds.
+    'slow_call_rate_threshold': 0.8,
+    'slow_call_duration': 2.0,
+    'window': 30.0,
+    # Don't open on fewer calls than this in the window.
+    'minimum_calls': 10,
+    # Seconds to stay open before letting probe calls through.
+    'open_duration': 30.0,
+    'half_open_max_calls': 1,
+    # Result of verifications skipped while the breaker is open.
+    'fail_open': IGNORE_VALIDATION_ON_ERROR,
+}
+
+# Speculative assessments are started by CaptchaForm and picked up by
+# VerifyReCaptchaToken.
+SPECULATIVE_ASSESSMENT_ATTR = '_recaptcha_speculative_assessment'
+DEFAULT_SPECULATIVE_MAX_WORKERS = 4
+DEFAULT_SPECULATIVE_MAX_PENDING = 16
+# Time a speculative assessment may take on top of the verifier budget.
+SPECULATIVE_WAIT_GRACE = 0.5
+SPECULATIVE_SETTINGS = frozenset({'RECAPTCHA_SPECULATIVE_MAX_WORKERS', 'RECAPTCHA_SPECULATIVE_MAX_PENDING'})
+# Settings read on every verification, kept in a RecaptchaSettings snapshot.
+SNAPSHOT_SETTINGS = frozenset({'RECAPTCHA_PROJECT_ID', 'RECAPTCHA_PRIVATE_KEY', 'RECAPTCHA_SITE_KEYS'})
+
+_recaptcha_settings = None
+
+# Bulk verifications fan out over their own pool, so they can't starve
+# speculative assessments.
+DEFAULT_BULK_MAX_WORKERS = 8
+BULK_SETTINGS = frozenset({'RECAPTCHA_BULK_MAX_WORKERS'})
+# Outcome of a bulk verification that missed its deadline.
+OUTCOME_TIMEOUT = 'timeout'
+
+_speculative_executor: Optional[BoundedExecutor] = None
+_speculative_executor_lock = threading.Lock()
+_bulk_executor: Optional[BoundedExecutor] = None
+_bulk_executor_lock = threading.Lock()
+
+_circuit_breaker = None
+_circuit_breaker_lock = threading.Lock()
+_verifiers: dict = {}
+# Async clients can only be used on the event loop they were created on.
+_async_verifiers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_verifiers_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def get_transient_errors() -> tuple:
+    """
+    Get the google.api_core exception classes of retried assessment errors.
+    """
+    from google.api_core import exceptions as google_exceptions  # pylint: disable=import-outside-toplevel
+    return tuple(getattr(google_exceptions, name) for name in TRANSIENT_ERROR_NAMES)
+
+
+def __getattr__(name):
+    """
+    Import the SDK names this module used to expose on first access.
+    """
+    if name == 'recaptchaenterprise_v1':
+        from google.cloud import recaptchaenterprise_v1  # pylint: disable=import-outside-toplevel
+        return recaptchaenterprise_v1
+    if name == 'google_exceptions':
+        from google.api_core import exceptions as google_exceptions  # pylint: disable=import-outside-toplevel
+        return google_exceptions
+    if name == 'TRANSIENT_ERRORS':
+        return get_transient_errors()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def get_platform_from_request():
+
+def get_client_ip() -> Optional[str]:
     """
-    get Mobile-Platform-Identifier header value from request
-    Default to 'web' if header is not present
+    Get the IP address of the current client, as forwarded by trusted proxies.
+
+    Returns:
+        str: The address chosen by edx_django_utils.ip.get_safest_client_ip, or
+            None if there is no current request
     """
     request = get_current_request()
-    return request.headers.get('Mobile-Platform-Identifier', 'web') if request else 'web'
+    return get_safest_client_ip(request) if request else None
 
 
-def get_captcha_site_key_by_platform(platform: str) -> Optional[str]:
+def get_client_fingerprint() -> Optional[str]:
     """
-     Get reCAPTCHA site key based on the platform.
+    Identify the current client by its forwarded IP address and known platform.
+
+    Returns:
+        str: The fingerprint, or None if there is no current request
     """
-    return settings.RECAPTCHA_SITE_KEYS.get(platform, None)
+    client_ip = get_client_ip()
+    if client_ip is None:
+        return None
+    return f"{client_ip}|{get_known_platform()}"
 
 
-class RecaptchaVerifier:
-    """Handle reCAPTCHA verification using Google Cloud SDK."""
+class RecaptchaSettings:
+    """
+    Snapshot of the reCAPTCHA settings read on every verification.
+    """
+
+    __slots__ = ('project_id', 'api_key', 'site_keys', 'verifier_key')
+
+    def __init__(self, project_id: Optional[str], api_key: Optional[str], site_keys: dict):
+        self.project_id = project_id
+        self.api_key = api_key
+        self.site_keys = site_keys
+        # Key of the shared verifiers built from these settings.
+        self.verifier_key = (project_id, api_key)
+
+
+def get_recaptcha_settings() -> RecaptchaSettings:
+    """
+    Get the snapshot of the reCAPTCHA settings, reading them on first use.
+
+    The snapshot is dropped when one of SNAPSHOT_SETTINGS changes.
+    """
+    global _recaptcha_settings  # pylint: disable=global-statement
+    snapshot = _recaptcha_settings
+    if snapshot is None:
+        snapshot = RecaptchaSettings(
+            getattr(settings, 'RECAPTCHA_PROJECT_ID', None),
+            getattr(settings, 'RECAPTCHA_PRIVATE_KEY', None),
+            dict(getattr(settings, 'RECAPTCHA_SITE_KEYS', None) or {}),
+        )
+        _recaptcha_settings = snapshot
+    return snapshot
+
+
+class CircuitBreaker:
+    """
+    Stops calling reCAPTCHA Enterprise while it is failing or slow.
+
+    Outcomes of assessment calls are kept for a sliding time window. Once
+    enough calls in the window failed or were slow, the breaker opens and
+    verifications are decided by the fail_open policy without calling Google.
+    After open_duration seconds it goes half-open and lets a few probe calls
+    through: a successful probe closes it again, a failed one reopens it.
+
+    Each call takes a permit from `allow_request` and hands it back to
+    `record`, so only a probe can close or reopen a half-open breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    # Permit of the calls made while closed.
+    CALL = 'call'
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = DEFAULT_CIRCUIT_BREAKER['failure_rate_threshold'],
+        slow_call_rate_threshold: float = DEFAULT_CIRCUIT_BREAKER['slow_call_rate_threshold'],
+        slow_call_duration: float = DEFAULT_CIRCUIT_BREAKER['slow_call_duration'],
+        window: float = DEFAULT_CIRCUIT_BREAKER['window'],
+        minimum_calls: int = DEFAULT_CIRCUIT_BREAKER['minimum_calls'],
+        open_duration: float = DEFAULT_CIRCUIT_BREAKER['open_duration'],
+        half_open_max_calls: int = DEFAULT_CIRCUIT_BREAKER['half_open_max_calls'],
+        fail_open: bool = DEFAULT_CIRCUIT_BREAKER['fail_open'],
+    ):
+        """
+        Initialize the circuit breaker.
+
+        See DEFAULT_CIRCUIT_BREAKER for the meaning of the arguments.
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.window = window
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.fail_open = fail_open
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = set()
+        # (time, failed, slow) per call, plus running counts of failed and slow
+        # calls.
+        self._calls = deque()
+        self._failures = 0
+        self._slow_calls = 0
+        self._lock = threading.Lock()
 
-    def __init__(self, project_id: str, api_key: Optional[str]):
+    @property
+    def state(self) -> str:
+        """
+        Current state: CLOSED, OPEN or HALF_OPEN.
+        """
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def allow_request(self) -> Optional[object]:
+        """
+        Return a permit for an assessment call if one may be made now.
+
+        Returns:
+            CALL while closed, a new probe permit while half-open, or None
+            if the call may not be made
+        """
+        with self._lock:
+            self._update_state(time.monotonic())
+            if self._state == self.CLOSED:
+                return self.CALL
+            if self._state == self.HALF_OPEN and len(self._probes) < self.half_open_max_calls:
+                probe = object()
+                self._probes.add(probe)
+                return probe
+            return None
+
+    def record(self, failed: bool, duration: float, permit: object = CALL):
+        """
+        Record the outcome of an assessment call.
+
+        While half-open, only the outcome of a probe counts. Calls let through
+        before the breaker opened may finish late and are ignored.
+
+        Args:
+            failed: Whether the call raised an error
+            duration: Seconds the call took, retries included
+            permit: The permit allow_request returned for the call
+        """
+        now = time.monotonic()
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if permit not in self._probes:
+                    return
+                self._probes.discard(permit)
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._close()
+                return
+
+            self._calls.append((now, failed, slow))
+            self._failures += failed
+            self._slow_calls += slow
+            self._prune(now)
+            total = len(self._calls)
+            if self._state == self.CLOSED and total >= self.minimum_calls and (
+                self._failures / total >= self.failure_rate_threshold
+                or self._slow_calls / total >= self.slow_call_rate_threshold
+            ):
+                self._open(now)
+
+    def snapshot(self) -> dict:
+        """
+        Return the state and window statistics, for monitoring.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            self._prune(now)
+            total = len(self._calls)
+            return {
+                'state': self._state,
+                'calls': total,
+                'failure_rate': self._failures / total if total else 0.0,
+                'slow_call_rate': self._slow_calls / total if total else 0.0,
+                'open_for': now - self._opened_at if self._state != self.CLOSED else 0.0,
+            }
+
+    def _update_state(self, now: float):
+        if self._state == self.OPEN and now - self._opened_at >= self.open_duration:
+            self._state = self.HALF_OPEN
+            self._probes.clear()
+            logging.info("reCAPTCHA circuit breaker half-open - probing")
+
+    def _open(self, now: float):
+        if self._state != self.OPEN:
+            logging.warning("reCAPTCHA circuit breaker opened - skipping assessments")
+        self._state = self.OPEN
+        self._opened_at = now
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._calls.clear()
+        self._failures = self._slow_calls = 0
+        logging.info("reCAPTCHA circuit breaker closed")
+
+    def _prune(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window:
+            _, failed, slow = self._calls.popleft()
+            self._failures -= failed
+            self._slow_calls -= slow
+
+
+class BaseRecaptchaVerifier(ABC):
+    """
+    Shared logic of the synchronous and asynchronous reCAPTCHA verifiers.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        api_key: Optional[str],
+        verdict_cache: Optional[VerdictCache] = None,
+        timeout: float = DEFAULT_ASSESSMENT_TIMEOUT,
+        max_attempts: int = DEFAULT_ASSESSMENT_MAX_ATTEMPTS,
+        backoff: float = DEFAULT_ASSESSMENT_BACKOFF,
+        api_endpoint: Optional[str] = None,
+        client=None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        prescreen: Optional[TokenPrescreen] = None,
+        risk_policy: Optional[RiskPolicy] = None,
+    ):
         """
         Initialize the reCAPTCHA verifier.
 
         Args:
             project_id: Google Cloud project ID
             api_key: Optional API key for authentication
+            verdict_cache: Optional cache of verdicts for tokens that were
+                already assessed
+            timeout: Latency budget in seconds for one verification, retries
+                included
+            max_attempts: Maximum number of assessment calls for one
+                verification
+            backoff: Upper bound in seconds of the first jittered delay between
+                attempts
+            api_endpoint: Optional host[:port] to send assessments to instead
+                of Google's endpoint
+            client: Optional ready-made Enterprise client, e.g. for a local
+                stand-in server
+            circuit_breaker: Optional breaker that skips assessments while
+                Google is failing
+            prescreen: Optional local screening that rejects malformed and
+                replayed tokens
+            risk_policy: Optional score thresholds and reuse of low-risk client
+                verdicts
         """
         self.project_id = project_id
+        self.verdict_cache = verdict_cache
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.circuit_breaker = circuit_breaker
+        self.prescreen = prescreen
+        self.risk_policy = risk_policy
+
+        if client is None:
+            from google.api_core.client_options import ClientOptions  # pylint: disable=import-outside-toplevel
+
+            # Use API key authentication
+            client_options = ClientOptions(api_key=api_key, api_endpoint=api_endpoint)
+            client = self.create_client(client_options)
+        self.client = client
+
+    @abstractmethod
+    def create_client(self, client_options: 'ClientOptions'):
+        """
+        Create the Enterprise client used for assessments.
+        """
+
+    def precheck(self, token: str, site_key: str) -> Optional[bool]:
+        """
+        Decide the verification without an assessment call, if possible.
 
-        # Use API key authentication
-        client_options = ClientOptions(api_key=api_key)
-        self.client = recaptchaenterprise_v1.RecaptchaEnterpriseServiceClient(
+        Returns:
+            bool: The verification result, or None if the token has to be
+                assessed
+        """
+        if not site_key or not site_key.strip():
+            logging.error("reCAPTCHA Site key is required")
+            mark_outcome(OUTCOME_FALLBACK)
+            return IGNORE_VALIDATION_ON_ERROR
+
+        if not token or not token.strip():
+            emit('recaptcha.rejected', reason='empty_token')
+            return False
+
+        if self.prescreen is not None and not self.prescreen.is_well_formed(token):
+            emit('recaptcha.rejected', reason='malformed_token', length=len(token))
+            return False
+
+        return None
+
+    def can_skip_assessment(self, client: Optional[str], owner: Optional[str]) -> bool:
+        """
+        Return whether a remembered low-risk client may skip the assessment.
+
+        Only tokens that the prescreen can check (well-formed, and used by
+        this registration only) are ever accepted without an assessment.
+        """
+        return bool(
+            client and owner and self.prescreen is not None
+            and self.risk_policy is not None and self.risk_policy.skips_clients
+        )
+
+    def circuit_permit(self) -> Optional[object]:
+        """
+        Take a circuit breaker permit for the assessment about to be made.
+
+        Returns:
+            The permit to pass to create_assessment, or None if the circuit
+            breaker rejects the assessment
+        """
+        if self.circuit_breaker is None:
+            return CircuitBreaker.CALL
+        permit = self.circuit_breaker.allow_request()
+        if permit is None:
+            emit('recaptcha.circuit_open', fail_open=self.circuit_breaker.fail_open)
+            mark_outcome(OUTCOME_FALLBACK)
+        return permit
+
+    def build_request(self, token: str, site_key: str):
+        """
+        Build the CreateAssessmentRequest for a token.
+        """
+        from google.cloud import recaptchaenterprise_v1  # pylint: disable=import-outside-toplevel
+
+        event = recaptchaenterprise_v1.Event({
+            "token": token,
+            "site_key": site_key,
+        })
+
+        assessment = recaptchaenterprise_v1.Assessment({"event": event})
+        project_name = f"projects/{self.project_id}"
+
+        return recaptchaenterprise_v1.CreateAssessmentRequest({
+            "parent": project_name,
+            "assessment": assessment,
+        })
+
+    def handle_response(self, token: str, site_key: str, response, client: Optional[str] = None,
+                        owner: Optional[str] = None) -> bool:
+        """
+        Cache the verdict of an assessment and return whether the token passes.
+
+        With a risk policy, valid tokens also need an acceptable risk score,
+        and a low-risk score is remembered for the client.
+        """
+        valid, invalid_reason, score = self.judge_response(response)
+        if self.verdict_cache is not None:
+            self.verdict_cache.set(token, site_key, valid, invalid_reason, score, owner)
+
+        if valid and client and self.risk_policy is not None:
+            self.risk_policy.remember_client(client, site_key, score)
+        return valid
+
+    async def ahandle_response(self, token: str, site_key: str, response, client: Optional[str] = None,
+                               owner: Optional[str] = None) -> bool:
+        """
+        Like handle_response, without blocking the event loop on the caches.
+        """
+        valid, invalid_reason, score = self.judge_response(response)
+        if self.verdict_cache is not None:
+            await self.verdict_cache.aset(token, site_key, valid, invalid_reason, score, owner)
+
+        if valid and client and self.risk_policy is not None:
+            await self.risk_policy.aremember_client(client, site_key, score)
+        return valid
+
+    def judge_response(self, response) -> tuple:
+        """
+        Decide an assessment and report it.
+
+        Returns:
+            tuple: (whether the token passes, invalid reason, risk score)
+        """
+        token_valid = response.token_properties.valid
+        invalid_reason = response.token_properties.invalid_reason
+        score = response.risk_analysis.score
+        valid = token_valid and (self.risk_policy is None or self.risk_policy.is_acceptable(score))
+        emit('recaptcha.assessment', valid=valid, token_valid=token_valid, invalid_reason=invalid_reason, score=score)
+        return valid, invalid_reason, score
+
+    @staticmethod
+    def handle_error(error: Exception) -> bool:
+        """
+        Log an error raised by an assessment and return the fallback result.
+        """
+        from google.api_core import exceptions as google_exceptions  # pylint: disable=import-outside-toplevel
+
+        if isinstance(error, google_exceptions.GoogleAPICallError):
+            logging.error(f"Google API error during reCAPTCHA verification: {error}")
+        elif isinstance(error, google_exceptions.RetryError):
+            logging.error(f"Retry limit exceeded for reCAPTCHA verification: {error}")
+        else:
+            logging.error(f"Unexpected error during reCAPTCHA verification: {error}", exc_info=error)
+        mark_outcome(OUTCOME_FALLBACK)
+        return IGNORE_VALIDATION_ON_ERROR
+
+    def retry_delay(self, attempts: int, deadline: float) -> Optional[float]:
+        """
+        Return the delay before the next attempt, or None if there is none.
+
+        Delays use full-jitter exponential backoff, and an attempt is only made
+        if it can start before the latency budget runs out.
+        """
+        delay = random.uniform(0, self.backoff * 2 ** (attempts - 1))
+        if attempts >= self.max_attempts or time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def report_assessment(self, outcome: str, attempts: int, start: float, permit: object = CircuitBreaker.CALL):
+        """
+        Report the outcome, number of attempts and time spent on an assessment.
+        """
+        elapsed = time.monotonic() - start
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(outcome != 'ok', elapsed, permit)
+        emit('recaptcha.assessment_call', outcome=outcome, attempts=attempts, elapsed_ms=round(elapsed * 1000, 1))
+
+
+class RecaptchaVerifier(BaseRecaptchaVerifier):
+    """Handle reCAPTCHA verification using Google Cloud SDK."""
+
+    def create_client(self, client_options: 'ClientOptions'):
+        """
+        Create the synchronous Enterprise client.
+        """
+        from google.cloud import recaptchaenterprise_v1  # pylint: disable=import-outside-toplevel
+
+        return recaptchaenterprise_v1.RecaptchaEnterpriseServiceClient(
             client_options=client_options
         )
 
-    def verify_token(self, token: str, site_key: str) -> bool:
+    def verify_token(self, token: str, site_key: str, client: Optional[str] = None,
+                     owner: Optional[str] = None) -> bool:
         """
         Verify reCAPTCHA token validity.
 
         Args:
             token: The reCAPTCHA token to verify
             site_key: The site key for the reCAPTCHA
+            client: Fingerprint of the client (see get_client_fingerprint), to
+                skip the assessment of a remembered low-risk one
+            owner: Fingerprint of the registration (e.g. its email) a cached
+                valid verdict is bound to
 
         Returns:
             bool: True if token is valid
         """
-        if not site_key or not site_key.strip():
-            logging.error("reCAPTCHA Site key is required")
-            return IGNORE_VALIDATION_ON_ERROR
+        result = self.precheck(token, site_key)
+        if result is not None:
+            return result
 
-        if not token or not token.strip():
-            logging.warning("Empty reCAPTCHA token provided")
-            return False
+        if self.verdict_cache is not None:
+            with phase("verdict_cache"):
+                verdict = self.verdict_cache.get(token, site_key, owner)
+            if verdict is not None:
+                emit('recaptcha.cached_verdict', valid=verdict.valid)
+                return verdict.valid
+
+        if self.can_skip_assessment(client, owner):
+            # The token passed the prescreen in precheck; bind it to its
+            # registration before it can be accepted without an assessment.
+            if is_replayed_token(self, token, owner):
+                return False
+            with phase("client_verdict"):
+                verdict = self.risk_policy.claim_client_skip(client, site_key)
+            if verdict is not None:
+                emit('recaptcha.client_verdict', score=verdict.score)
+                return True
 
         try:
-            # Create assessment request
-            event = recaptchaenterprise_v1.Event({
-                "token": token,
-                "site_key": site_key,
-            })
+            request = self.build_request(token, site_key)
+            # Nothing may fail between taking a half-open probe and
+            # create_assessment, which releases it.
+            permit = self.circuit_permit()
+            if permit is None:
+                return self.circuit_breaker.fail_open
+            with phase("assessment"):
+                response = self.create_assessment(request, permit)
+            return self.handle_response(token, site_key, response, client, owner)
+        except Exception as e:  # pylint: disable=broad-except
+            return self.handle_error(e)
 
-            assessment = recaptchaenterprise_v1.Assessment({"event": event})
-            project_name = f"projects/{self.project_id}"
+    def create_assessment(self, request, permit: object = CircuitBreaker.CALL):
+        """
+        Call create_assessment within the latency budget of the verifier.
 
-            request = recaptchaenterprise_v1.CreateAssessmentRequest({
-                "parent": project_name,
-                "assessment": assessment,
-            })
+        Transient errors are retried with full-jitter exponential backoff as
+        long as attempts remain and the next attempt can start before the
+        budget runs out. Each call is given only what is left of the budget as
+        its timeout.
 
-            response = self.client.create_assessment(request=request)
+        Args:
+            request: The CreateAssessmentRequest to send
+            permit: The circuit breaker permit taken for the assessment
 
-            # Check token validity
-            if response.token_properties.valid:
-                logging.info("reCAPTCHA token verification successful")
-                return True
-            else:
-                invalid_reason = response.token_properties.invalid_reason
-                logging.warning(f"reCAPTCHA token invalid: {invalid_reason}")
-                return False
+        Returns:
+            Assessment: The assessment returned by Google
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        attempts = 0
+        outcome = 'ok'
+        try:
+            while True:
+                attempts += 1
+                try:
+                    return self.client.create_assessment(
+                        request=request, retry=None, timeout=deadline - time.monotonic()
+                    )
+                except get_transient_errors():
+                    delay = self.retry_delay(attempts, deadline)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+        except BaseException as e:
+            # Cancellations and interrupts count as failures too, so a
+            # half-open probe is never mistaken for a success.
+            outcome = type(e).__name__
+            raise
+        finally:
+            self.report_assessment(outcome, attempts, start, permit)
 
-        except google_exceptions.GoogleAPICallError as e:
-            logging.error(f"Google API error during reCAPTCHA verification: {e}")
-            return IGNORE_VALIDATION_ON_ERROR
 
-        except google_exceptions.RetryError as e:
-            logging.error(f"Retry limit exceeded for reCAPTCHA verification: {e}")
-            return IGNORE_VALIDATION_ON_ERROR
+class AsyncRecaptchaVerifier(BaseRecaptchaVerifier):
+    """
+    Handle reCAPTCHA verification using the asyncio Enterprise client.
+
+    The underlying gRPC channel is bound to the event loop it was created on,
+    so use get_async_recaptcha_verifier() to get the verifier for the running
+    loop.
+    """
+
+    def create_client(self, client_options: 'ClientOptions'):
+        """
+        Create the asyncio Enterprise client.
+        """
+        from google.cloud import recaptchaenterprise_v1  # pylint: disable=import-outside-toplevel
 
+        return recaptchaenterprise_v1.RecaptchaEnterpriseServiceAsyncClient(
+            client_options=client_options
+        )
+
+    async def verify_token(self, token: str, site_key: str, client: Optional[str] = None,
+                           owner: Optional[str] = None) -> bool:
+        """
+        Verify reCAPTCHA token validity without blocking the event loop.
+
+        Args:
+            token: The reCAPTCHA token to verify
+            site_key: The site key for the reCAPTCHA
+            client: Fingerprint of the client, see
+                RecaptchaVerifier.verify_token
+            owner: Fingerprint of the registration, see
+                RecaptchaVerifier.verify_token
+
+        Returns:
+            bool: True if token is valid
+        """
+        result = self.precheck(token, site_key)
+        if result is not None:
+            return result
+
+        if self.verdict_cache is not None:
+            with phase("verdict_cache"):
+                verdict = await self.verdict_cache.aget(token, site_key, owner)
+            if verdict is not None:
+                emit('recaptcha.cached_verdict', valid=verdict.valid)
+                return verdict.valid
+
+        if self.can_skip_assessment(client, owner):
+            if await ais_replayed_token(self, token, owner):
+                return False
+            with phase("client_verdict"):
+                verdict = await self.risk_policy.aclaim_client_skip(client, site_key)
+            if verdict is not None:
+                emit('recaptcha.client_verdict', score=verdict.score)
+                return True
+
+        try:
+            request = self.build_request(token, site_key)
+            # Nothing may fail between taking a half-open probe and
+            # create_assessment, which releases it.
+            permit = self.circuit_permit()
+            if permit is None:
+                return self.circuit_breaker.fail_open
+            with phase("assessment"):
+                response = await self.create_assessment(request, permit)
+            return await self.ahandle_response(token, site_key, response, client, owner)
         except Exception as e:  # pylint: disable=broad-except
-            logging.error(f"Unexpected error during reCAPTCHA verification: {e}", exc_info=True)
-            return IGNORE_VALIDATION_ON_ERROR
+            return self.handle_error(e)
+
+    async def create_assessment(self, request, permit: object = CircuitBreaker.CALL):
+        """
+        Await create_assessment within the latency budget of the verifier.
+
+        See RecaptchaVerifier.create_assessment for the retry behavior.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        attempts = 0
+        outcome = 'ok'
+        try:
+            while True:
+                attempts += 1
+                try:
+                    return await self.client.create_assessment(
+                        request=request, retry=None, timeout=deadline - time.monotonic()
+                    )
+                except get_transient_errors():
+                    delay = self.retry_delay(attempts, deadline)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+        except BaseException as e:
+            # Cancellations and interrupts count as failures too, so a
+            # half-open probe is never mistaken for a success.
+            outcome = type(e).__name__
+            raise
+        finally:
+            self.report_assessment(outcome, attempts, start, permit)
 
 
-def create_recaptcha_verifier() -> Optional[RecaptchaVerifier]:
+def create_recaptcha_verifier(verifier_class=RecaptchaVerifier) -> Optional[BaseRecaptchaVerifier]:
     """
     Create a new reCAPTCHA verifier instance.
 
+    Args:
+        verifier_class: RecaptchaVerifier or AsyncRecaptchaVerifier
+
     Returns:
         RecaptchaVerifier: Configured verifier instance, or None if settings missing
 
     """
-    if not hasattr(settings, 'RECAPTCHA_PROJECT_ID') or not settings.RECAPTCHA_PROJECT_ID:
+    recaptcha_settings = get_recaptcha_settings()
+    if not recaptcha_settings.project_id:
         logging.warning("RECAPTCHA_PROJECT_ID setting not configured - skipping reCAPTCHA verification")
         return None
 
-    api_key = getattr(settings, 'RECAPTCHA_PRIVATE_KEY', None)
-    return RecaptchaVerifier(settings.RECAPTCHA_PROJECT_ID, api_key)
+    return verifier_class(
+        recaptcha_settings.project_id,
+        recaptcha_settings.api_key,
+        verdict_cache=create_verdict_cache(),
+        timeout=getattr(settings, 'RECAPTCHA_ASSESSMENT_TIMEOUT', DEFAULT_ASSESSMENT_TIMEOUT),
+        max_attempts=getattr(settings, 'RECAPTCHA_ASSESSMENT_MAX_ATTEMPTS', DEFAULT_ASSESSMENT_MAX_ATTEMPTS),
+        backoff=getattr(settings, 'RECAPTCHA_ASSESSMENT_BACKOFF', DEFAULT_ASSESSMENT_BACKOFF),
+        api_endpoint=getattr(settings, 'RECAPTCHA_API_ENDPOINT', None),
+        circuit_breaker=get_circuit_breaker(),
+        prescreen=create_token_prescreen(),
+        risk_policy=create_risk_policy(),
+    )
+
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """
+    Get the circuit breaker shared by all verifiers of the process.
+
+    Returns:
+        CircuitBreaker: Breaker configured by RECAPTCHA_CIRCUIT_BREAKER, or
+            None if it is disabled
+    """
+    global _circuit_breaker  # pylint: disable=global-statement
+    config = getattr(settings, 'RECAPTCHA_CIRCUIT_BREAKER', {})
+    if config is None:
+        return None
+    if _circuit_breaker is None:
+        with _circuit_breaker_lock:
+            if _circuit_breaker is None:
+                _circuit_breaker = CircuitBreaker(**{**DEFAULT_CIRCUIT_BREAKER, **config})
+    return _circuit_breaker
+
+
+def get_circuit_breaker_state() -> Optional[dict]:
+    """
+    Get the state and window statistics of the shared breaker, for monitoring.
+
+    Returns:
+        dict: See CircuitBreaker.snapshot, or None if the breaker is disabled
+    """
+    breaker = get_circuit_breaker()
+    return breaker.snapshot() if breaker is not None else None
+
+
+def get_recaptcha_verifier() -> Optional[RecaptchaVerifier]:
+    """
+    Get the shared reCAPTCHA verifier for the current settings.
+
+    Building a RecaptchaVerifier sets up a gRPC channel and resolves
+    credentials, so one long-lived verifier is kept per (project_id, api_key)
+    and reused by every registration in the process. The underlying client is
+    thread-safe.
+
+    Returns:
+        RecaptchaVerifier: Shared verifier, or None if settings missing
+    """
+    recaptcha_settings = get_recaptcha_settings()
+    if not recaptcha_settings.project_id:
+        logging.warning("RECAPTCHA_PROJECT_ID setting not configured - skipping reCAPTCHA verification")
+        return None
+
+    key = recaptcha_settings.verifier_key
+    verifier = _verifiers.get(key)
+    if verifier is None:
+        with _verifiers_lock:
+            verifier = _verifiers.get(key)
+            if verifier is None:
+                verifier = create_recaptcha_verifier()
+                _verifiers[key] = verifier
+    return verifier
+
+
+def get_async_recaptcha_verifier() -> Optional[AsyncRecaptchaVerifier]:
+    """
+    Get the shared asyncio reCAPTCHA verifier of the settings and running loop.
+
+    Returns:
+        AsyncRecaptchaVerifier: Shared verifier, or None if settings missing
+    """
+    recaptcha_settings = get_recaptcha_settings()
+    if not recaptcha_settings.project_id:
+        logging.warning("RECAPTCHA_PROJECT_ID setting not configured - skipping reCAPTCHA verification")
+        return None
+
+    key = recaptcha_settings.verifier_key
+    loop = asyncio.get_running_loop()
+    with _verifiers_lock:
+        loop_verifiers = _async_verifiers.setdefault(loop, {})
+        verifier = loop_verifiers.get(key)
+        if verifier is None:
+            verifier = create_recaptcha_verifier(AsyncRecaptchaVerifier)
+            loop_verifiers[key] = verifier
+    return verifier
+
+
+def get_site_key_for_verification() -> Optional[str]:
+    """
+    Get the site key of the current registration, without building a verifier.
+
+    Returns:
+        str: The site key, or None if reCAPTCHA verification should be skipped
+    """
+    if is_sso_registration():
+        emit('recaptcha.skipped', reason='sso')
+        return None
+    site_keys = get_compiled_recaptcha_config().site_keys
+    site_key = site_keys.get(get_platform_from_request())
+    if site_key is None:
+        if site_keys:
+            logging.warning("Could not determine site key for current platform - skipping reCAPTCHA verification")
+        else:
+            logging.warning("RECAPTCHA_SITE_KEYS not configured - skipping reCAPTCHA verification")
+    return site_key
+
+
+def resolve_recaptcha_platform() -> Optional[tuple]:
+    """
+    Get the site key and the shared synchronous verifier of the registration.
+
+    Returns:
+        tuple: (site_key, verifier), or None if reCAPTCHA verification should
+            be skipped. The verifier is None without RECAPTCHA_PROJECT_ID.
+    """
+    site_key = get_site_key_for_verification()
+    if site_key is None:
+        return None
+    return site_key, get_recaptcha_verifier()
+
+
+def clear_recaptcha_verifiers():
+    """
+    Drop the shared verifiers and breaker so the next call builds them anew.
+    """
+    global _circuit_breaker  # pylint: disable=global-statement
+    with _verifiers_lock:
+        _verifiers.clear()
+        _async_verifiers.clear()
+        clear_compiled_recaptcha_config()
+        with _circuit_breaker_lock:
+            _circuit_breaker = None
+
+
+@receiver(setting_changed)
+def _clear_recaptcha_verifiers_on_setting_changed(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the shared verifiers when a setting they are built from changes.
+    """
+    global _recaptcha_settings  # pylint: disable=global-statement
+    if setting in SNAPSHOT_SETTINGS:
+        _recaptcha_settings = None
+    if setting in VERIFIER_SETTINGS:
+        clear_recaptcha_verifiers()
+    if setting in SPECULATIVE_SETTINGS:
+        reset_speculative_executor()
+    if setting in BULK_SETTINGS:
+        reset_bulk_executor()
+
+
+def get_speculative_executor() -> BoundedExecutor:
+    """
+    Get the executor of speculative assessments, creating it on first use.
+    """
+    global _speculative_executor  # pylint: disable=global-statement
+    if _speculative_executor is None:
+        with _speculative_executor_lock:
+            if _speculative_executor is None:
+                _speculative_executor = BoundedExecutor(
+                    max_workers=getattr(settings, 'RECAPTCHA_SPECULATIVE_MAX_WORKERS', DEFAULT_SPECULATIVE_MAX_WORKERS),
+                    max_pending=getattr(settings, 'RECAPTCHA_SPECULATIVE_MAX_PENDING', DEFAULT_SPECULATIVE_MAX_PENDING),
+                    thread_name_prefix='recaptcha-speculative',
+                )
+    return _speculative_executor
+
+
+def reset_speculative_executor():
+    """
+    Shut down the speculative executor so the next use builds it from settings.
+    """
+    global _speculative_executor  # pylint: disable=global-statement
+    with _speculative_executor_lock:
+        executor, _speculative_executor = _speculative_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
 
 
-def verify_recaptcha_token(token: str, verifier: Optional[RecaptchaVerifier] = None) -> bool:
+def start_speculative_verification(token: str, owner: Optional[str] = None) -> bool:
+    """
+    Start assessing the token of the current request in the background.
+
+    The assessment runs on a bounded executor and its future is attached to the
+    request, so that verify_recaptcha_token only has to wait for it. Nothing is
+    started if there is no current request, verification would be skipped or
+    the executor is full.
+
+    Tokens that the prescreen rejects (malformed, or already used by another
+    registration) are left to the pipeline step, which rejects them without
+    spending an assessment.
+
+    Args:
+        token: The reCAPTCHA token to verify
+        owner: Fingerprint of the registration, see get_registration_owner
+
+    Returns:
+        bool: True if an assessment was started
+    """
+    request = get_current_request()
+    if request is None or not token:
+        return False
+    try:
+        site_key, verifier = resolve_recaptcha_platform() or (None, None)
+        if verifier is None:
+            return False
+
+        prescreen = getattr(verifier, 'prescreen', None)
+        if prescreen is not None and (
+            not prescreen.is_well_formed(token) or (owner and prescreen.is_replay(token, owner))
+        ):
+            return False
+
+        future = get_speculative_executor().try_submit(
+            verifier.verify_token, token, site_key, get_client_fingerprint(), owner
+        )
+        if future is None:
+            emit('recaptcha.speculation_skipped', reason='executor_full')
+            return False
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error(f"Error starting speculative reCAPTCHA verification: {e}", exc_info=True)
+        return False
+
+    setattr(request, SPECULATIVE_ASSESSMENT_ATTR, (token, site_key, verifier, owner, future))
+    return True
+
+
+def pop_speculative_verification(token: str, site_key: str, verifier: RecaptchaVerifier,
+                                 owner: Optional[str] = None):
+    """
+    Take the speculative assessment the current request started for this
+    token and registration, if any.
+
+    Returns:
+        Future: Future of the verification result, or None
+    """
+    request = get_current_request()
+    speculation = getattr(request, SPECULATIVE_ASSESSMENT_ATTR, None)
+    if speculation is None:
+        return None
+    delattr(request, SPECULATIVE_ASSESSMENT_ATTR)
+    if speculation[:4] != (token, site_key, verifier, owner):
+        speculation[4].cancel()
+        return None
+    return speculation[4]
+
+
+def wait_for_speculative_verification(future: concurrent.futures.Future, verifier: RecaptchaVerifier) -> bool:
+    """
+    Wait for a verification started by start_speculative_verification.
+    """
+    try:
+        with phase("speculation_wait"):
+            return future.result(timeout=verifier.timeout + SPECULATIVE_WAIT_GRACE)
+    except concurrent.futures.TimeoutError:
+        logging.error("Timed out waiting for speculative reCAPTCHA verification")
+        mark_outcome(OUTCOME_FALLBACK)
+        return IGNORE_VALIDATION_ON_ERROR
+
+
+class TokenVerification:
+    """
+    Result of verifying one token with verify_recaptcha_tokens.
+    """
+
+    __slots__ = ('token', 'valid', 'outcome', 'duration')
+
+    def __init__(self, token: str, valid: bool, outcome: str, duration: float = 0.0):
+        """
+        Initialize the result.
+
+        Args:
+            token: The verified token
+            valid: Whether the token passes, including fallbacks on errors and
+                timeouts
+            outcome: OUTCOME_PASS, OUTCOME_BLOCKED, OUTCOME_SKIPPED,
+                OUTCOME_TIMEOUT or OUTCOME_ERROR
+            duration: Seconds spent verifying the token
+        """
+        self.token = token
+        self.valid = valid
+        self.outcome = outcome
+        self.duration = duration
+
+    def __repr__(self):
+        return f'<TokenVerification valid={self.valid} outcome={self.outcome} duration_ms={self.duration * 1000:.1f}>'
+
+
+def get_bulk_executor() -> BoundedExecutor:
+    """
+    Get the executor that runs bulk verifications, creating it on first use.
+    """
+    global _bulk_executor  # pylint: disable=global-statement
+    if _bulk_executor is None:
+        with _bulk_executor_lock:
+            if _bulk_executor is None:
+                _bulk_executor = BoundedExecutor(
+                    max_workers=getattr(settings, 'RECAPTCHA_BULK_MAX_WORKERS', DEFAULT_BULK_MAX_WORKERS),
+                    thread_name_prefix='recaptcha-bulk',
+                )
+    return _bulk_executor
+
+
+def reset_bulk_executor():
+    """
+    Shut down the bulk executor so the next use builds it from fresh settings.
+    """
+    global _bulk_executor  # pylint: disable=global-statement
+    with _bulk_executor_lock:
+        executor, _bulk_executor = _bulk_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def _timed_verify_token(verifier: RecaptchaVerifier, token: str, site_key: str) -> tuple:
+    start = time.perf_counter()
+    valid = verifier.verify_token(token, site_key)
+    return valid, time.perf_counter() - start
+
+
+def _collect_token_verification(token: str, future: concurrent.futures.Future, deadline: float,
+                                timeout: float) -> TokenVerification:
+    """
+    Wait for a bulk verification until its deadline and describe how it ended.
+    """
+    try:
+        valid, duration = future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        logging.error("Timed out waiting for bulk reCAPTCHA verification")
+        return TokenVerification(token, IGNORE_VALIDATION_ON_ERROR, OUTCOME_TIMEOUT, timeout)
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error(f"Error during bulk reCAPTCHA verification: {e}", exc_info=e)
+        return TokenVerification(token, IGNORE_VALIDATION_ON_ERROR, OUTCOME_ERROR)
+    return TokenVerification(token, valid, OUTCOME_PASS if valid else OUTCOME_BLOCKED, duration)
+
+
+def verify_recaptcha_tokens(tokens: Iterable[str], site_key: Optional[str] = None,
+                            verifier: Optional[RecaptchaVerifier] = None,
+                            timeout: Optional[float] = None) -> List[TokenVerification]:
+    """
+    Verify many reCAPTCHA tokens concurrently, e.g. for bulk account creation.
+
+    Tokens are verified on the shared bulk executor (RECAPTCHA_BULK_MAX_WORKERS
+    threads). The iterable is consumed as workers free up, so a long generator
+    is never buffered ahead of the pool. Each token gets ``timeout`` seconds
+    from when it is handed to a worker; tokens that miss it fall back like
+    verification errors do.
+
+    Args:
+        tokens: The reCAPTCHA tokens to verify
+        site_key: Site key the tokens were issued for. If None, the one of the
+            current request.
+        verifier: Optional verifier instance. If None, uses the shared one for
+            the current settings.
+        timeout: Deadline of each token in seconds. Defaults to the verifier
+            budget plus a grace period.
+
+    Returns:
+        list: One TokenVerification per token, in input order
+    """
+    if site_key is None:
+        site_key, shared_verifier = resolve_recaptcha_platform() or (None, None)
+    else:
+        shared_verifier = get_recaptcha_verifier() if verifier is None else None
+    if verifier is None:
+        verifier = shared_verifier
+    if not site_key or verifier is None:
+        return [TokenVerification(token, True, OUTCOME_SKIPPED) for token in tokens]
+
+    if timeout is None:
+        timeout = verifier.timeout + SPECULATIVE_WAIT_GRACE
+    executor = get_bulk_executor()
+    pending = []
+    for token in tokens:
+        # Blocks while every worker is busy, so the deadline starts when the
+        # work does.
+        future = executor.submit(_timed_verify_token, verifier, token, site_key)
+        pending.append((token, future, time.monotonic() + timeout))
+    return [_collect_token_verification(token, future, deadline, timeout) for token, future, deadline in pending]
+
+
+def get_registration_owner(data) -> str:
+    """
+    Fingerprint the registration a token is submitted with.
+
+    Tells retries of one registration from replays of its token by others.
+
+    Args:
+        data: The registration form data
+    """
+    return str(data.get("email") or data.get("username") or "").strip().lower()
+
+
+def is_replayed_token(verifier, token: str, owner: Optional[str]) -> bool:
+    """
+    Return whether another registration already used the token.
+
+    Uses the prescreen of the verifier, if it has one, and binds a new token to
+    ``owner``. Malformed tokens are left to the verifier to reject.
+    """
+    prescreen = getattr(verifier, 'prescreen', None)
+    if not owner or prescreen is None or not prescreen.is_well_formed(token):
+        return False
+    with phase("replay_check"):
+        replayed = prescreen.is_replay(token, owner)
+    if replayed:
+        emit('recaptcha.rejected', reason='replayed_token')
+    return replayed
+
+
+async def ais_replayed_token(verifier, token: str, owner: Optional[str]) -> bool:
+    """
+    Like is_replayed_token, without blocking the event loop on the cache.
+    """
+    prescreen = getattr(verifier, 'prescreen', None)
+    if not owner or prescreen is None or not prescreen.is_well_formed(token):
+        return False
+    with phase("replay_check"):
+        replayed = await prescreen.ais_replay(token, owner)
+    if replayed:
+        emit('recaptcha.rejected', reason='replayed_token')
+    return replayed
+
+
+def verify_recaptcha_token(token: str, verifier: Optional[RecaptchaVerifier] = None,
+                           owner: Optional[str] = None) -> bool:
     """
     Verify reCAPTCHA token using Google Cloud SDK.
 
     Args:
         token: The reCAPTCHA token to verify
-        verifier: Optional verifier instance. If None, creates a new one.
+        verifier: Optional verifier instance. If None, uses the shared one for
+            the current settings.
+        owner: Fingerprint of the registration (e.g. its email). Cached valid
+            verdicts are only reused for it, and with a prescreen, tokens
+            replayed by another registration are rejected.
 
     Returns:
         bool: True if token is valid or reCAPTCHA is not configured, False otherwise
     """
     try:
-        # Check if reCAPTCHA site keys are configured
-        if is_sso_registration():
-            logging.info("SSO registration detected - skipping reCAPTCHA verification")
+        with phase("config_lookup"):
+            resolved = resolve_recaptcha_platform()
+        if resolved is None:
+            mark_outcome(OUTCOME_SKIPPED)
             return True
-        if not hasattr(settings, 'RECAPTCHA_SITE_KEYS') or not settings.RECAPTCHA_SITE_KEYS:
-            logging.warning("RECAPTCHA_SITE_KEYS not configured - skipping reCAPTCHA verification")
+
+        site_key, shared_verifier = resolved
+        if verifier is None:
+            verifier = shared_verifier
+
+        # No verifier means missing settings, so skip verification
+        if verifier is None:
+            mark_outcome(OUTCOME_SKIPPED)
             return True
 
-        site_key = get_captcha_site_key_by_platform(get_platform_from_request())
+        if is_replayed_token(verifier, token, owner):
+            return False
+
+        speculation = pop_speculative_verification(token, site_key, verifier, owner)
+        if speculation is not None:
+            return wait_for_speculative_verification(speculation, verifier)
+
+        return verifier.verify_token(token, site_key, get_client_fingerprint(), owner)
+
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error(f"Error during reCAPTCHA verification: {e}", exc_info=True)
+        mark_outcome(OUTCOME_FALLBACK)
+        return True  # Return True on errors to not block users
+
+
+async def averify_recaptcha_token(token: str, verifier: Optional[AsyncRecaptchaVerifier] = None,
+                                  owner: Optional[str] = None) -> bool:
+    """
+    Verify reCAPTCHA token using the asyncio Enterprise client.
+
+    Behaves like verify_recaptcha_token, but awaits the assessment instead of
+    blocking the event loop thread.
+
+    Args:
+        token: The reCAPTCHA token to verify
+        verifier: Optional verifier instance. If None, uses the shared one for
+            the running loop.
+        owner: Fingerprint of the registration, see verify_recaptcha_token
+
+    Returns:
+        bool: True if token is valid or reCAPTCHA is not configured, False
+            otherwise
+    """
+    try:
+        with phase("config_lookup"):
+            # Reads the session, which may be stored in the database.
+            site_key = await sync_to_async(get_site_key_for_verification)()
         if not site_key:
-            logging.warning("Could not determine site key for current platform - skipping reCAPTCHA verification")
+            mark_outcome(OUTCOME_SKIPPED)
             return True
 
         if verifier is None:
-            verifier = create_recaptcha_verifier()
+            with phase("verifier_lookup"):
+                verifier = get_async_recaptcha_verifier()
 
         # If verifier creation failed due to missing settings, skip verification
         if verifier is None:
+            mark_outcome(OUTCOME_SKIPPED)
             return True
 
-        return verifier.verify_token(token, site_key)
+        if await ais_replayed_token(verifier, token, owner):
+            return False
+
+        return await verifier.verify_token(token, site_key, get_client_fingerprint(), owner)
 
     except Exception as e:  # pylint: disable=broad-except
         logging.error(f"Error during reCAPTCHA verification: {e}", exc_info=True)
+        mark_outcome(OUTCOME_FALLBACK)
         return True  # Return True on errors to not block users
 
 
@@ -0,0 +1,244 @@
+"""
+Caching of reCAPTCHA assessment verdicts.
+
+Clients resubmit the same registration (double clicks, mobile retries,
+validation round trips), and each resubmission carries the same captcha_token.
+Verdicts are cached for at most the lifetime of a token so those retries don't
+pay for another assessment.
+
+Only invalid verdicts are cached by default: a cached valid verdict would let
+one solved token register any number of accounts, where Google rejects the
+second assessment of a token as a duplicate. With
+RECAPTCHA_VERDICT_CACHE_VALID, valid verdicts are cached too, but bound to the
+registration (its email or username) that was assessed, and only returned to
+that registration.
+
+Two tiers are used: a small in-process LRU in front of the shared Django cache,
+so that a verdict reached on one app node is seen by all of them.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+# reCAPTCHA tokens can only be assessed for two minutes after they are issued.
+TOKEN_LIFETIME = 120
+DEFAULT_LOCAL_SIZE = 1024
+CACHE_KEY_PREFIX = 'edx_filters_pipelines.recaptcha.verdict'
+
+
+class Verdict:
+    """
+    Outcome of an assessment, stored in the cache instead of the full response.
+    """
+
+    __slots__ = ('valid', 'invalid_reason', 'expires_at', 'score', 'owner')
+
+    def __init__(self, valid: bool, invalid_reason: int, expires_at: float, score: Optional[float] = None,
+                 owner: Optional[str] = None):
+        self.valid = valid
+        self.invalid_reason = invalid_reason
+        self.expires_at = expires_at
+        # Risk score of the assessment, None if it wasn't reported.
+        self.score = score
+        # Digest of the registration a valid verdict is bound to.
+        self.owner = owner
+
+    def to_record(self) -> tuple:
+        """
+        Return the compact form stored in the shared cache.
+        """
+        return (self.valid, self.invalid_reason, self.expires_at, self.score, self.owner)
+
+    @classmethod
+    def from_record(cls, record: tuple) -> 'Verdict':
+        """
+        Rebuild a verdict from its shared cache record.
+
+        Records written before scores or owners were stored have neither.
+        """
+        return cls(*record)
+
+
+class VerdictCache:
+    """
+    Two-tier cache of verdicts keyed by a hash of the token and site key.
+    """
+
+    def __init__(self, ttl: int = TOKEN_LIFETIME, local_size: int = DEFAULT_LOCAL_SIZE,
+                 cache_alias: Optional[str] = 'default', cache_valid: bool = False):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Seconds to keep a verdict. Capped at the token lifetime.
+            local_size: Number of verdicts kept in the in-process LRU
+            cache_alias: Django cache used as the shared tier, or None for
+                local only
+            cache_valid: Also cache valid verdicts, bound to their owner
+        """
+        self.ttl = min(ttl, TOKEN_LIFETIME)
+        self.local_size = local_size
+        self.cache_alias = cache_alias
+        self.cache_valid = cache_valid
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(token: str, site_key: str) -> str:
+        """
+        Build the cache key for a token, without storing the token itself.
+        """
+        digest = hashlib.sha256(f'{site_key}\0{token}'.encode()).hexdigest()
+        return f'{CACHE_KEY_PREFIX}.{digest}'
+
+    @staticmethod
+    def digest_owner(owner: str) -> str:
+        """
+        Hash the fingerprint of a registration, so it isn't stored as is.
+        """
+        return hashlib.sha256(owner.encode()).hexdigest()[:32]
+
+    def get(self, token: str, site_key: str, owner: Optional[str] = None) -> Optional[Verdict]:
+        """
+        Return the cached verdict for the token, or None.
+
+        A valid verdict is only returned to the owner it was cached for.
+        """
+        key = self.make_key(token, site_key)
+        verdict = self._get_local(key)
+        if verdict is None:
+            verdict = self._accept_shared(key, self._shared_call('get', key))
+        return self._check_owner(verdict, owner)
+
+    async def aget(self, token: str, site_key: str, owner: Optional[str] = None) -> Optional[Verdict]:
+        """
+        Like get, without blocking the event loop.
+        """
+        key = self.make_key(token, site_key)
+        verdict = self._get_local(key)
+        if verdict is None:
+            verdict = self._accept_shared(key, await self._ashared_call('aget', key))
+        return self._check_owner(verdict, owner)
+
+    def set(self, token: str, site_key: str, valid: bool, invalid_reason: int = 0,
+            score: Optional[float] = None, owner: Optional[str] = None) -> Optional[Verdict]:
+        """
+        Cache the verdict of an assessment.
+
+        Valid verdicts are only cached with cache_valid and a known owner.
+
+        Returns:
+            Verdict: The cached verdict, or None if it isn't cached
+        """
+        verdict = self._make_verdict(valid, invalid_reason, score, owner)
+        if verdict is None:
+            return None
+        key = self.make_key(token, site_key)
+        self._store_local(key, verdict)
+        self._shared_call('set', key, verdict.to_record(), self.ttl)
+        return verdict
+
+    async def aset(self, token: str, site_key: str, valid: bool, invalid_reason: int = 0,
+                   score: Optional[float] = None, owner: Optional[str] = None) -> Optional[Verdict]:
+        """
+        Like set, without blocking the event loop on the shared cache.
+        """
+        verdict = self._make_verdict(valid, invalid_reason, score, owner)
+        if verdict is None:
+            return None
+        key = self.make_key(token, site_key)
+        self._store_local(key, verdict)
+        await self._ashared_call('aset', key, verdict.to_record(), self.ttl)
+        return verdict
+
+    def clear(self):
+        """
+        Drop all verdicts held in process. The shared tier expires on its own.
+        """
+        with self._lock:
+            self._local.clear()
+
+    def _make_verdict(self, valid: bool, invalid_reason: int, score: Optional[float],
+                      owner: Optional[str]) -> Optional[Verdict]:
+        if not valid:
+            return Verdict(False, int(invalid_reason), time.time() + self.ttl, score)
+        if not self.cache_valid or not owner:
+            return None
+        return Verdict(True, int(invalid_reason), time.time() + self.ttl, score, self.digest_owner(owner))
+
+    def _check_owner(self, verdict: Optional[Verdict], owner: Optional[str]) -> Optional[Verdict]:
+        if verdict is None or not verdict.valid:
+            return verdict
+        if owner and verdict.owner == self.digest_owner(owner):
+            return verdict
+        return None
+
+    def _get_local(self, key: str) -> Optional[Verdict]:
+        with self._lock:
+            verdict = self._local.get(key)
+            if verdict is None:
+                return None
+            if verdict.expires_at > time.time():
+                self._local.move_to_end(key)
+                return verdict
+            del self._local[key]
+            return None
+
+    def _accept_shared(self, key: str, record: Optional[tuple]) -> Optional[Verdict]:
+        if record is None:
+            return None
+        verdict = Verdict.from_record(record)
+        if verdict.expires_at <= time.time():
+            return None
+        self._store_local(key, verdict)
+        return verdict
+
+    def _store_local(self, key: str, verdict: Verdict):
+        with self._lock:
+            self._local[key] = verdict
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _shared_call(self, method: str, *args):
+        if not self.cache_alias:
+            return None
+        try:
+            return getattr(caches[self.cache_alias], method)(*args)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(f"reCAPTCHA verdict cache unavailable: {e}")
+            return None
+
+    async def _ashared_call(self, method: str, *args):
+        if not self.cache_alias:
+            return None
+        try:
+            return await getattr(caches[self.cache_alias], method)(*args)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(f"reCAPTCHA verdict cache unavailable: {e}")
+            return None
+
+
+def create_verdict_cache() -> Optional[VerdictCache]:
+    """
+    Create a verdict cache from settings.
+
+    Returns:
+        VerdictCache: Configured cache, or None if RECAPTCHA_VERDICT_CACHE_TTL
+            is 0
+    """
+    ttl = getattr(settings, 'RECAPTCHA_VERDICT_CACHE_TTL', TOKEN_LIFETIME)
+    if not ttl:
+        return None
+    return VerdictCache(
+        ttl=ttl,
+        local_size=getattr(settings, 'RECAPTCHA_VERDICT_CACHE_SIZE', DEFAULT_LOCAL_SIZE),
+        cache_alias=getattr(settings, 'RECAPTCHA_VERDICT_CACHE_ALIAS', 'default'),
+        cache_valid=getattr(settings, 'RECAPTCHA_VERDICT_CACHE_VALID', False),
+    )
@@ -0,0 +1,165 @@
+"""
+Django system checks for the settings read by edx_filters_pipelines.
+
+Registered by EdxFiltersPipelinesConfig, which also refuses to start with any
+of the errors below, so a misconfiguration fails at boot instead of on every
+registration.
+"""
+from numbers import Real
+from typing import Optional
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register  # pylint: disable=redefined-builtin
+
+from edx_filters_pipelines.audit import DEFAULT_AUDIT
+from edx_filters_pipelines.auth.prescreen import DEFAULT_TOKEN_PRESCREEN
+from edx_filters_pipelines.auth.risk import DEFAULT_RISK_POLICY
+from edx_filters_pipelines.auth.termfile import MAGIC, MappedTermMatcher
+from edx_filters_pipelines.auth.utils import DEFAULT_CIRCUIT_BREAKER
+from edx_filters_pipelines.profiling import DEFAULT_PROFILING
+
+REGISTRATION_FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+POSITIVE_NUMBER_SETTINGS = ('RECAPTCHA_ASSESSMENT_TIMEOUT',)
+NON_NEGATIVE_NUMBER_SETTINGS = ('RECAPTCHA_ASSESSMENT_BACKOFF', 'RECAPTCHA_VERDICT_CACHE_TTL')
+POSITIVE_INTEGER_SETTINGS = (
+    'RECAPTCHA_ASSESSMENT_MAX_ATTEMPTS',
+    'RECAPTCHA_VERDICT_CACHE_SIZE',
+    'RECAPTCHA_SPECULATIVE_MAX_WORKERS',
+    'RECAPTCHA_BULK_MAX_WORKERS',
+    'RECAPTCHA_SHADOW_MAX_WORKERS',
+)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+def _check_forbidden_usernames_file(config: dict) -> Optional[str]:
+    """
+    Return why the forbidden_usernames_file of a step can't be used, or None.
+    """
+    path = config.get('forbidden_usernames_file')
+    if not path:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            is_term_file = f.read(len(MAGIC)) == MAGIC
+        if is_term_file:
+            MappedTermMatcher(path)
+    except (OSError, ValueError) as e:
+        return str(e)
+    if not is_term_file and not config.get('forbidden_usernames_reload_interval'):
+        return (f"{path} is not a compiled term file. Compile it with edx_filters_pipelines.auth.termfile, "
+                "or set forbidden_usernames_reload_interval to read it as a text file.")
+    return None
+
+
+@register()
+def check_recaptcha_settings(app_configs=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Check the RECAPTCHA_* settings.
+
+    Returns:
+        list: CheckMessages for every invalid setting
+    """
+    messages = []
+    site_keys = getattr(settings, 'RECAPTCHA_SITE_KEYS', None)
+    if site_keys is not None and not (isinstance(site_keys, dict) and all(
+        isinstance(platform, str) and isinstance(key, str) and key.strip() for platform, key in site_keys.items()
+    )):
+        messages.append(Error(
+            "RECAPTCHA_SITE_KEYS must map Mobile-Platform-Identifier values to non-empty site keys.",
+            obj='RECAPTCHA_SITE_KEYS',
+            id='edx_filters_pipelines.E001',
+        ))
+    elif site_keys and not getattr(settings, 'RECAPTCHA_PROJECT_ID', None):
+        messages.append(Warning(
+            "RECAPTCHA_SITE_KEYS is set but RECAPTCHA_PROJECT_ID is not, so reCAPTCHA tokens won't be verified.",
+            obj='RECAPTCHA_PROJECT_ID',
+            id='edx_filters_pipelines.W001',
+        ))
+
+    for name in POSITIVE_NUMBER_SETTINGS + NON_NEGATIVE_NUMBER_SETTINGS + POSITIVE_INTEGER_SETTINGS:
+        if not hasattr(settings, name):
+            continue
+        value = getattr(settings, name)
+        if name in POSITIVE_INTEGER_SETTINGS:
+            valid, expected = isinstance(value, int) and not isinstance(value, bool) and value >= 1, "an integer >= 1"
+        elif name in POSITIVE_NUMBER_SETTINGS:
+            valid, expected = _is_number(value) and value > 0, "a number > 0"
+        else:
+            valid, expected = _is_number(value) and value >= 0, "a number >= 0"
+        if not valid:
+            messages.append(Error(
+                f"{name} must be {expected}, got {value!r}.", obj=name, id='edx_filters_pipelines.E002'
+            ))
+
+    circuit_breaker = getattr(settings, 'RECAPTCHA_CIRCUIT_BREAKER', {})
+    if circuit_breaker is not None and (
+        not isinstance(circuit_breaker, dict) or not set(circuit_breaker) <= set(DEFAULT_CIRCUIT_BREAKER)
+    ):
+        messages.append(Error(
+            "RECAPTCHA_CIRCUIT_BREAKER must be None or a dict with keys among "
+            f"{', '.join(sorted(DEFAULT_CIRCUIT_BREAKER))}.",
+            obj='RECAPTCHA_CIRCUIT_BREAKER',
+            id='edx_filters_pipelines.E003',
+        ))
+
+    prescreen = getattr(settings, 'RECAPTCHA_TOKEN_PRESCREEN', None)
+    if prescreen is not None and (
+        not isinstance(prescreen, dict) or not set(prescreen) <= set(DEFAULT_TOKEN_PRESCREEN)
+    ):
+        messages.append(Error(
+            "RECAPTCHA_TOKEN_PRESCREEN must be None or a dict with keys among "
+            f"{', '.join(sorted(DEFAULT_TOKEN_PRESCREEN))}.",
+            obj='RECAPTCHA_TOKEN_PRESCREEN',
+            id='edx_filters_pipelines.E005',
+        ))
+
+    risk_policy = getattr(settings, 'RECAPTCHA_RISK_POLICY', None)
+    if risk_policy is not None and (
+        not isinstance(risk_policy, dict) or not set(risk_policy) <= set(DEFAULT_RISK_POLICY)
+    ):
+        messages.append(Error(
+            "RECAPTCHA_RISK_POLICY must be None or a dict with keys among "
+            f"{', '.join(sorted(DEFAULT_RISK_POLICY))}.",
+            obj='RECAPTCHA_RISK_POLICY',
+            id='edx_filters_pipelines.E006',
+        ))
+
+    audit = getattr(settings, 'FILTERS_PIPELINES_AUDIT', {})
+    if audit is not None and (not isinstance(audit, dict) or not set(audit) <= set(DEFAULT_AUDIT)):
+        messages.append(Error(
+            f"FILTERS_PIPELINES_AUDIT must be None or a dict with keys among {', '.join(sorted(DEFAULT_AUDIT))}.",
+            obj='FILTERS_PIPELINES_AUDIT',
+            id='edx_filters_pipelines.E007',
+        ))
+
+    profiling = getattr(settings, 'FILTERS_PIPELINES_PROFILING', None)
+    if profiling is not None and not (
+        isinstance(profiling, dict) and set(profiling) <= set(DEFAULT_PROFILING) and profiling.get('directory')
+    ):
+        messages.append(Error(
+            "FILTERS_PIPELINES_PROFILING must be None or a dict with a directory and keys among "
+            f"{', '.join(sorted(DEFAULT_PROFILING))}.",
+            obj='FILTERS_PIPELINES_PROFILING',
+            id='edx_filters_pipelines.E008',
+        ))
+
+    filters_config = getattr(settings, 'OPEN_EDX_FILTERS_CONFIG', None) or {}
+    problem = _check_forbidden_usernames_file(filters_config.get(REGISTRATION_FILTER_TYPE) or {})
+    if problem:
+        messages.append(Error(
+            f"The forbidden_usernames_file of the registration filter can't be used: {problem}",
+            obj='OPEN_EDX_FILTERS_CONFIG',
+            id='edx_filters_pipelines.E009',
+        ))
+
+    cache_alias = getattr(settings, 'RECAPTCHA_VERDICT_CACHE_ALIAS', 'default')
+    if cache_alias and getattr(settings, 'RECAPTCHA_VERDICT_CACHE_TTL', 1) and cache_alias not in settings.CACHES:
+        messages.append(Error(
+            f"RECAPTCHA_VERDICT_CACHE_ALIAS {cache_alias!r} is not one of the CACHES.",
+            obj='RECAPTCHA_VERDICT_CACHE_ALIAS',
+            id='edx_filters_pipelines.E004',
+        ))
+    return messages
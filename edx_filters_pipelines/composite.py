@@ -0,0 +1,139 @@
+"""
+Composite pipeline step that runs cheap steps before expensive ones.
+
+The order of OPEN_EDX_FILTERS_CONFIG pipelines is whatever operators wrote
+down, so a remote check such as VerifyReCaptchaToken may run before a local one
+that would have rejected the registration anyway. CostOrderedSteps wraps
+several steps and runs them cheapest first; the first step that rejects (by
+raising an OpenEdxFilterException) stops the run, so the more expensive steps
+after it are never paid for.
+
+    OPEN_EDX_FILTERS_CONFIG = {
+        "org.openedx.learning.student.registration.requested.v1": {
+            "pipeline": ["edx_filters_pipelines.composite.CostOrderedSteps"],
+            "steps": [
+                "edx_filters_pipelines.auth.pipelines.registration.VerifyReCaptchaToken",
+                "edx_filters_pipelines.auth.pipelines.registration.PreventForbiddenUsernameRegistration",
+            ],
+            "forbidden_usernames": ["admin", "staff"],
+            "fail_silently": False
+        }
+    }
+
+Every wrapped step gets the same configuration as the composite. A step's cost
+is the ``cost`` attribute of its class (expected seconds per run,
+DEFAULT_STEP_COST if not declared) until it has run MIN_MEASURED_RUNS times in
+the process; from then on the measured average is used, so the order follows
+what the steps actually cost.
+"""
+import threading
+import time
+
+from django.utils.module_loading import import_string
+from openedx_filters import PipelineStep
+
+# Expected seconds per run of steps that don't declare a cost.
+DEFAULT_STEP_COST = 0.01
+# Runs after which the measured cost of a step replaces its declared cost.
+MIN_MEASURED_RUNS = 20
+# Weight of the latest run in the measured cost.
+MEASURED_COST_WEIGHT = 0.05
+
+_measured_costs: dict = {}
+_measured_costs_lock = threading.Lock()
+
+
+def get_step_cost(step_class) -> float:
+    """
+    Get the cost to order a step class by, measured once it has run enough.
+    """
+    runs, average = _measured_costs.get(step_class, (0, 0.0))
+    if runs >= MIN_MEASURED_RUNS:
+        return average
+    return getattr(step_class, 'cost', DEFAULT_STEP_COST)
+
+
+def record_step_cost(step_class, duration: float):
+    """
+    Add a run of a step class to its exponentially weighted average cost.
+    """
+    with _measured_costs_lock:
+        runs, average = _measured_costs.get(step_class, (0, duration))
+        _measured_costs[step_class] = (runs + 1, average + MEASURED_COST_WEIGHT * (duration - average))
+
+
+def clear_step_costs():
+    """
+    Forget all measured costs.
+    """
+    with _measured_costs_lock:
+        _measured_costs.clear()
+
+
+class CostOrderedSteps(PipelineStep):
+    """
+    Pipeline step that runs the steps in its "steps" config, cheapest first.
+
+    Outputs accumulate like in an openedx-filters pipeline: each step is called
+    with the output of the previous ones merged in, and a step returning
+    something other than a dict stops the run. Exceptions raised by a step are
+    not caught, so "fail_silently" applies to the composite as a whole.
+    """
+
+    def get_steps(self) -> list:
+        """
+        Instantiate the configured steps, ordered by cost.
+        """
+        step_classes = [import_string(path) for path in self.extra_config.get("steps", [])]
+        # sorted() is stable: steps of equal cost keep their configured order.
+        step_classes = sorted(step_classes, key=get_step_cost)
+        return [
+            step_class(self.filter_type, self.running_pipeline, **self.extra_config)
+            for step_class in step_classes
+        ]
+
+    def run_filter(self, **kwargs):
+        """
+        Run the steps cheapest first, stopping at the first rejection.
+
+        Like run_pipeline, each step gets the outputs of the previous ones on
+        top of the filter arguments. A step that returns something other than
+        a dict stops the run, and its result is returned as is so the outer
+        pipeline stops too.
+
+        Raises:
+            OpenEdxFilterException: The rejection of the first rejecting step.
+        """
+        accumulated_output = kwargs.copy()
+        for step in self.get_steps():
+            start = time.perf_counter()
+            try:
+                result = step.run_filter(**accumulated_output)
+            finally:
+                record_step_cost(type(step), time.perf_counter() - start)
+            if not isinstance(result, dict):
+                return result
+            accumulated_output.update(result)
+        return accumulated_output
+
+    async def arun_filter(self, **kwargs):
+        """
+        Like run_filter, awaiting the steps that have an `arun_filter`.
+
+        Raises:
+            OpenEdxFilterException: The rejection of the first rejecting step.
+        """
+        accumulated_output = kwargs.copy()
+        for step in self.get_steps():
+            start = time.perf_counter()
+            try:
+                if hasattr(step, 'arun_filter'):
+                    result = await step.arun_filter(**accumulated_output)
+                else:
+                    result = step.run_filter(**accumulated_output)
+            finally:
+                record_step_cost(type(step), time.perf_counter() - start)
+            if not isinstance(result, dict):
+                return result
+            accumulated_output.update(result)
+        return accumulated_output
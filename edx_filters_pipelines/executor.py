@@ -0,0 +1,70 @@
+"""
+Bounded background executor for work started from the request path.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+
+class BoundedExecutor:
+    """
+    Thread pool that limits how much work can be queued.
+
+    ThreadPoolExecutor queues without limit, which lets a slow dependency back
+    up the web workers that submit to it. Here at most
+    ``max_workers + max_pending`` tasks are accepted at a time: `try_submit`
+    refuses anything beyond that and `submit` waits for a free slot.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int = 0, thread_name_prefix: str = ''):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers: Number of worker threads
+            max_pending: Number of tasks that may wait for a free worker
+            thread_name_prefix: Prefix of the worker thread names
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def try_submit(self, fn, *args, **kwargs) -> Optional[Future]:
+        """
+        Schedule ``fn(*args, **kwargs)`` if there is room for it.
+
+        Returns:
+            Future: The future of the task, or None if the executor is full
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        return self._submit(fn, *args, **kwargs)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Schedule ``fn(*args, **kwargs)``, waiting for a free slot.
+        """
+        self._slots.acquire()
+        return self._submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting work and release the worker threads once they are idle.
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Submit to the pool while holding a slot, freed when the task is done.
+        """
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future):  # pylint: disable=unused-argument
+        self._slots.release()
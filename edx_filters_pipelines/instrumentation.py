@@ -0,0 +1,212 @@
+"""
+Timing instrumentation for the pipeline steps in this package.
+
+Decorate `PipelineStep.run_filter` with `timed_step` to record how long each
+run takes, how it ended and how long its sub-phases took. Code running inside a
+step reports sub-phases with `phase()` and a non-default outcome with
+`mark_outcome()`. Code called outside of a step, e.g. on a background thread,
+can collect them with `recorded_outcome()`.
+
+Each finished run is handed to the sinks listed in the
+FILTERS_PIPELINES_TIMING_SINKS setting, as dotted paths to callables that take
+a StepTiming:
+
+    FILTERS_PIPELINES_TIMING_SINKS = [
+        'edx_filters_pipelines.instrumentation.log_step_timing',
+    ]
+
+Sinks run on the request thread, so they should only hand the data off (e.g. to
+a metrics client) and not do I/O of their own. Exceptions raised by sinks are
+logged and otherwise ignored.
+
+Synchronous runs can also be profiled, see edx_filters_pipelines.profiling.
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from openedx_filters.exceptions import OpenEdxFilterException
+
+from edx_filters_pipelines.platforms import get_known_platform
+from edx_filters_pipelines.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_PASS = 'pass'
+OUTCOME_BLOCKED = 'blocked'
+OUTCOME_FALLBACK = 'fallback'
+OUTCOME_SKIPPED = 'skipped'
+OUTCOME_ERROR = 'error'
+# Passed without enforcement, checked in the background (see auth.shadow).
+OUTCOME_SHADOW = 'shadow'
+
+_current_timing = contextvars.ContextVar('edx_filters_pipelines_step_timing', default=None)
+_sinks: Optional[list] = None
+_sinks_lock = threading.Lock()
+
+
+class StepTiming:
+    """
+    Timing of one run of a pipeline step.
+    """
+
+    __slots__ = ('step', 'filter_type', 'platform', 'outcome', 'duration', 'phases')
+
+    def __init__(self, step: str, filter_type: str, platform: str):
+        self.step = step
+        self.filter_type = filter_type
+        self.platform = platform
+        self.outcome = OUTCOME_PASS
+        self.duration = 0.0
+        self.phases = {}
+
+    def __repr__(self):
+        phases = ' '.join(f'{name}_ms={seconds * 1000:.2f}' for name, seconds in self.phases.items())
+        return (
+            f'<StepTiming {self.step} platform={self.platform} outcome={self.outcome} '
+            f'duration_ms={self.duration * 1000:.2f} {phases}>'
+        )
+
+
+def log_step_timing(timing: StepTiming):
+    """
+    Sink that logs each step timing at INFO level.
+    """
+    logger.info('Pipeline step timing: %r', timing)
+
+
+def get_timing_sinks() -> list:
+    """
+    Get the sinks configured by FILTERS_PIPELINES_TIMING_SINKS.
+    """
+    global _sinks  # pylint: disable=global-statement
+    if _sinks is None:
+        with _sinks_lock:
+            if _sinks is None:
+                sinks = []
+                for path in getattr(settings, 'FILTERS_PIPELINES_TIMING_SINKS', []):
+                    try:
+                        sinks.append(import_string(path))
+                    except ImportError:
+                        logger.exception('Could not import pipeline step timing sink %s', path)
+                _sinks = sinks
+    return _sinks
+
+
+@receiver(setting_changed)
+def _reset_timing_sinks(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Reload the sinks when FILTERS_PIPELINES_TIMING_SINKS changes.
+    """
+    global _sinks  # pylint: disable=global-statement
+    if setting == 'FILTERS_PIPELINES_TIMING_SINKS':
+        _sinks = None
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Time a sub-phase of the running step. Does nothing outside of a timed step.
+    """
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.phases[name] = timing.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def mark_outcome(outcome: str):
+    """
+    Set the outcome of the running step, e.g. OUTCOME_FALLBACK when an error
+    let the user through.
+    """
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.outcome = outcome
+
+
+@contextmanager
+def recorded_outcome(step: str):
+    """
+    Collect the outcome and sub-phases marked outside of a timed step.
+
+    Used by code that runs in the background on behalf of a step.
+
+    Yields:
+        StepTiming: Not handed to the sinks. Its outcome stays OUTCOME_PASS
+            unless something marked another one.
+    """
+    timing = StepTiming(step, '', '')
+    context_token = _current_timing.set(timing)
+    try:
+        yield timing
+    finally:
+        _current_timing.reset(context_token)
+
+
+def _start(step) -> tuple:
+    timing = StepTiming(type(step).__name__, step.filter_type, get_known_platform())
+    return timing, _current_timing.set(timing), time.perf_counter()
+
+
+def _finish(timing: StepTiming, context_token, start: float, error: Optional[BaseException]):
+    """
+    Close the timing of a step run and hand it to the sinks.
+    """
+    timing.duration = time.perf_counter() - start
+    _current_timing.reset(context_token)
+    if isinstance(error, OpenEdxFilterException):
+        timing.outcome = OUTCOME_BLOCKED
+    elif error is not None:
+        timing.outcome = OUTCOME_ERROR
+    for sink in get_timing_sinks():
+        try:
+            sink(timing)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Pipeline step timing sink %r failed', sink)
+
+
+def timed_step(run_filter):
+    """
+    Decorate a step's `run_filter` (or async `arun_filter`) to time every run.
+    """
+    if inspect.iscoroutinefunction(run_filter):
+        @functools.wraps(run_filter)
+        async def async_wrapper(self, **kwargs):
+            timing, context_token, start = _start(self)
+            error = None
+            try:
+                return await run_filter(self, **kwargs)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _finish(timing, context_token, start, error)
+        return async_wrapper
+
+    @functools.wraps(run_filter)
+    def wrapper(self, **kwargs):
+        timing, context_token, start = _start(self)
+        error = None
+        try:
+            with profiled(timing.step):
+                return run_filter(self, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _finish(timing, context_token, start, error)
+    return wrapper
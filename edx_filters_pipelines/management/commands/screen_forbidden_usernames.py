@@ -0,0 +1,103 @@
+"""
+Find existing accounts whose username contains a forbidden term.
+"""
+import sys
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from edx_filters_pipelines.auth.screening import DEFAULT_CHUNK_SIZE, screen_usernames
+
+REGISTRATION_FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+
+
+class Command(BaseCommand):
+    """
+    Screen usernames against forbidden terms and write out the matches.
+
+    Terms default to the PreventForbiddenUsernameRegistration configuration in
+    OPEN_EDX_FILTERS_CONFIG. Matches are written as "username<TAB>term" lines
+    as soon as they are found.
+
+    Examples:
+        ./manage.py lms screen_forbidden_usernames --output matches.tsv
+        ./manage.py lms screen_forbidden_usernames --input usernames.txt \\
+            --term admin --term staff
+    """
+
+    help = __doc__.strip()
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', help="File with one username per line, '-' for stdin. Defaults to all users.")
+        parser.add_argument('--output', help="File to write matches to. Defaults to stdout.")
+        parser.add_argument('--term', action='append', dest='terms',
+                            help="Forbidden term, instead of the configured ones. Repeatable.")
+        parser.add_argument('--terms-file', help="Text or compiled term file, instead of the configured one.")
+        parser.add_argument('--no-fold', dest='fold', action='store_false', default=None,
+                            help="Only ignore case instead of folding confusable characters.")
+        parser.add_argument('--processes', type=int, help="Worker processes. Defaults to the CPU count.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Usernames handed to a worker at once.")
+
+    def handle(self, *args, **options):
+        terms, fold, term_file = self.get_terms(options)
+        if not terms and not term_file:
+            raise CommandError("No forbidden terms configured or given.")
+
+        screened = 0
+
+        def count(usernames):
+            nonlocal screened
+            for username in usernames:
+                screened += 1
+                yield username.rstrip('\r\n')
+
+        matched = 0
+        with self.open_input(options['input'], options['chunk_size']) as usernames, \
+                self.open_output(options['output']) as output:
+            for username, term in screen_usernames(
+                count(usernames), terms, fold, term_file, options['processes'], options['chunk_size']
+            ):
+                output.write(f"{username}\t{term}\n")
+                matched += 1
+        self.stderr.write(f"Screened {screened} usernames, {matched} matched.")
+
+    @staticmethod
+    def get_terms(options) -> tuple:
+        """
+        Get the terms, folding and term file to screen with, from the options
+        or OPEN_EDX_FILTERS_CONFIG.
+        """
+        config = getattr(settings, 'OPEN_EDX_FILTERS_CONFIG', {}).get(REGISTRATION_FILTER_TYPE, {})
+        fold = options['fold'] if options['fold'] is not None else config.get('fold_confusables', True)
+        if options['terms'] or options['terms_file']:
+            return options['terms'] or [], fold, options['terms_file']
+
+        terms = list(config.get('forbidden_usernames', []))
+        cache_key = config.get('forbidden_usernames_cache_key')
+        if cache_key:
+            terms += caches[config.get('forbidden_usernames_cache_alias', 'default')].get(cache_key) or []
+        return terms, fold, config.get('forbidden_usernames_file')
+
+    @staticmethod
+    def open_input(path, chunk_size):
+        """
+        Open the usernames to screen, as a context manager of an iterator.
+        """
+        if path == '-':
+            return nullcontext(sys.stdin)
+        if path:
+            return open(path, encoding='utf-8')
+        usernames = get_user_model().objects.order_by('pk').values_list('username', flat=True)
+        return nullcontext(usernames.iterator(chunk_size=chunk_size))
+
+    def open_output(self, path):
+        """
+        Open where matches are written, as a context manager.
+        """
+        if path:
+            return open(path, 'w', encoding='utf-8')
+        return nullcontext(self.stdout)
@@ -0,0 +1,97 @@
+"""
+Platform of the current request and the reCAPTCHA site keys of each platform.
+
+Kept apart from edx_filters_pipelines.auth.utils so that the instrumentation,
+which utils imports, can fold platforms the same way.
+"""
+from types import MappingProxyType
+from typing import Optional
+
+from crum import get_current_request
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_compiled_config = None
+
+
+class CompiledRecaptchaConfig:
+    """
+    Immutable reCAPTCHA configuration of the process, read once from settings.
+
+    Maps each Mobile-Platform-Identifier value with a site key to that site
+    key. It holds no verifier, so resolving the site key of a registration
+    never builds the synchronous gRPC client, e.g. on the asyncio path.
+    """
+
+    __slots__ = ('site_keys',)
+
+    def __init__(self, site_keys: dict):
+        self.site_keys = MappingProxyType(dict(site_keys))
+
+    def __setattr__(self, name, value):
+        if hasattr(self, 'site_keys'):
+            raise AttributeError(f"{type(self).__name__} is immutable")
+        super().__setattr__(name, value)
+
+
+def get_compiled_recaptcha_config() -> CompiledRecaptchaConfig:
+    """
+    Get the compiled reCAPTCHA configuration, building it on first use.
+
+    Settings are validated earlier, by the system checks in
+    edx_filters_pipelines.checks.
+    """
+    global _compiled_config  # pylint: disable=global-statement
+    config = _compiled_config
+    if config is None:
+        config = CompiledRecaptchaConfig(getattr(settings, 'RECAPTCHA_SITE_KEYS', None) or {})
+        _compiled_config = config
+    return config
+
+
+def clear_compiled_recaptcha_config():
+    """
+    Drop the compiled configuration so the next call builds it from settings.
+    """
+    global _compiled_config  # pylint: disable=global-statement
+    _compiled_config = None
+
+
+@receiver(setting_changed)
+def _clear_compiled_recaptcha_config_on_setting_changed(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the compiled configuration when RECAPTCHA_SITE_KEYS changes.
+    """
+    if setting == 'RECAPTCHA_SITE_KEYS':
+        clear_compiled_recaptcha_config()
+
+
+def get_platform_from_request():
+    """
+    get Mobile-Platform-Identifier header value from request
+    Default to 'web' if header is not present
+    """
+    request = get_current_request()
+    return request.headers.get('Mobile-Platform-Identifier', 'web') if request else 'web'
+
+
+def get_known_platform() -> str:
+    """
+    Get the platform of the current request, 'web' unless it has a site key.
+
+    The Mobile-Platform-Identifier header is set by the client, so arbitrary
+    values are folded into 'web' before they are used to count, identify or
+    label anything.
+    """
+    platform = get_platform_from_request()
+    return platform if platform in get_compiled_recaptcha_config().site_keys else 'web'
+
+
+def get_captcha_site_key_by_platform(platform: str) -> Optional[str]:
+    """
+    Get reCAPTCHA site key based on the platform.
+
+    Answered from the compiled configuration, without reading settings.
+    """
+    return get_compiled_recaptcha_config().site_keys.get(platform)
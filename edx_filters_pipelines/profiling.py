@@ -0,0 +1,239 @@
+"""
+Sampled profiling of the pipeline steps in this package.
+
+Every step decorated with `timed_step` can run under cProfile, so hot spots in
+the verifier or matcher can be found under real load without a redeploy.
+Profiling is configured by the FILTERS_PIPELINES_PROFILING setting, merged over
+DEFAULT_PROFILING:
+
+    FILTERS_PIPELINES_PROFILING = {
+        'directory': '/var/tmp/filters-pipelines-profiles',
+        'sample_rate': 0.01,
+    }
+
+and switched on with ``'enabled': True`` or, at runtime, the
+``filters_pipelines.enable_step_profiling`` waffle flag. A sampled run is
+profiled by a cProfile.Profile enabled only for that run; the other runs pay
+for one random draw.
+
+Profiles are aggregated per step and dumped every ``dump_interval`` seconds to
+``<directory>/<step>.<pid>.<timestamp>.prof``, in the pstats format read by
+``python -m pstats`` or snakeviz. Only synchronous runs are profiled: an
+awaited step would also profile whatever else the event loop runs meanwhile.
+"""
+import atexit
+import contextvars
+import cProfile
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Defaults of the FILTERS_PIPELINES_PROFILING setting. Leave the setting unset
+# or None to disable profiling.
+DEFAULT_PROFILING = {
+    # Where profiles are dumped. Required.
+    'directory': None,
+    # Fraction of the step runs profiled while profiling is on.
+    'sample_rate': 0.01,
+    # Minimum seconds between two dumps of the profiles of a step.
+    'dump_interval': 60,
+    # Profile without the waffle flag.
+    'enabled': False,
+}
+
+_profiling = contextvars.ContextVar('edx_filters_pipelines_profiling', default=False)
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+class StepProfiler:
+    """
+    Profiles a sample of step runs and dumps the aggregated stats per step.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.01, dump_interval: float = 60,
+                 enabled: bool = False):
+        """
+        Initialize the profiler.
+
+        Args:
+            directory: Where profiles are dumped, created if missing
+            sample_rate: Fraction of the step runs profiled while enabled
+            dump_interval: Minimum seconds between two dumps of a step
+            enabled: Whether to profile without the waffle flag
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.dump_interval = dump_interval
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # {step: (aggregated pstats.Stats, time of the last dump)}
+        self._stats = {}
+
+    def should_profile(self) -> bool:
+        """
+        Draw whether the run about to start is profiled.
+        """
+        if random.random() >= self.sample_rate:
+            return False
+        if self.enabled:
+            return True
+        from edx_filters_pipelines.waffle import ENABLE_STEP_PROFILING  # pylint: disable=import-outside-toplevel
+        return ENABLE_STEP_PROFILING.is_enabled()
+
+    @contextmanager
+    def profile(self, step: str):
+        """
+        Profile the enclosed code as a run of the step, if it is sampled.
+
+        Runs nested in a profiled run are part of its profile and aren't
+        profiled on their own.
+        """
+        if _profiling.get() or not self.should_profile():
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            started = True
+        except ValueError:
+            # Another profiler (e.g. a debugger or an APM agent) is active in
+            # this thread.
+            started = False
+        if not started:
+            yield
+            return
+        token = _profiling.set(True)
+        try:
+            yield
+        finally:
+            profile.disable()
+            _profiling.reset(token)
+            self.add(step, profile)
+
+    def add(self, step: str, profile: cProfile.Profile):
+        """
+        Add a profiled run to the stats of the step, dumping them when due.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats, dumped_at = self._stats.get(step, (None, now))
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            self._stats[step] = (stats, dumped_at)
+            due = now - dumped_at >= self.dump_interval
+            if due:
+                del self._stats[step]
+        if due:
+            self.write(step, stats)
+
+    def dump(self) -> list:
+        """
+        Dump the stats of every step collected since its last dump.
+
+        Returns:
+            list: Paths of the written files
+        """
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return [path for step, (step_stats, _) in stats.items() if (path := self.write(step, step_stats))]
+
+    def write(self, step: str, stats: pstats.Stats) -> Optional[str]:
+        """
+        Write the stats of a step to a new file in the directory.
+
+        Returns:
+            str: Path of the file, or None if it couldn't be written
+        """
+        path = os.path.join(self.directory, f'{step}.{os.getpid()}.{time.time():.0f}.prof')
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stats.dump_stats(path)
+        except OSError:
+            logger.exception('Could not dump pipeline step profile to %s', path)
+            return None
+        return path
+
+
+def create_step_profiler() -> Optional[StepProfiler]:
+    """
+    Create a step profiler from settings.
+
+    Returns:
+        StepProfiler: Configured profiler, or None if
+            FILTERS_PIPELINES_PROFILING is not set
+    """
+    config = getattr(settings, 'FILTERS_PIPELINES_PROFILING', None)
+    if config is None:
+        return None
+    return StepProfiler(**{**DEFAULT_PROFILING, **config})
+
+
+def get_step_profiler() -> Optional[StepProfiler]:
+    """
+    Get the process-wide profiler configured by FILTERS_PIPELINES_PROFILING.
+    """
+    global _profiler  # pylint: disable=global-statement
+    profiler = _profiler
+    if profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                # False stands for "disabled", so the setting isn't read on
+                # every run.
+                _profiler = create_step_profiler() or False
+            profiler = _profiler
+    return profiler or None
+
+
+def reset_step_profiler():
+    """
+    Dump and drop the shared profiler, so the next run reads the settings.
+    """
+    global _profiler  # pylint: disable=global-statement
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+    if profiler:
+        profiler.dump()
+
+
+@contextmanager
+def profiled(step: str):
+    """
+    Profile the enclosed step run if profiling is on and the run is sampled.
+    """
+    profiler = get_step_profiler()
+    if profiler is None:
+        yield
+        return
+    with profiler.profile(step):
+        yield
+
+
+def _dump_at_exit():
+    if _profiler:
+        _profiler.dump()
+
+
+@receiver(setting_changed)
+def _reset_step_profiler_on_setting_changed(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Recreate the profiler when FILTERS_PIPELINES_PROFILING changes.
+    """
+    if setting == 'FILTERS_PIPELINES_PROFILING':
+        reset_step_profiler()
+
+
+atexit.register(_dump_at_exit)
@@ -1,10 +1,131 @@
 """
 waffle flags used in the filters_pipelines app.
 """
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
 from edx_toggles.toggles import WaffleFlag
+from waffle import get_waffle_flag_model  # pylint: disable=invalid-django-waffle-import
+from waffle.utils import get_setting
+
+logger = logging.getLogger(__name__)
 
 WAFFLE_NAMESPACE = 'filters_pipelines'
 
+# Seconds a flag snapshot is used before it is refreshed in the background.
+DEFAULT_FLAG_SNAPSHOT_TTL = 30
+
+
+class SnapshotWaffleFlag(WaffleFlag):
+    """
+    Waffle flag whose global on/off state is kept in a process-local snapshot.
+
+    While the flag is switched on or off for everyone, is_enabled() answers
+    from memory and only refreshes the snapshot in a background thread once it
+    is older than FILTERS_PIPELINES_FLAG_SNAPSHOT_TTL seconds, so requests
+    don't wait on the waffle cache or database. Saving or deleting the flag in
+    this process drops the snapshot right away.
+
+    A flag without a row in the database is snapshotted as WAFFLE_FLAG_DEFAULT,
+    which is what waffle answers for it. Flags rolled out by percentage, user
+    or group can't be snapshotted; they are evaluated per request as usual, and
+    so is every flag while WAFFLE_OVERRIDE is on, so the querystring override
+    keeps working. Set FILTERS_PIPELINES_FLAG_SNAPSHOT_TTL to 0 to always
+    evaluate flags per request.
+    """
+
+    _UNSET = object()
+
+    def __init__(self, name, module_name, log_prefix=""):
+        super().__init__(name, module_name, log_prefix)
+        self._snapshot = self._UNSET
+        self._expires_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def is_enabled(self):
+        """
+        Returns whether or not the flag is enabled.
+        """
+        value = self.snapshot_value()
+        return super().is_enabled() if value is None else value
+
+    def snapshot_value(self, load: bool = True) -> Optional[bool]:
+        """
+        Return the flag state for everyone from the snapshot.
+
+        Only the first lookup reads the flag inline; later ones never wait.
+
+        Args:
+            load: Whether to read the flag inline if there is no snapshot yet
+
+        Returns:
+            bool: Whether the flag is on for everyone, or None if it has to be
+                evaluated per request
+        """
+        ttl = getattr(settings, 'FILTERS_PIPELINES_FLAG_SNAPSHOT_TTL', DEFAULT_FLAG_SNAPSHOT_TTL)
+        if not ttl or get_setting('OVERRIDE'):
+            return None
+        snapshot = self._snapshot
+        if snapshot is self._UNSET:
+            # Nothing to serve yet, so the first lookup is made inline.
+            return self.refresh(ttl) if load else None
+        if time.monotonic() >= self._expires_at:
+            self._refresh_in_background(ttl)
+        return snapshot
+
+    def refresh(self, ttl: float) -> Optional[bool]:
+        """
+        Read the flag and store its state for everyone in the snapshot.
+        """
+        flag = get_waffle_flag_model().get(self.name)
+        if flag.pk:
+            snapshot = flag.everyone
+        elif get_setting('CREATE_MISSING_FLAGS'):
+            # Let waffle create the missing row on a per-request evaluation.
+            snapshot = None
+        else:
+            snapshot = bool(get_setting('FLAG_DEFAULT'))
+        self._snapshot = snapshot
+        self._expires_at = time.monotonic() + ttl
+        return snapshot
+
+    def invalidate(self):
+        """
+        Drop the snapshot so the next lookup reads the flag again.
+        """
+        self._snapshot = self._UNSET
+
+    def _refresh_in_background(self, ttl: float):
+        """
+        Start a refresh of the snapshot, unless one is already running.
+        """
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, args=(ttl,), daemon=True).start()
+
+    def _background_refresh(self, ttl: float):
+        """
+        Refresh the snapshot off the request path.
+        """
+        try:
+            self.refresh(ttl)
+        except Exception:  # pylint: disable=broad-except
+            # Keep serving the previous snapshot and retry after another ttl.
+            self._expires_at = time.monotonic() + ttl
+            logger.exception("Could not refresh waffle flag snapshot for %s", self.name)
+        finally:
+            self._refreshing = False
+            close_old_connections()
+
+
 # .. toggle_name: filters_pipelines.enable_registration_recaptcha_validation
 # .. toggle_implementation: WaffleFlag
 # .. toggle_default: False
@@ -13,4 +134,39 @@ WAFFLE_NAMESPACE = 'filters_pipelines'
 # .. toggle_creation_date: 2025-08-26
 # .. toggle_target_removal_date: None because this is a long-term feature
 # .. toggle_warning: When the flag is ON, recaptcha validation is enabled on registration.
-ENABLE_RECAPTCHA_VALIDATION = WaffleFlag(f'{WAFFLE_NAMESPACE}.enable_registration_recaptcha_validation', __name__)
+#   Changes may take up to FILTERS_PIPELINES_FLAG_SNAPSHOT_TTL seconds to
+#   reach every process.
+ENABLE_RECAPTCHA_VALIDATION = SnapshotWaffleFlag(
+    f'{WAFFLE_NAMESPACE}.enable_registration_recaptcha_validation', __name__
+)
+
+# .. toggle_name: filters_pipelines.enable_step_profiling
+# .. toggle_implementation: WaffleFlag
+# .. toggle_default: False
+# .. toggle_description: Waffle flag to profile a sample of pipeline step runs,
+#   see edx_filters_pipelines.profiling
+# .. toggle_use_cases: opt_in
+# .. toggle_creation_date: 2026-10-16
+# .. toggle_target_removal_date: None because this is a long-term feature
+# .. toggle_warning: Only has an effect when the FILTERS_PIPELINES_PROFILING
+#   setting is set.
+ENABLE_STEP_PROFILING = SnapshotWaffleFlag(f'{WAFFLE_NAMESPACE}.enable_step_profiling', __name__)
+
+SNAPSHOT_FLAGS = (ENABLE_RECAPTCHA_VALIDATION, ENABLE_STEP_PROFILING)
+
+
+def _invalidate_flag_snapshots(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the snapshot of a flag when it is saved or deleted.
+
+    Waffle flushes its own cache of the flag once the transaction commits, so
+    the snapshot is dropped then too, or it would be refilled from the stale
+    cache.
+    """
+    for flag in SNAPSHOT_FLAGS:
+        if flag.name == instance.name:
+            transaction.on_commit(flag.invalidate)
+
+
+post_save.connect(_invalidate_flag_snapshots, sender=get_setting('FLAG_MODEL', 'waffle.Flag'))
+post_delete.connect(_invalidate_flag_snapshots, sender=get_setting('FLAG_MODEL', 'waffle.Flag'))
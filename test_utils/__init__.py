@@ -8,3 +8,35 @@ in multiple test modules (i.e. factoryboy factories, base test classes).
 
 So this package is the place to put them.
 """
+
+import time
+
+
+class FakeRecaptchaVerifier:
+    """
+    Stand-in for RecaptchaVerifier that answers after a fixed latency.
+    """
+
+    def __init__(self, valid=True, latency=0.0):
+        """
+        Initialize the fake verifier.
+
+        Args:
+            valid: Verification result to return for every non-empty token
+            latency: Seconds to sleep in place of the assessment call
+        """
+        self.valid = valid
+        self.latency = latency
+        self.timeout = latency + 1.0
+        self.calls = 0
+
+    def verify_token(self, token, site_key, client=None, owner=None):  # pylint: disable=unused-argument
+        """
+        Return the configured result after the configured latency.
+        """
+        self.calls += 1
+        if not token:
+            return False
+        if self.latency:
+            time.sleep(self.latency)
+        return self.valid
@@ -0,0 +1,223 @@
+"""
+Local stand-in for the reCAPTCHA Enterprise CreateAssessment RPC.
+
+Used to load-test RecaptchaVerifier and measure its throughput, tail latency
+and fallback behavior without calling Google. Start a server, point a verifier
+at it, and drive it with run_load():
+
+    with FakeRecaptchaServer(latency=lognormal_latency(0.08, 0.5),
+                             error_rate=0.01) as server:
+        client = create_local_client(server.address)
+        verifier = RecaptchaVerifier('project', None, client=client)
+        print(run_load(verifier, requests=5000, concurrency=32))
+
+A verifier can also be pointed at a server that terminates TLS in front of this
+one through the RECAPTCHA_API_ENDPOINT setting, which is passed as
+ClientOptions.api_endpoint.
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter
+from concurrent import futures
+
+import grpc
+from google.cloud import recaptchaenterprise_v1
+from google.cloud.recaptchaenterprise_v1.services.recaptcha_enterprise_service.transports import (
+    RecaptchaEnterpriseServiceGrpcTransport,
+)
+
+SERVICE_NAME = 'google.cloud.recaptchaenterprise.v1.RecaptchaEnterpriseService'
+
+
+def constant_latency(seconds):
+    """
+    Latency distribution that always returns ``seconds``.
+    """
+    return lambda rng: seconds
+
+
+def uniform_latency(low, high):
+    """
+    Latency distribution uniform between ``low`` and ``high`` seconds.
+    """
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median, sigma):
+    """
+    Long-tailed latency distribution with the given median in seconds.
+    """
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+class FakeRecaptchaServer:
+    """
+    gRPC CreateAssessment server with configurable latency and failures.
+    """
+
+    def __init__(self, *, latency=None, error_rate=0.0, invalid_reasons=None, max_rps=None,
+                 score=0.9, seed=None, max_workers=64, port=0):
+        """
+        Initialize the server.
+
+        Args:
+            latency: Callable taking a random.Random and returning seconds to
+                wait per call
+            error_rate: Fraction of calls failed with UNAVAILABLE
+            invalid_reasons: Mapping of InvalidReason names (e.g. 'EXPIRED') to
+                the fraction of calls that report the token as invalid for that
+                reason
+            max_rps: Calls per second above which calls fail with
+                RESOURCE_EXHAUSTED
+            score: Risk score returned for valid tokens
+            seed: Seed of the random generator, for repeatable runs
+            max_workers: Number of threads serving calls
+            port: Port to listen on, 0 for any free port
+        """
+        self.latency = latency or constant_latency(0.0)
+        self.error_rate = error_rate
+        self.invalid_reasons = [
+            (recaptchaenterprise_v1.TokenProperties.InvalidReason[name], fraction)
+            for name, fraction in (invalid_reasons or {}).items()
+        ]
+        self.max_rps = max_rps
+        self.score = score
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(max_rps or 0)
+        self._refilled_at = time.monotonic()
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+        self._server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(SERVICE_NAME, {
+            'CreateAssessment': grpc.unary_unary_rpc_method_handler(
+                self.create_assessment,
+                request_deserializer=recaptchaenterprise_v1.CreateAssessmentRequest.deserialize,
+                response_serializer=recaptchaenterprise_v1.Assessment.serialize,
+            ),
+        }),))
+        self.port = self._server.add_insecure_port(f'127.0.0.1:{port}')
+
+    @property
+    def address(self):
+        """
+        host:port the server listens on.
+        """
+        return f'127.0.0.1:{self.port}'
+
+    def start(self):
+        """
+        Start serving.
+        """
+        self._server.start()
+        return self
+
+    def stop(self, grace=None):
+        """
+        Stop serving.
+        """
+        self._server.stop(grace)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def create_assessment(self, request, context):
+        """
+        Handle one CreateAssessment call.
+        """
+        with self._lock:
+            self.stats['calls'] += 1
+            throttled = not self._take_rate_token()
+            roll = self._rng.random()
+            delay = max(0.0, self.latency(self._rng))
+
+        if throttled:
+            self._count('throttled')
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, 'Quota exceeded')
+        time.sleep(delay)
+        if roll < self.error_rate:
+            self._count('errors')
+            context.abort(grpc.StatusCode.UNAVAILABLE, 'Service unavailable')
+
+        roll -= self.error_rate
+        token_properties = recaptchaenterprise_v1.TokenProperties(valid=True)
+        for reason, fraction in self.invalid_reasons:
+            if roll < fraction:
+                token_properties = recaptchaenterprise_v1.TokenProperties(valid=False, invalid_reason=reason)
+                break
+            roll -= fraction
+
+        self._count('valid' if token_properties.valid else 'invalid')
+        return recaptchaenterprise_v1.Assessment(
+            name=f'{request.parent}/assessments/{self.stats["calls"]}',
+            event=request.assessment.event,
+            token_properties=token_properties,
+            risk_analysis=recaptchaenterprise_v1.RiskAnalysis(score=self.score if token_properties.valid else 0.0),
+        )
+
+    def _take_rate_token(self):
+        """
+        Token bucket allowing max_rps calls per second. Must be called with the
+        lock held.
+        """
+        if not self.max_rps:
+            return True
+        now = time.monotonic()
+        self._tokens = min(float(self.max_rps), self._tokens + (now - self._refilled_at) * self.max_rps)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+def create_local_client(address):
+    """
+    Create an Enterprise client that talks plaintext gRPC to a local server.
+    """
+    transport = RecaptchaEnterpriseServiceGrpcTransport(channel=grpc.insecure_channel(address))
+    return recaptchaenterprise_v1.RecaptchaEnterpriseServiceClient(transport=transport)
+
+
+def run_load(verifier, requests=1000, concurrency=16, site_key='site-key'):
+    """
+    Verify ``requests`` distinct tokens with ``concurrency`` threads.
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and counts of
+            results
+    """
+    def verify(index):
+        start = time.perf_counter()
+        result = verifier.verify_token(f'load-test-token-{index}', site_key)
+        return result, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(verify, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in outcomes)
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+    return {
+        'requests': requests,
+        'throughput': requests / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': latencies[-1] * 1000,
+        'passed': sum(1 for result, _ in outcomes if result),
+        'failed': sum(1 for result, _ in outcomes if not result),
+    }
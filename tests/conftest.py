@@ -0,0 +1,19 @@
+"""
+Fixtures shared by the tests.
+"""
+import pytest
+
+from edx_filters_pipelines import audit
+
+
+@pytest.fixture(autouse=True)
+def _reset_audit_emitter():
+    """
+    Start every test with an audit emitter created from its settings.
+
+    The emitter is closed after the test, so the events it recorded are flushed
+    while the test output is still captured instead of at interpreter exit.
+    """
+    audit.reset_audit_emitter()
+    yield
+    audit.reset_audit_emitter()
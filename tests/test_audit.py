@@ -0,0 +1,145 @@
+"""
+Tests for the batched audit events.
+"""
+import json
+import logging
+import time
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+from openedx_filters.learning.filters import StudentRegistrationRequested
+
+from edx_filters_pipelines import audit
+from edx_filters_pipelines.audit import AuditEmitter, JsonLinesFileSink, log_audit_events
+from edx_filters_pipelines.auth.pipelines.registration import PreventForbiddenUsernameRegistration
+
+FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+
+
+def _emitter(**kwargs):
+    """
+    Create an emitter whose batches are collected in a list.
+    """
+    batches = []
+    emitter = AuditEmitter([batches.append], **kwargs)
+    # Keep the flush thread out of the way; tests flush explicitly.
+    emitter._thread = mock.Mock()  # pylint: disable=protected-access
+    return emitter, batches
+
+
+def test_events_flushed_in_batches():
+    emitter, batches = _emitter(batch_size=2)
+    for index in range(5):
+        emitter.emit('registration.blocked', index=index)
+
+    assert emitter.flush() == 5
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [event.fields['index'] for batch in batches for event in batch] == [0, 1, 2, 3, 4]
+
+
+def test_reset_after_fork_forgets_parent_events():
+    emitter, batches = _emitter(capacity=3)
+    emitter.emit('registration.blocked', index=0)
+    wakeup = emitter._wakeup  # pylint: disable=protected-access
+
+    emitter.reset_after_fork()
+
+    assert emitter.flush() == 0
+    assert emitter._wakeup is not wakeup  # pylint: disable=protected-access
+    with mock.patch('threading.Thread') as thread_class:
+        emitter.emit('registration.blocked', index=1)
+    thread_class.return_value.start.assert_called_once_with()
+    assert emitter.flush() == 1
+    assert [event.fields['index'] for event in batches[0]] == [1]
+    assert emitter._buffer.maxlen == 3  # pylint: disable=protected-access
+
+
+def test_full_buffer_overwrites_oldest_events():
+    emitter, batches = _emitter(capacity=3)
+    for index in range(5):
+        emitter.emit('registration.blocked', index=index)
+    emitter.flush()
+
+    assert [event.fields['index'] for event in batches[0]] == [2, 3, 4]
+    assert emitter.dropped == 2
+
+
+def test_events_are_sampled_by_name():
+    emitter, _ = _emitter(sample_rates={'recaptcha.cached_verdict': 0.0})
+
+    assert emitter.emit('recaptcha.cached_verdict', valid=True) is False
+    assert emitter.emit('recaptcha.assessment', valid=True) is True
+
+
+def test_failing_sink_does_not_stop_others():
+    batches = []
+    emitter = AuditEmitter([mock.Mock(side_effect=OSError('disk full')), batches.append])
+    emitter.emit('registration.blocked')
+
+    assert emitter.flush() == 1
+    assert len(batches) == 1
+
+
+def test_background_thread_flushes():
+    batches = []
+    emitter = AuditEmitter([batches.append], batch_size=1, flush_interval=60)
+    emitter.emit('registration.blocked')
+    emitter.emit('registration.blocked')
+
+    # The second event fills a batch and wakes the thread long before the flush
+    # interval.
+    deadline = time.monotonic() + 5
+    while not batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert batches
+    emitter.close()
+
+    assert sum(len(batch) for batch in batches) == 2
+
+
+def test_json_lines_file_sink(tmp_path):
+    path = tmp_path / 'audit.jsonl'
+    emitter = AuditEmitter([JsonLinesFileSink(str(path))])
+    emitter.emit('registration.blocked', reason='forbidden-username')
+    emitter.flush()
+
+    record = json.loads(path.read_text())
+    assert record['event'] == 'registration.blocked'
+    assert record['level'] == 'WARNING'
+    assert record['reason'] == 'forbidden-username'
+
+
+def test_events_logged_at_their_level(caplog):
+    emitter, batches = _emitter(levels={'recaptcha.skipped': logging.DEBUG})
+    emitter.emit('registration.blocked', reason='forbidden-username')
+    emitter.emit('recaptcha.rejected', reason='empty_token')
+    emitter.emit('recaptcha.assessment', valid=True)
+    emitter.emit('recaptcha.skipped', reason='sso')
+    emitter.flush()
+
+    with caplog.at_level(logging.DEBUG, logger=audit.__name__):
+        log_audit_events(batches[0])
+
+    assert [record.levelno for record in caplog.records] == [
+        logging.WARNING, logging.WARNING, logging.INFO, logging.DEBUG,
+    ]
+
+
+@override_settings(FILTERS_PIPELINES_AUDIT=None)
+def test_disabled_by_setting():
+    assert audit.emit('registration.blocked') is False
+
+
+def test_step_emits_block_event():
+    batches = []
+    with override_settings(FILTERS_PIPELINES_AUDIT={'sinks': []}):
+        audit.get_audit_emitter().sinks.append(batches.append)
+        step = PreventForbiddenUsernameRegistration(FILTER_TYPE, [], forbidden_usernames=['admin'])
+        with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+            step.run_filter(form_data={'username': 'admin1'})
+        audit.flush_audit_events()
+
+    assert [(event.name, event.fields) for batch in batches for event in batch] == [
+        ('registration.blocked', {'reason': 'forbidden-username', 'username': 'admin1', 'term': 'admin'}),
+    ]
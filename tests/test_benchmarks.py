@@ -0,0 +1,65 @@
+"""
+Benchmarks of the per-registration cost of the pipeline steps and utilities.
+
+These are skipped by a normal test run. Use `make benchmark` to save a baseline
+and `make benchmark_compare` to check for regressions against it.
+"""
+import random
+import string
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+
+from edx_filters_pipelines.auth.form import CaptchaForm
+from edx_filters_pipelines.auth.pipelines import registration
+from edx_filters_pipelines.auth.utils import verify_recaptcha_token
+from test_utils import FakeRecaptchaVerifier
+
+FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+TOKEN = 'x' * 500
+
+
+def _random_words(count, length, seed):
+    rng = random.Random(seed)
+    return [''.join(rng.choices(string.ascii_lowercase, k=length)) for _ in range(count)]
+
+
+@pytest.mark.parametrize('term_count', [10, 1000, 10000])
+@pytest.mark.parametrize('username_length', [8, 32, 128])
+def test_prevent_forbidden_username(benchmark, term_count, username_length):
+    terms = _random_words(term_count, 8, seed=term_count)
+    # Digits never fold to a letter sequence of a random term, so the whole
+    # username is scanned.
+    username = ''.join(random.Random(username_length).choices('26', k=username_length))
+    step = registration.PreventForbiddenUsernameRegistration(FILTER_TYPE, [], forbidden_usernames=terms)
+    step.run_filter(form_data={'username': username})
+
+    benchmark(step.run_filter, form_data={'username': username})
+
+
+@pytest.mark.parametrize('latency', [0, 0.001, 0.01])
+@override_settings(RECAPTCHA_SITE_KEYS={'web': 'site-key'})
+def test_verify_recaptcha_token_step(benchmark, latency):
+    step = registration.VerifyReCaptchaToken(FILTER_TYPE, [])
+    verifier = FakeRecaptchaVerifier(latency=latency)
+
+    with mock.patch.object(registration.ENABLE_RECAPTCHA_VALIDATION, 'is_enabled', return_value=True), \
+            mock.patch('edx_filters_pipelines.auth.utils.get_recaptcha_verifier', return_value=verifier):
+        benchmark(step.run_filter, form_data={'captcha_token': TOKEN})
+
+
+@pytest.mark.parametrize('latency', [0, 0.001])
+@override_settings(RECAPTCHA_SITE_KEYS={'web': 'site-key'})
+def test_verify_recaptcha_token(benchmark, latency):
+    verifier = FakeRecaptchaVerifier(latency=latency)
+
+    assert benchmark(verify_recaptcha_token, TOKEN, verifier) is True
+
+
+@pytest.mark.parametrize('token_length', [0, 500, 2000])
+def test_captcha_form(benchmark, token_length):
+    def clean():
+        return CaptchaForm(data={'captcha_token': 'x' * token_length}).is_valid()
+
+    assert benchmark(clean) is True
@@ -0,0 +1,73 @@
+"""
+Tests for the system checks and the compiled reCAPTCHA configuration.
+"""
+from unittest import mock
+
+import pytest
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from edx_filters_pipelines.auth import utils
+from edx_filters_pipelines.auth.termfile import write_term_file
+from edx_filters_pipelines.checks import check_recaptcha_settings
+
+
+def test_valid_settings():
+    with override_settings(RECAPTCHA_PROJECT_ID='project', RECAPTCHA_SITE_KEYS={'web': 'site-key'}):
+        assert not check_recaptcha_settings()
+
+
+@pytest.mark.parametrize('overrides, check_id', [
+    ({'RECAPTCHA_SITE_KEYS': ['site-key']}, 'edx_filters_pipelines.E001'),
+    ({'RECAPTCHA_SITE_KEYS': {'web': ''}}, 'edx_filters_pipelines.E001'),
+    ({'RECAPTCHA_SITE_KEYS': {'web': 'site-key'}, 'RECAPTCHA_PROJECT_ID': None}, 'edx_filters_pipelines.W001'),
+    ({'RECAPTCHA_ASSESSMENT_TIMEOUT': 0}, 'edx_filters_pipelines.E002'),
+    ({'RECAPTCHA_ASSESSMENT_MAX_ATTEMPTS': '2'}, 'edx_filters_pipelines.E002'),
+    ({'RECAPTCHA_CIRCUIT_BREAKER': {'threshold': 0.5}}, 'edx_filters_pipelines.E003'),
+    ({'RECAPTCHA_VERDICT_CACHE_ALIAS': 'missing'}, 'edx_filters_pipelines.E004'),
+    ({'RECAPTCHA_TOKEN_PRESCREEN': {'max_len': 10}}, 'edx_filters_pipelines.E005'),
+    ({'RECAPTCHA_RISK_POLICY': {'threshold': 0.5}}, 'edx_filters_pipelines.E006'),
+    ({'FILTERS_PIPELINES_AUDIT': {'sink': 'path'}}, 'edx_filters_pipelines.E007'),
+    ({'FILTERS_PIPELINES_PROFILING': {'sample_rate': 0.1}}, 'edx_filters_pipelines.E008'),
+    ({'OPEN_EDX_FILTERS_CONFIG': {
+        'org.openedx.learning.student.registration.requested.v1': {'forbidden_usernames_file': '/missing.terms'},
+    }}, 'edx_filters_pipelines.E009'),
+])
+def test_invalid_settings(overrides, check_id):
+    with override_settings(**overrides):
+        assert [message.id for message in check_recaptcha_settings()] == [check_id]
+
+
+def test_truncated_term_file(tmp_path):
+    path = tmp_path / 'reserved.terms'
+    write_term_file(['admin', 'staff'], str(path))
+    path.write_bytes(path.read_bytes()[:50])
+    filters_config = {'org.openedx.learning.student.registration.requested.v1': {'forbidden_usernames_file': str(path)}}
+
+    with override_settings(OPEN_EDX_FILTERS_CONFIG=filters_config):
+        assert [message.id for message in check_recaptcha_settings()] == ['edx_filters_pipelines.E009']
+
+
+@override_settings(RECAPTCHA_SITE_KEYS={'web': 'site-key'}, RECAPTCHA_ASSESSMENT_TIMEOUT=-1)
+def test_app_refuses_to_start_with_errors():
+    with pytest.raises(ImproperlyConfigured, match='edx_filters_pipelines.E002'):
+        apps.get_app_config('edx_filters_pipelines').ready()
+
+
+@override_settings(RECAPTCHA_PROJECT_ID='project', RECAPTCHA_SITE_KEYS={'web': 'web-key', 'ios': 'ios-key'})
+def test_compiled_config_maps_platforms_to_site_keys():
+    with mock.patch.object(utils.recaptchaenterprise_v1, 'RecaptchaEnterpriseServiceClient') as client_class:
+        config = utils.get_compiled_recaptcha_config()
+        assert utils.get_site_key_for_verification() == 'web-key'
+        client_class.assert_not_called()
+
+        verifier = utils.get_recaptcha_verifier()
+        assert utils.resolve_recaptcha_platform() == ('web-key', verifier)
+
+    assert utils.get_compiled_recaptcha_config() is config
+    assert utils.get_captcha_site_key_by_platform('ios') == 'ios-key'
+    assert utils.get_captcha_site_key_by_platform('android') is None
+    assert dict(config.site_keys) == {'web': 'web-key', 'ios': 'ios-key'}
+    with pytest.raises(AttributeError):
+        config.site_keys = {}
@@ -0,0 +1,97 @@
+"""
+Tests for the cost-ordered composite step.
+"""
+import asyncio
+from unittest import mock
+
+import pytest
+from openedx_filters.learning.filters import StudentRegistrationRequested
+
+from edx_filters_pipelines import composite
+from edx_filters_pipelines.auth.pipelines import registration
+
+FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+STEPS = [
+    'edx_filters_pipelines.auth.pipelines.registration.VerifyReCaptchaToken',
+    'edx_filters_pipelines.auth.pipelines.registration.PreventForbiddenUsernameRegistration',
+]
+
+
+@pytest.fixture(autouse=True)
+def _clear_costs():
+    """
+    Start every test without measured costs.
+    """
+    composite.clear_step_costs()
+    yield
+    composite.clear_step_costs()
+
+
+def _composite():
+    return composite.CostOrderedSteps(FILTER_TYPE, [], steps=STEPS, forbidden_usernames=['admin'])
+
+
+def test_local_rejection_skips_remote_step():
+    with mock.patch.object(registration, 'verify_recaptcha_token') as verify:
+        with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+            _composite().run_filter(form_data={'username': 'admin1', 'captcha_token': 'token'})
+
+    verify.assert_not_called()
+
+
+def test_all_steps_run_when_none_rejects():
+    form_data = {'username': 'learner', 'captcha_token': 'token'}
+
+    with mock.patch.object(registration.ENABLE_RECAPTCHA_VALIDATION, 'is_enabled', return_value=True), \
+            mock.patch.object(registration, 'verify_recaptcha_token', return_value=True) as verify:
+        assert _composite().run_filter(form_data=form_data) == {'form_data': form_data, **form_data}
+
+    verify.assert_called_once_with('token', owner='learner')
+
+
+@pytest.mark.parametrize('run', [
+    lambda step, **kwargs: step.run_filter(**kwargs),
+    lambda step, **kwargs: asyncio.run(step.arun_filter(**kwargs)),
+])
+def test_non_dict_result_stops_outer_pipeline(run):
+    stop = object()
+    step_class = registration.PreventForbiddenUsernameRegistration
+
+    with mock.patch.object(step_class, 'run_filter', return_value=stop), \
+            mock.patch.object(registration.VerifyReCaptchaToken, 'run_filter') as verify, \
+            mock.patch.object(registration.VerifyReCaptchaToken, 'arun_filter') as averify:
+        assert run(_composite(), form_data={'username': 'learner'}) is stop
+
+    verify.assert_not_called()
+    averify.assert_not_called()
+
+
+def test_filter_arguments_kept_in_output():
+    step_class = registration.PreventForbiddenUsernameRegistration
+
+    with mock.patch.object(step_class, 'run_filter', return_value={}), \
+            mock.patch.object(registration.VerifyReCaptchaToken, 'run_filter', return_value={'extra': 1}):
+        assert _composite().run_filter(form_data={'username': 'learner'}) == {
+            'form_data': {'username': 'learner'}, 'extra': 1,
+        }
+
+
+def test_async_local_rejection_skips_remote_step():
+    with mock.patch.object(registration, 'averify_recaptcha_token') as verify:
+        with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+            asyncio.run(_composite().arun_filter(form_data={'username': 'admin1', 'captcha_token': 'token'}))
+
+    verify.assert_not_called()
+
+
+def test_measured_cost_replaces_declared_cost():
+    step_class = registration.PreventForbiddenUsernameRegistration
+    assert composite.get_step_cost(step_class) == step_class.cost
+
+    for _ in range(composite.MIN_MEASURED_RUNS):
+        composite.record_step_cost(step_class, 1.0)
+
+    assert composite.get_step_cost(step_class) == pytest.approx(1.0)
+    assert [type(step) for step in _composite().get_steps()] == [
+        registration.VerifyReCaptchaToken, registration.PreventForbiddenUsernameRegistration,
+    ]
@@ -0,0 +1,24 @@
+"""
+Tests for the bounded background executor.
+"""
+import threading
+
+from edx_filters_pipelines.executor import BoundedExecutor
+
+
+def test_try_submit_refuses_work_when_full():
+    executor = BoundedExecutor(max_workers=1, max_pending=1)
+    release = threading.Event()
+    try:
+        running = executor.try_submit(release.wait)
+        pending = executor.try_submit(release.wait)
+
+        assert running is not None and pending is not None
+        assert executor.try_submit(release.wait) is None
+
+        release.set()
+        pending.result(timeout=1)
+        assert executor.try_submit(int).result(timeout=1) == 0
+    finally:
+        release.set()
+        executor.shutdown()
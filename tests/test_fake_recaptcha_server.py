@@ -0,0 +1,37 @@
+"""
+Tests for RecaptchaVerifier against the local stand-in reCAPTCHA server.
+"""
+import pytest
+
+from edx_filters_pipelines.auth.utils import IGNORE_VALIDATION_ON_ERROR, RecaptchaVerifier
+from test_utils.fake_recaptcha_server import FakeRecaptchaServer, create_local_client, run_load
+
+
+def _verifier(server, **kwargs):
+    return RecaptchaVerifier('project', None, client=create_local_client(server.address), **kwargs)
+
+
+@pytest.mark.parametrize('invalid_reasons, expected', [
+    ({}, True),
+    ({'EXPIRED': 1.0}, False),
+])
+def test_verify_token(invalid_reasons, expected):
+    with FakeRecaptchaServer(invalid_reasons=invalid_reasons) as server:
+        assert _verifier(server).verify_token('token', 'site-key') is expected
+
+
+def test_unavailable_server_falls_back_after_retries():
+    with FakeRecaptchaServer(error_rate=1.0) as server:
+        result = _verifier(server, max_attempts=2, backoff=0).verify_token('token', 'site-key')
+
+    assert result is IGNORE_VALIDATION_ON_ERROR
+    assert server.stats['errors'] == 2
+
+
+def test_run_load():
+    with FakeRecaptchaServer(invalid_reasons={'DUPE': 0.5}, seed=1) as server:
+        summary = run_load(_verifier(server), requests=50, concurrency=4)
+
+    assert summary['passed'] + summary['failed'] == 50
+    assert 0 < summary['failed'] < 50
+    assert summary['p50_ms'] <= summary['p99_ms']
@@ -0,0 +1,63 @@
+"""
+Import budget of the package.
+
+Workers import the pipeline steps at boot even when they never verify a token,
+so the Google SDK (and with it gRPC and protobuf) must only be imported on
+first use. The budget is checked on the modules imported rather than on
+wall-clock time, which depends on the load of the machine running the tests.
+"""
+import json
+import os
+import subprocess
+import sys
+
+MODULES = (
+    'edx_filters_pipelines.apps',
+    'edx_filters_pipelines.checks',
+    'edx_filters_pipelines.auth.pipelines.registration',
+    'edx_filters_pipelines.auth.form',
+)
+# Modules that must not be imported until a token is verified.
+DEFERRED_MODULES = ('grpc', 'google.protobuf', 'google.api_core.exceptions', 'google.cloud.recaptchaenterprise_v1')
+# Modules the package may add on top of a configured Django.
+MODULE_BUDGET = 60
+
+# Django is set up without the app, so that importing the app is part of the
+# measurement.
+SCRIPT = f"""
+import json, sys
+import django
+from django.conf import settings
+import test_settings
+settings.configure(**{{
+    **{{name: getattr(test_settings, name) for name in dir(test_settings) if name.isupper()}},
+    'INSTALLED_APPS': [app for app in test_settings.INSTALLED_APPS if app != 'edx_filters_pipelines'],
+}})
+django.setup()
+before = set(sys.modules)
+for module in {MODULES!r}:
+    __import__(module)
+print(json.dumps({{
+    'modules': sorted(set(sys.modules) - before),
+    'deferred': [module for module in {DEFERRED_MODULES!r} if module in sys.modules],
+}}))
+"""
+
+
+def _measure_import():
+    """
+    Import the package in a fresh interpreter and return the modules it added.
+    """
+    env = {key: value for key, value in os.environ.items() if key != 'DJANGO_SETTINGS_MODULE'}
+    output = subprocess.run(
+        [sys.executable, '-c', SCRIPT], env=env, check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(output)
+
+
+def test_import_budget():
+    result = _measure_import()
+
+    assert not result['deferred']
+    assert len(result['modules']) <= MODULE_BUDGET, result['modules']
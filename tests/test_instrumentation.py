@@ -0,0 +1,81 @@
+"""
+Tests for the pipeline step timing instrumentation.
+"""
+from unittest import mock
+
+import pytest
+from crum import set_current_request
+from django.test import RequestFactory, override_settings
+from openedx_filters.learning.filters import StudentRegistrationRequested
+
+from edx_filters_pipelines import instrumentation
+from edx_filters_pipelines.auth.pipelines import registration
+from edx_filters_pipelines.auth.pipelines.registration import PreventForbiddenUsernameRegistration, VerifyReCaptchaToken
+
+FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+TIMINGS = []
+
+
+def collect_timing(timing):
+    TIMINGS.append(timing)
+
+
+@pytest.fixture(autouse=True)
+def _collect_timings():
+    """
+    Send step timings to TIMINGS for the duration of the test.
+    """
+    TIMINGS.clear()
+    with override_settings(FILTERS_PIPELINES_TIMING_SINKS=['tests.test_instrumentation.collect_timing']):
+        yield
+
+
+@pytest.mark.parametrize('username, outcome', [('learner', 'pass'), ('admin1', 'blocked')])
+def test_forbidden_username_timing(username, outcome):
+    step = PreventForbiddenUsernameRegistration(FILTER_TYPE, [], forbidden_usernames=['admin'])
+
+    try:
+        step.run_filter(form_data={'username': username})
+    except StudentRegistrationRequested.PreventRegistration:
+        pass
+
+    assert len(TIMINGS) == 1
+    timing = TIMINGS[0]
+    assert (timing.step, timing.platform, timing.outcome) == ('PreventForbiddenUsernameRegistration', 'web', outcome)
+    assert set(timing.phases) == {'matcher_lookup', 'match'}
+    assert timing.duration >= sum(timing.phases.values())
+
+
+@override_settings(RECAPTCHA_SITE_KEYS={'web': 'web-key', 'ios': 'ios-key'})
+@pytest.mark.parametrize('header, platform', [('ios', 'ios'), ('made-up', 'web')])
+def test_timing_platform_folded_to_known_platforms(header, platform):
+    step = PreventForbiddenUsernameRegistration(FILTER_TYPE, [], forbidden_usernames=['admin'])
+    set_current_request(RequestFactory().post('/register', HTTP_MOBILE_PLATFORM_IDENTIFIER=header))
+    try:
+        step.run_filter(form_data={'username': 'learner'})
+    finally:
+        set_current_request(None)
+
+    assert [timing.platform for timing in TIMINGS] == [platform]
+
+
+@override_settings(RECAPTCHA_SITE_KEYS={'web': 'site-key'})
+def test_recaptcha_fallback_timing():
+    verifier = mock.Mock(**{'verify_token.side_effect': RuntimeError('boom')})
+    step = VerifyReCaptchaToken(FILTER_TYPE, [])
+
+    with mock.patch.object(registration.ENABLE_RECAPTCHA_VALIDATION, 'is_enabled', return_value=True), \
+            mock.patch('edx_filters_pipelines.auth.utils.get_recaptcha_verifier', return_value=verifier):
+        step.run_filter(form_data={'captcha_token': 'token'})
+
+    assert len(TIMINGS) == 1
+    timing = TIMINGS[0]
+    assert timing.outcome == instrumentation.OUTCOME_FALLBACK
+    assert {'flag_check', 'config_lookup'} <= set(timing.phases)
+
+
+def test_failing_sink_does_not_break_step():
+    with override_settings(FILTERS_PIPELINES_TIMING_SINKS=['builtins.len']):
+        step = PreventForbiddenUsernameRegistration(FILTER_TYPE, [], forbidden_usernames=[])
+
+        assert step.run_filter(form_data={'username': 'learner'}) == {'username': 'learner'}
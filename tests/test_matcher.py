@@ -0,0 +1,67 @@
+"""
+Tests for the forbidden term matcher.
+"""
+import random
+
+import pytest
+
+from edx_filters_pipelines.auth.matcher import ForbiddenTermMatcher, get_forbidden_term_matcher
+
+
+@pytest.mark.parametrize('username, expected', [
+    ('admin123', 'admin'),
+    ('TheStaffer', 'staff'),
+    ('staff_admin', 'admin'),  # earlier terms in the list win
+    ('ushers', 'she'),
+    ('hers', 'hers'),
+    ('learner', None),
+    ('', None),
+])
+def test_find(username, expected):
+    matcher = ForbiddenTermMatcher(['admin', 'she', 'hers', 'staff'])
+
+    assert matcher.find(username) == expected
+
+
+def test_find_matches_linear_scan():
+    rng = random.Random(42)
+    terms = [''.join(rng.choices('abc', k=rng.randint(1, 4))) for _ in range(50)]
+    matcher = ForbiddenTermMatcher(terms, fold=False)
+
+    for _ in range(500):
+        username = ''.join(rng.choices('abcd', k=rng.randint(0, 12)))
+        assert matcher.find(username) == next((t for t in terms if t in username), None)
+
+
+def test_matcher_cached_per_configuration():
+    terms = ['admin', 'staff']
+
+    assert get_forbidden_term_matcher(terms) is get_forbidden_term_matcher(terms)
+    assert get_forbidden_term_matcher(list(terms)) is get_forbidden_term_matcher(terms)
+
+
+@pytest.mark.parametrize('username', ['ADM1N', 'аdmin', 'ａｄｍｉｎ', 'àdmín', '4dm!n', 'st4ff', '$TAFF'])
+def test_find_folds_confusables(username):
+    matcher = ForbiddenTermMatcher(['admin', 'staff'])
+
+    assert matcher.find(username) is not None
+
+
+@pytest.mark.parametrize('username, expected', [
+    ('𝐀𝐃𝐌𝐈𝐍', 'admin'),  # mathematical bold
+    ('𝔰𝔱𝔞𝔣𝔣', 'staff'),  # mathematical fraktur
+    ('ℍ𝕆𝕊𝕋', 'host'),  # letterlike and double-struck
+    ('ＡＤＭＩＮ', 'admin'),
+    ('İHOST', 'host'),
+])
+def test_find_folds_compatibility_characters(username, expected):
+    matcher = ForbiddenTermMatcher(['admin', 'staff', 'host'])
+
+    assert matcher.find(username) == expected
+
+
+def test_find_without_folding():
+    matcher = ForbiddenTermMatcher(['admin'], fold=False)
+
+    assert matcher.find('ADMIN') == 'admin'
+    assert matcher.find('ADM1N') is None
@@ -0,0 +1,72 @@
+"""
+Tests for the local token prescreen.
+"""
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from edx_filters_pipelines.auth import utils
+from edx_filters_pipelines.auth.prescreen import TokenPrescreen, create_token_prescreen
+
+TOKEN = '03AFcWeA' + 'x' * 400
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    """
+    Start every test without recorded token uses.
+    """
+    cache.clear()
+
+
+@pytest.mark.parametrize('token, expected', [
+    (TOKEN, True),
+    ('short', False),
+    ('x' * 9000, False),
+    (TOKEN + '<script>', False),
+])
+def test_is_well_formed(token, expected):
+    assert TokenPrescreen().is_well_formed(token) is expected
+
+
+def test_replay_by_another_registration():
+    prescreen = TokenPrescreen()
+
+    assert not prescreen.is_replay(TOKEN, 'learner@example.com')
+    # Retrying the same registration isn't a replay.
+    assert not prescreen.is_replay(TOKEN, 'learner@example.com')
+    assert prescreen.is_replay(TOKEN, 'bot@example.com')
+
+
+def test_replay_seen_by_other_node():
+    TokenPrescreen().is_replay(TOKEN, 'learner@example.com')
+
+    assert TokenPrescreen().is_replay(TOKEN, 'bot@example.com')
+
+
+def test_local_only_prescreen():
+    first, second = TokenPrescreen(cache_alias=None), TokenPrescreen(cache_alias=None)
+    first.is_replay(TOKEN, 'learner@example.com')
+
+    assert first.is_replay(TOKEN, 'bot@example.com')
+    assert not second.is_replay(TOKEN, 'bot@example.com')
+
+
+@override_settings(RECAPTCHA_SITE_KEYS={'web': 'site-key'})
+def test_rejected_without_assessment():
+    verifier = utils.RecaptchaVerifier('project', None, client=mock.Mock(), prescreen=TokenPrescreen())
+
+    assert utils.verify_recaptcha_token('fabricated', verifier, owner='bot@example.com') is False
+    verifier.client.create_assessment.return_value = mock.Mock(token_properties=mock.Mock(valid=True))
+    assert utils.verify_recaptcha_token(TOKEN, verifier, owner='learner@example.com') is True
+    assert utils.verify_recaptcha_token(TOKEN, verifier, owner='bot@example.com') is False
+
+    verifier.client.create_assessment.assert_called_once()
+
+
+def test_disabled_by_default():
+    assert create_token_prescreen() is None
+    with override_settings(RECAPTCHA_TOKEN_PRESCREEN={'min_length': 10}):
+        assert create_token_prescreen().min_length == 10
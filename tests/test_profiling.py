@@ -0,0 +1,92 @@
+"""
+Tests for the sampled profiling of pipeline steps.
+"""
+import pstats
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+
+from edx_filters_pipelines import profiling
+from edx_filters_pipelines.auth.pipelines.registration import PreventForbiddenUsernameRegistration
+from edx_filters_pipelines.profiling import StepProfiler
+
+FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+
+
+@pytest.fixture(autouse=True)
+def _reset_profiler():
+    """
+    Start every test with a profiler created from its settings.
+    """
+    profiling.reset_step_profiler()
+    yield
+    profiling.reset_step_profiler()
+
+
+def _work():
+    return sum(range(1000))
+
+
+def test_sampled_runs_are_aggregated_and_dumped(tmp_path):
+    profiler = StepProfiler(str(tmp_path), sample_rate=1.0, dump_interval=3600, enabled=True)
+    for _ in range(3):
+        with profiler.profile('Step'):
+            _work()
+
+    paths = profiler.dump()
+
+    assert len(paths) == 1
+    stats = pstats.Stats(paths[0])
+    [work] = [value for key, value in stats.stats.items() if key[2] == '_work']
+    assert work[1] == 3  # call count
+    assert profiler.dump() == []
+
+
+def test_stats_dumped_when_due(tmp_path):
+    profiler = StepProfiler(str(tmp_path), sample_rate=1.0, dump_interval=0, enabled=True)
+
+    with profiler.profile('Step'):
+        _work()
+
+    assert [path.name.split('.')[0] for path in tmp_path.iterdir()] == ['Step']
+
+
+def test_unsampled_runs_are_not_profiled(tmp_path):
+    profiler = StepProfiler(str(tmp_path), sample_rate=0.0, enabled=True)
+
+    with mock.patch.object(profiling.cProfile, 'Profile') as profile_class:
+        with profiler.profile('Step'):
+            _work()
+
+    profile_class.assert_not_called()
+
+
+def test_waffle_flag_switches_profiling_on(tmp_path):
+    profiler = StepProfiler(str(tmp_path), sample_rate=1.0)
+
+    with mock.patch('edx_filters_pipelines.waffle.ENABLE_STEP_PROFILING.is_enabled', return_value=False):
+        assert profiler.should_profile() is False
+    with mock.patch('edx_filters_pipelines.waffle.ENABLE_STEP_PROFILING.is_enabled', return_value=True):
+        assert profiler.should_profile() is True
+
+
+def test_nested_runs_are_part_of_the_outer_profile(tmp_path):
+    profiler = StepProfiler(str(tmp_path), sample_rate=1.0, dump_interval=3600, enabled=True)
+
+    with profiler.profile('Outer'):
+        with profiler.profile('Inner'):
+            _work()
+
+    assert [path.split('/')[-1].split('.')[0] for path in profiler.dump()] == ['Outer']
+
+
+def test_timed_steps_are_profiled(tmp_path):
+    with override_settings(FILTERS_PIPELINES_PROFILING={
+        'directory': str(tmp_path), 'sample_rate': 1.0, 'enabled': True, 'dump_interval': 3600,
+    }):
+        step = PreventForbiddenUsernameRegistration(FILTER_TYPE, [], forbidden_usernames=['admin'])
+        step.run_filter(form_data={'username': 'learner'})
+
+    # Changing the setting back dumps what was collected.
+    assert [path.name.split('.')[0] for path in tmp_path.iterdir()] == ['PreventForbiddenUsernameRegistration']
@@ -0,0 +1,178 @@
+"""
+Tests for the sliding-window registration rate limit.
+"""
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+from openedx_filters.learning.filters import StudentRegistrationRequested
+
+from edx_filters_pipelines import composite
+from edx_filters_pipelines.auth import ratelimit, utils
+from edx_filters_pipelines.auth.pipelines import registration
+from edx_filters_pipelines.auth.ratelimit import SlidingWindowLimiter
+
+FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+SITE_KEYS = {'web': 'web-key', 'ios': 'ios-key', 'android': 'android-key'}
+
+
+@pytest.fixture(autouse=True)
+def _clear_limiters():
+    """
+    Start every test without counted attempts.
+    """
+    ratelimit.clear_rate_limiters()
+    cache.clear()
+    yield
+    ratelimit.clear_rate_limiters()
+
+
+def _hits(limiter, key, count, now):
+    with mock.patch.object(ratelimit.time, 'time', return_value=now):
+        return [limiter.hit(key) for _ in range(count)]
+
+
+def test_limit_is_per_key():
+    limiter = SlidingWindowLimiter(limit=3, window=60)
+
+    assert _hits(limiter, 'a', 4, 600) == [True, True, True, False]
+    assert _hits(limiter, 'b', 1, 600) == [True]
+
+
+def test_previous_window_is_weighted_by_overlap():
+    limiter = SlidingWindowLimiter(limit=10, window=60)
+    _hits(limiter, 'a', 10, 610)
+
+    # A quarter into the next window, three quarters of the previous hits still
+    # count.
+    assert _hits(limiter, 'a', 3, 675) == [True, True, False]
+    # Two windows later, the old hits are forgotten.
+    assert _hits(limiter, 'a', 10, 800) == [True] * 10
+
+
+def test_prune_drops_stale_keys():
+    limiter = SlidingWindowLimiter(limit=5, window=60, shards=1, max_keys=2)
+    _hits(limiter, 'a', 1, 600)
+    _hits(limiter, 'b', 1, 600)
+
+    _hits(limiter, 'c', 1, 800)
+
+    assert list(limiter._shards[0].counters) == ['c']  # pylint: disable=protected-access
+
+
+def test_counts_are_aggregated_in_cache():
+    node_a = SlidingWindowLimiter(limit=3, window=60, cache_alias='default', sync_interval=0)
+    node_b = SlidingWindowLimiter(limit=3, window=60, cache_alias='default', sync_interval=0)
+
+    assert _hits(node_a, 'a', 2, 600) == [True, True]
+    assert _hits(node_b, 'a', 2, 600) == [True, False]
+
+
+def test_cache_keys_are_hashed():
+    limiter = SlidingWindowLimiter(limit=3, window=60, cache_alias='default', sync_interval=0)
+
+    with mock.patch.object(ratelimit, 'caches') as caches:
+        caches.__getitem__.return_value.incr.return_value = 1
+        _hits(limiter, 'ip:2001:db8::1 spaced', 1, 600)
+
+    cache_key = caches.__getitem__.return_value.incr.call_args[0][0]
+    assert '2001:db8' not in cache_key and ' ' not in cache_key
+
+
+def test_cache_errors_fall_back_to_local_counts():
+    limiter = SlidingWindowLimiter(limit=2, window=60, cache_alias='default', sync_interval=0)
+
+    with mock.patch.object(ratelimit, 'caches', {}):
+        assert _hits(limiter, 'a', 3, 600) == [True, True, False]
+
+
+def _step(**config):
+    return registration.RateLimitRegistration(FILTER_TYPE, [], **config)
+
+
+def _run(step, remote_addr='10.0.0.1', platform='web', **headers):
+    """
+    Run the step for a registration from the address and platform, with ios and
+    android site keys configured.
+    """
+    request = RequestFactory().post(
+        '/register', REMOTE_ADDR=remote_addr, HTTP_MOBILE_PLATFORM_IDENTIFIER=platform, **headers
+    )
+    with override_settings(RECAPTCHA_SITE_KEYS=SITE_KEYS), \
+            mock.patch.object(utils, 'get_current_request', return_value=request), \
+            mock.patch('edx_filters_pipelines.platforms.get_current_request', return_value=request):
+        return step.run_filter(form_data={'username': 'learner'})
+
+
+def test_step_rejects_ip_over_limit():
+    step = _step(rate_limit_per_ip=2)
+    _run(step)
+    _run(step)
+
+    with pytest.raises(StudentRegistrationRequested.PreventRegistration) as error:
+        _run(step)
+
+    assert error.value.status_code == 429
+    assert error.value.error_code == 'registration-rate-limited'
+    assert _run(step, remote_addr='10.0.0.2') == {'username': 'learner'}
+
+
+def test_step_rejects_platform_over_limit():
+    step = _step(rate_limit_per_platform=2)
+    _run(step, remote_addr='10.0.0.1', platform='ios')
+    _run(step, remote_addr='10.0.0.2', platform='ios')
+
+    with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+        _run(step, remote_addr='10.0.0.3', platform='ios')
+    assert _run(step, remote_addr='10.0.0.3', platform='android') == {'username': 'learner'}
+
+
+def test_step_counts_unknown_platforms_as_web():
+    step = _step(rate_limit_per_platform=2)
+    _run(step, remote_addr='10.0.0.1', platform='made-up')
+    _run(step, remote_addr='10.0.0.2', platform='other')
+
+    with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+        _run(step, remote_addr='10.0.0.3', platform='web')
+
+
+@override_settings(CLOSEST_CLIENT_IP_FROM_HEADERS=[{'name': 'X-Forwarded-For', 'index': -1}])
+def test_step_counts_forwarded_client_ip():
+    step = _step(rate_limit_per_ip=1)
+    _run(step, remote_addr='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.1')
+
+    assert _run(step, remote_addr='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.2') == {'username': 'learner'}
+    with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+        _run(step, remote_addr='10.0.0.2', HTTP_X_FORWARDED_FOR='203.0.113.1')
+
+
+def test_attempts_over_ip_limit_do_not_count_against_platform():
+    step = _step(rate_limit_per_ip=1, rate_limit_per_platform=2)
+    _run(step, remote_addr='10.0.0.1')
+    for _ in range(5):
+        with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+            _run(step, remote_addr='10.0.0.1')
+
+    assert _run(step, remote_addr='10.0.0.2') == {'username': 'learner'}
+
+
+def test_step_without_limits_allows_everything():
+    step = _step()
+
+    for _ in range(10):
+        assert _run(step) == {'username': 'learner'}
+
+
+def test_composite_rejects_before_recaptcha():
+    step = composite.CostOrderedSteps(FILTER_TYPE, [], steps=[
+        'edx_filters_pipelines.auth.pipelines.registration.VerifyReCaptchaToken',
+        'edx_filters_pipelines.auth.pipelines.registration.RateLimitRegistration',
+    ], rate_limit_per_ip=1)
+    _run(_step(rate_limit_per_ip=1))
+
+    with mock.patch.object(registration, 'verify_recaptcha_token') as verify:
+        with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+            _run(step)
+
+    verify.assert_not_called()
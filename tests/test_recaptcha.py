@@ -0,0 +1,451 @@
+"""
+Tests for the reCAPTCHA verification utilities.
+"""
+import asyncio
+import threading
+import time
+from unittest import mock
+
+import pytest
+from crum import set_current_request
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+from google.api_core import exceptions as google_exceptions
+
+from edx_filters_pipelines.auth import utils
+from edx_filters_pipelines.auth.prescreen import TokenPrescreen
+from edx_filters_pipelines.auth.risk import RiskPolicy
+from edx_filters_pipelines.auth.verdicts import Verdict, VerdictCache
+from test_utils import FakeRecaptchaVerifier
+
+
+@pytest.fixture(autouse=True, name='client_class')
+def fixture_client_class():
+    """
+    Replace the Enterprise client and start every test without shared verifiers
+    or verdicts.
+    """
+    cache.clear()
+    utils.clear_recaptcha_verifiers()
+    with mock.patch.object(utils.recaptchaenterprise_v1, 'RecaptchaEnterpriseServiceClient') as client_class:
+        yield client_class
+    utils.clear_recaptcha_verifiers()
+
+
+@override_settings(RECAPTCHA_PROJECT_ID='project', RECAPTCHA_PRIVATE_KEY='key')
+def test_verifier_is_shared(client_class):
+    verifier = utils.get_recaptcha_verifier()
+
+    assert utils.get_recaptcha_verifier() is verifier
+    assert verifier.project_id == 'project'
+    client_class.assert_called_once()
+
+
+def test_verifier_invalidated_on_setting_change():
+    with override_settings(RECAPTCHA_PROJECT_ID='project'):
+        verifier = utils.get_recaptcha_verifier()
+    with override_settings(RECAPTCHA_PROJECT_ID='project'):
+        assert utils.get_recaptcha_verifier() is not verifier
+
+
+@override_settings(RECAPTCHA_PROJECT_ID=None)
+def test_no_verifier_without_project_id():
+    assert utils.get_recaptcha_verifier() is None
+
+
+def _assessment(valid=True, invalid_reason=0, score=0.9):
+    return mock.Mock(
+        token_properties=mock.Mock(valid=valid, invalid_reason=invalid_reason),
+        risk_analysis=mock.Mock(score=score),
+    )
+
+
+def _verifier(**kwargs):
+    verifier = utils.RecaptchaVerifier('project', None, **kwargs)
+    verifier.client = mock.Mock()
+    return verifier
+
+
+def test_retried_token_uses_cached_verdict():
+    verifier = _verifier(verdict_cache=VerdictCache(cache_alias=None))
+    verifier.client.create_assessment.return_value = _assessment(valid=False, invalid_reason=3)
+
+    assert verifier.verify_token('token', 'site-key') is False
+    assert verifier.verify_token('token', 'site-key') is False
+    verifier.client.create_assessment.assert_called_once()
+
+
+def test_verdict_shared_between_caches():
+    VerdictCache().set('token', 'site-key', False, 3)
+
+    verdict = VerdictCache().get('token', 'site-key')
+
+    assert verdict.valid is False
+    assert VerdictCache().get('token', 'other-site-key') is None
+
+
+def test_valid_verdicts_not_cached_by_default():
+    verifier = _verifier(verdict_cache=VerdictCache(cache_alias=None))
+    verifier.client.create_assessment.return_value = _assessment(valid=True)
+
+    assert verifier.verify_token('token', 'site-key', owner='a@example.com') is True
+    assert verifier.verify_token('token', 'site-key', owner='a@example.com') is True
+    assert verifier.client.create_assessment.call_count == 2
+
+
+def test_cached_valid_verdict_bound_to_owner():
+    verifier = _verifier(verdict_cache=VerdictCache(cache_alias=None, cache_valid=True))
+    verifier.client.create_assessment.return_value = _assessment(valid=True)
+
+    assert verifier.verify_token('token', 'site-key', owner='a@example.com') is True
+    assert verifier.verify_token('token', 'site-key', owner='a@example.com') is True
+    verifier.client.create_assessment.assert_called_once()
+
+    # Another registration with the same token is assessed, and Google rejects
+    # the duplicate.
+    verifier.client.create_assessment.return_value = _assessment(valid=False, invalid_reason=4)
+    assert verifier.verify_token('token', 'site-key', owner='b@example.com') is False
+    assert verifier.verify_token('token', 'site-key') is False
+
+
+def test_verdict_records_without_score():
+    verdict = Verdict.from_record((True, 0, 123.0))
+
+    assert verdict.score is None
+    assert verdict.owner is None
+    assert Verdict.from_record(Verdict(False, 3, 123.0, 0.1).to_record()).score == 0.1
+
+
+def test_low_score_rejected_by_risk_policy():
+    verifier = _verifier(risk_policy=RiskPolicy(min_score=0.5, cache_alias=None))
+    verifier.client.create_assessment.return_value = _assessment(score=0.3)
+
+    assert verifier.verify_token('token', 'site-key') is False
+
+
+def _token(index):
+    return f'03AFcWeA{index}' + 'x' * 200
+
+
+@pytest.mark.parametrize('cache_alias', ['default', None])
+def test_low_risk_client_skips_a_bounded_number_of_assessments(cache_alias):
+    verifier = _verifier(
+        prescreen=TokenPrescreen(cache_alias=cache_alias),
+        risk_policy=RiskPolicy(low_risk_score=0.9, client_skips=2, cache_alias=cache_alias),
+    )
+    verifier.client.create_assessment.return_value = _assessment(score=0.95)
+
+    def verify(index, client='10.0.0.1|web', site_key='site-key'):
+        return verifier.verify_token(_token(index), site_key, client=client, owner=f'learner{index}@example.com')
+
+    assert [verify(index) for index in range(4)] == [True] * 4
+    # Assessed, skipped twice, then assessed again.
+    assert verifier.client.create_assessment.call_count == 2
+
+    # Other clients, and the same client on another site key, are assessed.
+    assert verify(4, client='10.0.0.2|web') is True
+    assert verify(5, site_key='other-site-key') is True
+    assert verifier.client.create_assessment.call_count == 4
+
+
+def test_remembered_client_garbage_token_rejected():
+    verifier = _verifier(prescreen=TokenPrescreen(), risk_policy=RiskPolicy(low_risk_score=0.9))
+    verifier.client.create_assessment.return_value = _assessment(score=0.95)
+    assert verifier.verify_token(_token(1), 'site-key', client='10.0.0.1|web', owner='a@example.com') is True
+
+    assert verifier.verify_token('garbage', 'site-key', client='10.0.0.1|web', owner='b@example.com') is False
+    # A token used by another registration is rejected too, without a skip.
+    assert verifier.verify_token(_token(1), 'site-key', client='10.0.0.1|web', owner='b@example.com') is False
+    assert verifier.verify_token(_token(2), 'site-key', client='10.0.0.1|web', owner='b@example.com') is True
+    verifier.client.create_assessment.assert_called_once()
+
+
+def test_async_low_risk_client_skips_assessment():
+    client = mock.AsyncMock()
+    client.create_assessment.return_value = _assessment(score=0.95)
+    with mock.patch.object(utils.AsyncRecaptchaVerifier, 'create_client', return_value=client):
+        verifier = utils.AsyncRecaptchaVerifier(
+            'project', None, prescreen=TokenPrescreen(), risk_policy=RiskPolicy(low_risk_score=0.9, client_skips=1),
+        )
+
+    async def verify():
+        return [
+            await verifier.verify_token(_token(index), 'site-key', client='10.0.0.1|web', owner=f'{index}@example.com')
+            for index in range(3)
+        ]
+
+    assert asyncio.run(verify()) == [True] * 3
+    assert client.create_assessment.call_count == 2
+
+
+def test_remembered_client_assessed_without_prescreen():
+    verifier = _verifier(risk_policy=RiskPolicy(low_risk_score=0.9))
+    verifier.client.create_assessment.return_value = _assessment(score=0.95)
+    assert verifier.verify_token('token-1', 'site-key', client='10.0.0.1|web', owner='a@example.com') is True
+
+    verifier.client.create_assessment.return_value = _assessment(valid=False, invalid_reason=2, score=0.0)
+    assert verifier.verify_token('garbage', 'site-key', client='10.0.0.1|web', owner='b@example.com') is False
+    assert verifier.client.create_assessment.call_count == 2
+
+
+def test_uncertain_client_is_assessed_every_time():
+    verifier = _verifier(risk_policy=RiskPolicy(min_score=0.5, low_risk_score=0.9))
+    verifier.client.create_assessment.return_value = _assessment(score=0.7)
+
+    assert verifier.verify_token('token-1', 'site-key', client='10.0.0.1|web') is True
+    assert verifier.verify_token('token-2', 'site-key', client='10.0.0.1|web') is True
+    assert verifier.client.create_assessment.call_count == 2
+
+
+@override_settings(RECAPTCHA_SITE_KEYS={'web': 'site-key'},
+                   CLOSEST_CLIENT_IP_FROM_HEADERS=[{'name': 'X-Forwarded-For', 'index': -1}])
+def test_client_fingerprint_from_request():
+    request = RequestFactory().post(
+        '/register', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.1',
+        HTTP_MOBILE_PLATFORM_IDENTIFIER='made-up',
+    )
+    set_current_request(request)
+    try:
+        assert utils.get_client_fingerprint() == '203.0.113.1|web'
+    finally:
+        set_current_request(None)
+
+    assert utils.get_client_fingerprint() is None
+
+
+def test_transient_errors_retried_within_budget():
+    verifier = _verifier(timeout=1.0, max_attempts=3, backoff=0)
+    verifier.client.create_assessment.side_effect = [
+        google_exceptions.ServiceUnavailable('down'),
+        _assessment(valid=True),
+    ]
+
+    assert verifier.verify_token('token', 'site-key') is True
+    assert verifier.client.create_assessment.call_count == 2
+    assert verifier.client.create_assessment.call_args.kwargs['timeout'] <= 1.0
+
+
+def test_retries_stop_at_max_attempts():
+    verifier = _verifier(max_attempts=2, backoff=0)
+    verifier.client.create_assessment.side_effect = google_exceptions.DeadlineExceeded('slow')
+
+    assert verifier.verify_token('token', 'site-key') is utils.IGNORE_VALIDATION_ON_ERROR
+    assert verifier.client.create_assessment.call_count == 2
+
+
+def test_non_transient_errors_not_retried():
+    verifier = _verifier(max_attempts=3, backoff=0)
+    verifier.client.create_assessment.side_effect = google_exceptions.PermissionDenied('nope')
+
+    verifier.verify_token('token', 'site-key')
+
+    verifier.client.create_assessment.assert_called_once()
+
+
+def test_async_verifier():
+    async def verify():
+        client = mock.AsyncMock()
+        client.create_assessment.side_effect = [
+            google_exceptions.ServiceUnavailable('down'),
+            _assessment(valid=False),
+        ]
+        with mock.patch.object(utils.AsyncRecaptchaVerifier, 'create_client', return_value=client):
+            verifier = utils.AsyncRecaptchaVerifier('project', None, max_attempts=2, backoff=0)
+        return await verifier.verify_token('token', 'site-key'), client.create_assessment.await_count
+
+    assert asyncio.run(verify()) == (False, 2)
+
+
+def test_async_verification_keeps_cache_writes_off_the_loop():
+    verdict_cache = mock.Mock(spec=VerdictCache, aget=mock.AsyncMock(return_value=None), aset=mock.AsyncMock())
+    client = mock.AsyncMock()
+    client.create_assessment.return_value = _assessment(valid=False, invalid_reason=3)
+    with mock.patch.object(utils.AsyncRecaptchaVerifier, 'create_client', return_value=client):
+        verifier = utils.AsyncRecaptchaVerifier('project', None, verdict_cache=verdict_cache)
+    loop_thread = threading.get_ident()
+    resolved_in = []
+
+    def get_site_key():
+        resolved_in.append(threading.get_ident())
+        return 'site-key'
+
+    with mock.patch.object(utils, 'get_site_key_for_verification', side_effect=get_site_key):
+        assert asyncio.run(utils.averify_recaptcha_token('token', verifier)) is False
+
+    verdict_cache.aset.assert_awaited_once()
+    verdict_cache.set.assert_not_called()
+    assert resolved_in and resolved_in[0] != loop_thread
+
+
+@override_settings(RECAPTCHA_PROJECT_ID='project')
+def test_async_verifier_shared_per_event_loop():
+    async def get_verifiers():
+        with mock.patch.object(utils.AsyncRecaptchaVerifier, 'create_client'):
+            return utils.get_async_recaptcha_verifier(), utils.get_async_recaptcha_verifier()
+
+    first, second = asyncio.run(get_verifiers())
+    other_loop, _ = asyncio.run(get_verifiers())
+
+    assert first is second
+    assert other_loop is not first
+
+
+@override_settings(RECAPTCHA_PROJECT_ID='project', RECAPTCHA_SITE_KEYS={'web': 'site-key'})
+def test_speculative_verification_reused_by_pipeline(client_class):
+    client_class.return_value.create_assessment.return_value = _assessment(valid=True)
+    request = RequestFactory().post('/register')
+    request.session = {}
+    set_current_request(request)
+    try:
+        assert utils.start_speculative_verification('token') is True
+        assert utils.verify_recaptcha_token('token') is True
+    finally:
+        set_current_request(None)
+
+    client_class.return_value.create_assessment.assert_called_once()
+    assert not hasattr(request, utils.SPECULATIVE_ASSESSMENT_ATTR)
+
+
+@override_settings(RECAPTCHA_PROJECT_ID='project', RECAPTCHA_SITE_KEYS={'web': 'site-key'},
+                   RECAPTCHA_TOKEN_PRESCREEN={'cache_alias': None})
+def test_speculative_verification_prescreened_and_bound_to_owner(client_class):
+    create_assessment = client_class.return_value.create_assessment
+    create_assessment.return_value = _assessment(valid=True)
+    request = RequestFactory().post('/register')
+    request.session = {}
+    set_current_request(request)
+    try:
+        assert utils.start_speculative_verification('garbage', 'a@example.com') is False
+        assert utils.start_speculative_verification(_token(1), 'a@example.com') is True
+        assert utils.verify_recaptcha_token(_token(1), owner='a@example.com') is True
+
+        # Another registration replaying the token is rejected before any
+        # assessment is started.
+        assert utils.start_speculative_verification(_token(1), 'b@example.com') is False
+        assert utils.verify_recaptcha_token(_token(1), owner='b@example.com') is False
+    finally:
+        set_current_request(None)
+
+    create_assessment.assert_called_once()
+
+
+def test_circuit_breaker_opens_and_recovers():
+    breaker = utils.CircuitBreaker(minimum_calls=2, open_duration=60, fail_open=False)
+    verifier = _verifier(max_attempts=1, circuit_breaker=breaker)
+    verifier.client.create_assessment.side_effect = google_exceptions.ServiceUnavailable('down')
+
+    verifier.verify_token('token-1', 'site-key')
+    verifier.verify_token('token-2', 'site-key')
+    assert breaker.state == breaker.OPEN
+
+    # While open, the configured policy decides without calling Google.
+    assert verifier.verify_token('token-3', 'site-key') is False
+    assert verifier.client.create_assessment.call_count == 2
+
+    verifier.client.create_assessment.side_effect = None
+    verifier.client.create_assessment.return_value = _assessment(valid=True)
+    with mock.patch('time.monotonic', return_value=time.monotonic() + 61):
+        assert breaker.state == breaker.HALF_OPEN
+        assert verifier.verify_token('token-4', 'site-key') is True
+        assert breaker.snapshot()['state'] == breaker.CLOSED
+
+
+def _half_open_breaker():
+    """
+    A breaker that opened after one failure and now lets one probe through.
+    """
+    breaker = utils.CircuitBreaker(minimum_calls=1, open_duration=60)
+    breaker.record(True, 0.0)
+    breaker._opened_at -= 60
+    assert breaker.state == breaker.HALF_OPEN
+    return breaker
+
+
+def test_half_open_probe_not_leaked_by_request_errors():
+    breaker = _half_open_breaker()
+    verifier = _verifier(circuit_breaker=breaker)
+
+    with mock.patch.object(verifier, 'build_request', side_effect=ValueError('bad token')):
+        assert verifier.verify_token('token', 'site-key') is utils.IGNORE_VALIDATION_ON_ERROR
+
+    assert breaker.allow_request() is not None
+
+
+def test_half_open_breaker_ignores_late_non_probe_results():
+    breaker = utils.CircuitBreaker(minimum_calls=1, open_duration=60, half_open_max_calls=1)
+    late_call = breaker.allow_request()
+    breaker.record(True, 0.0)
+    breaker._opened_at -= 60
+    probe = breaker.allow_request()
+    assert probe is not None
+    assert breaker.allow_request() is None
+
+    # A call admitted before the breaker opened neither frees the probe nor
+    # decides the state.
+    breaker.record(False, 0.0, late_call)
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.allow_request() is None
+
+    breaker.record(False, 0.0, probe)
+    assert breaker.state == breaker.CLOSED
+
+
+def test_cancelled_assessment_counts_as_failure():
+    breaker = _half_open_breaker()
+    client = mock.AsyncMock()
+    client.create_assessment.side_effect = asyncio.CancelledError
+    with mock.patch.object(utils.AsyncRecaptchaVerifier, 'create_client', return_value=client):
+        verifier = utils.AsyncRecaptchaVerifier('project', None, circuit_breaker=breaker)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(verifier.verify_token('token', 'site-key'))
+
+    assert breaker.snapshot()['state'] == breaker.OPEN
+
+
+def test_circuit_breaker_opens_on_slow_calls():
+    breaker = utils.CircuitBreaker(minimum_calls=3, slow_call_duration=1.0, slow_call_rate_threshold=0.5)
+
+    for duration in (0.1, 1.5, 2.0):
+        breaker.record(False, duration)
+
+    assert breaker.state == breaker.OPEN
+
+
+@override_settings(RECAPTCHA_PROJECT_ID='project', RECAPTCHA_CIRCUIT_BREAKER={'minimum_calls': 5})
+def test_shared_circuit_breaker():
+    assert utils.get_recaptcha_verifier().circuit_breaker is utils.get_circuit_breaker()
+    assert utils.get_circuit_breaker().minimum_calls == 5
+    assert utils.get_circuit_breaker_state()['state'] == utils.CircuitBreaker.CLOSED
+    with override_settings(RECAPTCHA_CIRCUIT_BREAKER=None):
+        assert utils.get_circuit_breaker_state() is None
+
+
+@override_settings(RECAPTCHA_BULK_MAX_WORKERS=4)
+def test_bulk_verification_keeps_order():
+    verifier = FakeRecaptchaVerifier(latency=0.05)
+    tokens = [f'token-{index}' for index in range(8)] + ['']
+
+    start = time.monotonic()
+    results = utils.verify_recaptcha_tokens(iter(tokens), site_key='site-key', verifier=verifier)
+
+    assert time.monotonic() - start < 0.05 * len(tokens)
+    assert [result.token for result in results] == tokens
+    assert [result.outcome for result in results] == ['pass'] * 8 + ['blocked']
+    assert not results[-1].valid
+
+
+def test_bulk_verification_deadline():
+    results = utils.verify_recaptcha_tokens(
+        ['token'], site_key='site-key', verifier=FakeRecaptchaVerifier(valid=False, latency=0.2), timeout=0.05
+    )
+
+    assert results[0].outcome == utils.OUTCOME_TIMEOUT
+    assert results[0].valid is utils.IGNORE_VALIDATION_ON_ERROR
+
+
+@override_settings(RECAPTCHA_SITE_KEYS={})
+def test_bulk_verification_skipped_without_site_key():
+    results = utils.verify_recaptcha_tokens(['token'])
+
+    assert [(result.valid, result.outcome) for result in results] == [(True, 'skipped')]
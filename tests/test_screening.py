@@ -0,0 +1,85 @@
+"""
+Tests for the bulk screening of existing usernames.
+"""
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from edx_filters_pipelines.auth.screening import screen_usernames
+from edx_filters_pipelines.auth.termfile import write_term_file
+
+USERNAMES = ['alice', 'adm1n_bob', 'carol', 'staffer', 'dave', 'super_admin']
+MATCHES = [('adm1n_bob', 'admin'), ('staffer', 'staff'), ('super_admin', 'admin')]
+
+
+def test_screen_in_process():
+    assert list(screen_usernames(USERNAMES, ['admin', 'staff'], processes=1)) == MATCHES
+
+
+def test_screen_with_process_pool_keeps_input_order():
+    usernames = USERNAMES * 50
+
+    matches = list(screen_usernames(usernames, ['admin', 'staff'], processes=2, chunk_size=7))
+
+    assert matches == MATCHES * 50
+
+
+def test_usernames_are_consumed_lazily():
+    consumed = []
+
+    def usernames():
+        for username in USERNAMES:
+            consumed.append(username)
+            yield username
+
+    first = next(screen_usernames(usernames(), ['admin'], processes=1, chunk_size=2))
+
+    assert first == ('adm1n_bob', 'admin')
+    assert consumed == USERNAMES[:2]
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_screen_with_term_file(tmp_path, compiled):
+    path = tmp_path / 'terms'
+    if compiled:
+        write_term_file(['staff'], str(path))
+    else:
+        path.write_text('# reserved\nstaff\n')
+
+    matches = list(screen_usernames(USERNAMES, ['admin'], term_file=str(path), processes=2, chunk_size=2))
+
+    assert matches == MATCHES
+
+
+@pytest.mark.django_db
+@override_settings(OPEN_EDX_FILTERS_CONFIG={
+    'org.openedx.learning.student.registration.requested.v1': {'forbidden_usernames': ['admin', 'staff']},
+})
+def test_command_screens_configured_terms_against_users():
+    for username in USERNAMES:
+        get_user_model().objects.create(username=username)
+    out = StringIO()
+
+    call_command('screen_forbidden_usernames', '--processes', '1', stdout=out, stderr=StringIO())
+
+    assert out.getvalue().splitlines() == [f'{username}\t{term}' for username, term in MATCHES]
+
+
+def test_command_screens_input_file(tmp_path):
+    source, output = tmp_path / 'usernames.txt', tmp_path / 'matches.tsv'
+    source.write_text('\n'.join(USERNAMES) + '\n')
+    err = StringIO()
+
+    call_command('screen_forbidden_usernames', '--input', str(source), '--output', str(output),
+                 '--term', 'staff', '--processes', '2', stderr=err)
+
+    assert output.read_text() == 'staffer\tstaff\n'
+    assert 'Screened 6 usernames, 1 matched.' in err.getvalue()
+
+
+def test_command_requires_terms():
+    with pytest.raises(CommandError):
+        call_command('screen_forbidden_usernames', '--input', '-')
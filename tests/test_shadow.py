@@ -0,0 +1,130 @@
+"""
+Tests for shadow-mode reCAPTCHA verification.
+"""
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+from google.api_core import exceptions as google_exceptions
+
+from edx_filters_pipelines.auth import shadow, utils
+from edx_filters_pipelines.auth.pipelines import registration
+from test_utils import FakeRecaptchaVerifier
+
+FILTER_TYPE = 'org.openedx.learning.student.registration.requested.v1'
+FORM_DATA = {'username': 'learner', 'captcha_token': 'token'}
+
+
+@pytest.fixture(autouse=True)
+def _reset_shadow():
+    """
+    Start every test with a fresh executor, no outcomes and validation on.
+    """
+    shadow.reset_shadow_executor()
+    shadow.get_shadow_stats().clear()
+    with mock.patch.object(registration.ENABLE_RECAPTCHA_VALIDATION, 'is_enabled', return_value=True), \
+            mock.patch.object(registration.ENABLE_RECAPTCHA_VALIDATION, 'snapshot_value', return_value=True):
+        yield
+    shadow.reset_shadow_executor()
+
+
+def _resolve(verifier):
+    return mock.patch.object(shadow, 'resolve_recaptcha_platform', return_value=('site-key', verifier))
+
+
+def _drain():
+    shadow.get_shadow_executor().shutdown(wait=True)
+
+
+def _step():
+    return registration.VerifyReCaptchaToken(FILTER_TYPE, [], shadow_mode=True)
+
+
+def test_shadow_mode_lets_registration_through_and_records_verdict():
+    verifier = FakeRecaptchaVerifier(valid=False)
+
+    with _resolve(verifier), mock.patch.object(registration, 'verify_recaptcha_token') as verify:
+        assert _step().run_filter(form_data=FORM_DATA) == FORM_DATA
+        _drain()
+
+    verify.assert_not_called()
+    assert verifier.calls == 1
+    stats = shadow.get_shadow_stats().snapshot()
+    assert stats['outcomes'] == {'invalid': 1}
+    assert stats['latency']['count'] == 1
+
+
+def test_async_shadow_mode():
+    verifier = FakeRecaptchaVerifier(valid=True)
+    threads = []
+
+    def resolve():
+        threads.append(threading.current_thread())
+        return 'site-key', verifier
+
+    async def run():
+        loop_thread = threading.current_thread()
+        assert await _step().arun_filter(form_data=FORM_DATA) == FORM_DATA
+        return loop_thread
+
+    with mock.patch.object(shadow, 'resolve_recaptcha_platform', side_effect=resolve):
+        loop_thread = asyncio.run(run())
+        _drain()
+
+    assert threads and threads[0] is not loop_thread
+    assert shadow.get_shadow_stats().snapshot()['outcomes'] == {'valid': 1}
+
+
+def test_errors_never_affect_registration():
+    with mock.patch.object(shadow, 'resolve_recaptcha_platform', side_effect=RuntimeError('no credentials')):
+        assert _step().run_filter(form_data=FORM_DATA) == FORM_DATA
+
+    assert shadow.get_shadow_stats().snapshot()['outcomes'] == {'error': 1}
+
+
+def test_fallbacks_recorded_separately():
+    client = mock.Mock()
+    client.create_assessment.side_effect = google_exceptions.ServiceUnavailable('down')
+    verifier = utils.RecaptchaVerifier('project', None, client=client, max_attempts=1)
+
+    with _resolve(verifier):
+        assert shadow.start_shadow_verification('token') is True
+        _drain()
+
+    assert shadow.get_shadow_stats().snapshot()['outcomes'] == {'fallback': 1}
+
+
+@override_settings(RECAPTCHA_SHADOW_MAX_WORKERS=1, RECAPTCHA_SHADOW_MAX_PENDING=0)
+def test_tokens_dropped_when_executor_is_full():
+    verifier = FakeRecaptchaVerifier(valid=True, latency=0.2)
+
+    with _resolve(verifier):
+        assert shadow.start_shadow_verification('token-1') is True
+        assert shadow.start_shadow_verification('token-2') is False
+        _drain()
+
+    assert shadow.get_shadow_stats().snapshot()['outcomes'] == {'valid': 1, 'dropped': 1}
+
+
+def test_skipped_when_verification_is_not_configured():
+    with mock.patch.object(shadow, 'resolve_recaptcha_platform', return_value=None):
+        assert shadow.start_shadow_verification('token') is False
+
+    assert shadow.get_shadow_stats().snapshot()['outcomes'] == {'skipped': 1}
+
+
+def test_latency_histogram():
+    stats = shadow.ShadowStats()
+    for latency in (0.01, 0.2, 0.3, 10):
+        stats.record(shadow.SHADOW_VALID, latency)
+
+    latency = stats.snapshot()['latency']
+
+    assert latency['count'] == 4
+    assert latency['max'] == 10
+    assert latency['buckets'][0.05] == 1
+    assert latency['buckets'][0.25] == 1
+    assert latency['buckets'][0.5] == 1
+    assert latency['buckets'][float('inf')] == 1
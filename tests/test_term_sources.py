@@ -0,0 +1,132 @@
+"""
+Tests for reloading forbidden term sources.
+"""
+import os
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from openedx_filters.learning.filters import StudentRegistrationRequested
+
+from edx_filters_pipelines.auth import term_sources, termfile
+from edx_filters_pipelines.auth.pipelines.registration import PreventForbiddenUsernameRegistration
+
+
+@pytest.fixture(autouse=True)
+def _clear_sources():
+    """
+    Start every test without shared matchers or cached term lists.
+    """
+    cache.clear()
+    term_sources.clear_reloading_matchers()
+    yield
+    term_sources.clear_reloading_matchers()
+
+
+def _start_reload(matcher, username='anything'):
+    """
+    Make a check of the source due and match ``username``, capturing the reload
+    thread.
+
+    Returns:
+        tuple: The match and the mock of the thread class
+    """
+    with mock.patch('threading.Thread') as thread_class, mock.patch.object(matcher, 'interval', 0):
+        return matcher.find(username), thread_class
+
+
+def _run_reload(matcher, thread_class=None):
+    """
+    Run the background reload of the matcher in the test thread.
+
+    The test thread keeps its database connection, so it isn't closed like in a
+    reload thread.
+    """
+    if thread_class is None:
+        _, thread_class = _start_reload(matcher)
+    with mock.patch.object(term_sources, 'close_old_connections'):
+        thread_class.call_args.kwargs['target']()
+
+
+def test_file_source_reloaded_in_background(tmp_path):
+    path = tmp_path / 'reserved.txt'
+    path.write_text('admin\n', encoding='utf-8')
+    matcher = term_sources.ReloadingTermMatcher(term_sources.FileTermSource(str(path)), interval=3600)
+    assert matcher.find('admin1') == 'admin'
+
+    termfile.write_term_file(['staff'], str(path))
+    match, thread_class = _start_reload(matcher, 'admin1')
+    # The previous list is served until the reload has finished.
+    assert match == 'admin'
+    _run_reload(matcher, thread_class)
+
+    assert matcher.find('admin1') is None
+    assert matcher.find('staff1') == 'staff'
+
+
+def test_failed_reload_keeps_previous_terms(tmp_path):
+    path = tmp_path / 'reserved.txt'
+    path.write_text('admin\n', encoding='utf-8')
+    matcher = term_sources.ReloadingTermMatcher(term_sources.FileTermSource(str(path)), interval=3600)
+
+    os.remove(path)
+    _run_reload(matcher)
+
+    assert matcher.find('admin1') == 'admin'
+
+
+def test_cache_source_reloaded_on_version_change():
+    term_sources.publish_forbidden_terms(['admin'], 'reserved')
+    matcher = term_sources.get_cache_term_matcher('reserved', interval=3600)
+    assert matcher.find('admin1') == 'admin'
+
+    _run_reload(matcher)
+    assert matcher.find('admin1') == 'admin'
+
+    term_sources.publish_forbidden_terms(['staff'], 'reserved')
+    _run_reload(matcher)
+    assert matcher.find('staff1') == 'staff'
+
+
+def test_pipeline_step_reads_cache_source():
+    term_sources.publish_forbidden_terms(['admin'], 'reserved')
+    step = PreventForbiddenUsernameRegistration(
+        'org.openedx.learning.student.registration.requested.v1',
+        'edx_filters_pipelines.auth.pipelines.registration.PreventForbiddenUsernameRegistration',
+        forbidden_usernames_cache_key='reserved',
+    )
+
+    with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+        step.run_filter(form_data={'username': 'admin1'})
+
+
+def test_failed_first_load_retried_at_next_check(tmp_path):
+    path = tmp_path / 'reserved.txt'
+    step = PreventForbiddenUsernameRegistration(
+        'org.openedx.learning.student.registration.requested.v1',
+        'edx_filters_pipelines.auth.pipelines.registration.PreventForbiddenUsernameRegistration',
+        forbidden_usernames_file=str(path),
+        forbidden_usernames_reload_interval=3600,
+    )
+
+    with mock.patch.object(term_sources.logger, 'error') as log_error:
+        assert step.run_filter(form_data={'username': 'admin1'}) == {'username': 'admin1'}
+        assert step.run_filter(form_data={'username': 'admin1'}) == {'username': 'admin1'}
+    log_error.assert_called_once()
+
+    matcher = term_sources.get_file_term_matcher(str(path), interval=3600)
+    assert matcher.version is None
+    path.write_text('admin\n', encoding='utf-8')
+    _run_reload(matcher)
+    with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+        step.run_filter(form_data={'username': 'admin1'})
+
+
+def test_failed_first_load_of_cache_source():
+    with mock.patch.object(term_sources, 'caches', {}), mock.patch.object(term_sources.logger, 'error'):
+        matcher = term_sources.get_cache_term_matcher('reserved', interval=3600)
+        assert matcher.find('admin1') is None
+
+    term_sources.publish_forbidden_terms(['admin'], 'reserved')
+    _run_reload(matcher)
+    assert matcher.find('admin1') == 'admin'
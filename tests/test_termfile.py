@@ -0,0 +1,97 @@
+"""
+Tests for precompiled forbidden term files.
+"""
+import random
+import time
+from unittest import mock
+
+import pytest
+from openedx_filters.learning.filters import StudentRegistrationRequested
+
+from edx_filters_pipelines.auth import termfile
+from edx_filters_pipelines.auth.matcher import ForbiddenTermMatcher
+from edx_filters_pipelines.auth.pipelines.registration import PreventForbiddenUsernameRegistration
+
+
+@pytest.mark.parametrize('fold', [True, False])
+def test_mapped_matcher_matches_compiled_matcher(tmp_path, fold):
+    rng = random.Random(7)
+    terms = [''.join(rng.choices('abcé1', k=rng.randint(1, 4))) for _ in range(60)]
+    path = str(tmp_path / 'reserved.terms')
+    termfile.write_term_file(terms, path, fold=fold)
+
+    mapped = termfile.MappedTermMatcher(path)
+    compiled = ForbiddenTermMatcher(terms, fold=fold)
+
+    assert mapped.fold is fold
+    for _ in range(500):
+        username = ''.join(rng.choices('abcdéI1', k=rng.randint(0, 12)))
+        assert mapped.find(username) == compiled.find(username)
+
+
+def test_invalid_term_file(tmp_path):
+    path = tmp_path / 'reserved.terms'
+    path.write_bytes(b'not a term file at all')
+
+    with pytest.raises(ValueError):
+        termfile.MappedTermMatcher(str(path))
+
+
+def test_truncated_term_file(tmp_path):
+    path = tmp_path / 'reserved.terms'
+    termfile.write_term_file(['admin', 'staff', 'teacher'], str(path))
+    data = path.read_bytes()
+
+    for length in range(termfile._HEADER.size, len(data)):  # pylint: disable=protected-access
+        path.write_bytes(data[:length])
+        with pytest.raises(ValueError):
+            termfile.MappedTermMatcher(str(path))
+
+
+def test_truncated_term_file_does_not_break_registration(tmp_path):
+    path = tmp_path / 'reserved.terms'
+    termfile.write_term_file(['admin'], str(path))
+    path.write_bytes(path.read_bytes()[:50])
+    step = PreventForbiddenUsernameRegistration(
+        'org.openedx.learning.student.registration.requested.v1',
+        'edx_filters_pipelines.auth.pipelines.registration.PreventForbiddenUsernameRegistration',
+        forbidden_usernames_file=str(path),
+    )
+
+    with mock.patch.object(termfile.logger, 'error') as log_error:
+        assert step.run_filter(form_data={'username': 'admin'}) == {'username': 'admin'}
+    log_error.assert_called_once()
+
+
+def test_unavailable_term_file_matches_nothing_until_retried(tmp_path):
+    path = str(tmp_path / 'reserved.terms')
+
+    with mock.patch.object(termfile.logger, 'error') as log_error:
+        assert termfile.get_term_file_matcher(path).find('admin') is None
+        assert termfile.get_term_file_matcher(path).find('admin') is None
+    log_error.assert_called_once()
+
+    termfile.write_term_file(['admin'], path)
+    assert termfile.get_term_file_matcher(path).find('admin') is None
+    with mock.patch.object(termfile.time, 'monotonic', return_value=time.monotonic() + 61):
+        assert termfile.get_term_file_matcher(path).find('admin') == 'admin'
+
+
+def test_cli_and_pipeline_step(tmp_path):
+    source = tmp_path / 'reserved.txt'
+    source.write_text('# reserved names\nadmin\n\nstaff\n', encoding='utf-8')
+    path = str(tmp_path / 'reserved.terms')
+    termfile.main([str(source), path])
+
+    step = PreventForbiddenUsernameRegistration(
+        'org.openedx.learning.student.registration.requested.v1',
+        'edx_filters_pipelines.auth.pipelines.registration.PreventForbiddenUsernameRegistration',
+        forbidden_usernames=['teacher'],
+        forbidden_usernames_file=path,
+    )
+
+    assert termfile.get_term_file_matcher(path) is termfile.get_term_file_matcher(path)
+    assert step.run_filter(form_data={'username': 'learner'}) == {'username': 'learner'}
+    for username in ('st4ff_member', 'teacher'):
+        with pytest.raises(StudentRegistrationRequested.PreventRegistration):
+            step.run_filter(form_data={'username': username})
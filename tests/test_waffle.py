@@ -0,0 +1,115 @@
+"""
+Tests for the waffle flag snapshots.
+"""
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from waffle.models import Flag
+
+from edx_filters_pipelines import waffle
+from edx_filters_pipelines.auth import utils
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(name='flag')
+def fixture_flag():
+    """
+    A fresh snapshot flag, invalidated by the model signals in place of the
+    real ones.
+    """
+    cache.clear()
+    flag = waffle.SnapshotWaffleFlag('filters_pipelines.test_flag', __name__)
+    with mock.patch.object(waffle, 'SNAPSHOT_FLAGS', (flag,)):
+        yield flag
+
+
+def test_snapshot_served_from_memory(flag, django_assert_num_queries):
+    Flag.objects.create(name=flag.name, everyone=True)
+
+    assert flag.is_enabled()
+    with django_assert_num_queries(0):
+        assert flag.is_enabled()
+
+
+def test_snapshot_refreshed_in_background(flag):
+    db_flag = Flag.objects.create(name=flag.name, everyone=True)
+    assert flag.is_enabled()
+    Flag.objects.filter(pk=db_flag.pk).update(everyone=False)
+    cache.clear()
+    flag._expires_at = 0  # pylint: disable=protected-access
+
+    with mock.patch('threading.Thread') as thread:
+        # The stale value is served while the refresh runs.
+        assert flag.is_enabled()
+    thread.assert_called_once()
+    thread.call_args.kwargs['target'](*thread.call_args.kwargs['args'])
+
+    assert not flag.is_enabled()
+
+
+def test_snapshot_invalidated_on_save(flag, django_capture_on_commit_callbacks):
+    db_flag = Flag.objects.create(name=flag.name, everyone=True)
+    assert flag.is_enabled()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        db_flag.everyone = False
+        db_flag.save()
+
+    assert not flag.is_enabled()
+
+
+def test_missing_flag_snapshotted_as_default(flag, django_assert_num_queries):
+    assert flag.is_enabled() is False
+    with django_assert_num_queries(0):
+        assert flag.is_enabled() is False
+
+    flag.invalidate()
+    with override_settings(WAFFLE_FLAG_DEFAULT=True):
+        assert flag.is_enabled() is True
+
+
+@override_settings(WAFFLE_OVERRIDE=True)
+def test_querystring_override_evaluated_per_request(flag):
+    Flag.objects.create(name=flag.name, everyone=True)
+
+    assert flag.snapshot_value() is None
+
+
+def test_other_models_do_not_invalidate(flag):
+    Flag.objects.create(name=flag.name, everyone=True)
+    assert flag.is_enabled()
+
+    with mock.patch.object(flag, 'invalidate') as invalidate:
+        get_user_model().objects.create(username='learner')
+
+    invalidate.assert_not_called()
+
+
+def test_percentage_rollout_evaluated_per_request(flag):
+    Flag.objects.create(name=flag.name, everyone=None, percent=50)
+
+    assert flag.snapshot_value() is None
+    with mock.patch.object(waffle.WaffleFlag, 'is_enabled', return_value=True) as is_enabled:
+        assert flag.is_enabled()
+    is_enabled.assert_called_once()
+
+
+@override_settings(FILTERS_PIPELINES_FLAG_SNAPSHOT_TTL=0)
+def test_snapshot_disabled(flag):
+    Flag.objects.create(name=flag.name, everyone=True)
+
+    assert flag.snapshot_value() is None
+    assert flag.is_enabled()
+
+
+def test_recaptcha_settings_snapshot():
+    with override_settings(RECAPTCHA_SITE_KEYS={'web': 'site-key'}):
+        snapshot = utils.get_recaptcha_settings()
+        assert utils.get_recaptcha_settings() is snapshot
+        assert snapshot.site_keys == {'web': 'site-key'}
+    with override_settings(RECAPTCHA_SITE_KEYS={'web': 'other-key'}):
+        assert utils.get_recaptcha_settings().site_keys == {'web': 'other-key'}